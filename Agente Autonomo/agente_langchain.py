@@ -1,20 +1,28 @@
 import os
-import lancedb
+import sys
+
+# Módulos compartidos del proyecto RAG (caché de embeddings, retriever...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Rag simple"))
+import arranque  # Primero: cronómetro y perfil de importaciones (ARRANQUE_PERFIL=1) desde el inicio
 from dotenv import load_dotenv
 
-# --- IMPORTS DE ORQUESTACIÓN (CAPA 6) ---
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
-from langgraph.prebuilt import create_react_agent
-from langchain_core.prompts import ChatPromptTemplate
+# Los imports de orquestación (CAPA 6: langchain, langgraph, el LLM) se hacen en construir_agente,
+# en segundo plano mientras el usuario escribe (arranque.py)
+
+from servicio_retriever import obtener_retriever, precalentar
+from motor_embeddings import crear_cliente_genai
+from cache_embeddings import obtener_cache
+from instrumentacion import activo as instrumentacion_activa, span, trazar
+from streaming import MedidorTurno, imprimir_stream, texto_de
 
 # 1. Configuración
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 # --- HERRAMIENTAS (TOOLS) ---
+# Funciones normales: construir_agente las convierte en tools de LangChain con tool(...)
 
-@tool
+@trazar("herramienta.consultar_knowledge_base")
 def consultar_knowledge_base(query: str) -> str:
     """
     Úsalo para responder preguntas teóricas, buscar opiniones, consejos
@@ -22,35 +30,25 @@ def consultar_knowledge_base(query: str) -> str:
     """
     print(f"\n   🦜 [LangChain Tool] RAG activado: '{query}'")
     
-    # Lógica de resilencia de rutas (para que no falle por carpetas)
-    db_paths = ["../lancedb_data", "./lancedb_data"]
-    db_path = next((p for p in db_paths if os.path.exists(p)), None)
+    # Retriever compartido: una sola conexión LanceDB + cliente para todo el proceso
+    # (localiza ../lancedb_data o ./lancedb_data, o usa RETRIEVER_URL si hay servicio)
+    retriever = obtener_retriever()
     
-    if not db_path:
+    if not retriever:
         return "Error crítico: No encuentro la carpeta lancedb_data."
 
     try:
-        # Conexión a LanceDB (Capa 1)
-        db = lancedb.connect(db_path)
-        tbl = db.open_table("documentos")
-        
-        # Embeddings "on the fly" usando cliente raw para velocidad
-        import google.genai as genai
-        client_raw = genai.Client(api_key=GOOGLE_API_KEY)
-        q_res = client_raw.models.embed_content(model="text-embedding-004", contents=query)
-        q_vec = [float(x) for x in q_res.embeddings[0].values]
-        
-        # Retrieval
-        results = tbl.search(q_vec).limit(3).to_pandas()
+        # Embedding (con caché) + Retrieval
+        results = retriever.buscar(query, k=3)
         
         # Formateo de salida
-        contexto = "\n".join([f"- {row['text'][:300]}..." for _, row in results.iterrows()])
+        contexto = "\n".join([f"- {row.text[:300]}..." for row in results])
         return contexto if contexto else "No hay información en el PDF sobre esto."
         
     except Exception as e:
         return f"Error leyendo DB: {e}"
 
-@tool
+@trazar("herramienta.calcular_horas_estudio")
 def calcular_horas_estudio(semanas: int, horas_diarias: float) -> str:
     """
     Úsalo SOLO para realizar cálculos matemáticos numéricos sobre tiempo y planificación.
@@ -61,38 +59,103 @@ def calcular_horas_estudio(semanas: int, horas_diarias: float) -> str:
 
 # --- ARQUITECTURA DEL AGENTE ---
 
-def main():
-    print("--- AGENTE ORQUESTADOR (LANGCHAIN + GEMINI 1.5) ---")
-    
+def construir_agente():
+    """LLM + herramientas con memoria de sesión + grafo de LangGraph. Devuelve (sesion, agent_executor)."""
+    from langchain_core.tools import tool
+    from langgraph.prebuilt import ToolNode, create_react_agent
+    from herramientas_sesion import SesionHerramientas, clave_consulta
+
     # 1. El Cerebro (LLM) - Usamos Gemini Pro que es estable en LangChain
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-flash-latest",
-        temperature=0,
-        google_api_key=GOOGLE_API_KEY,
-        convert_system_message_to_human=True
-    )
+    # Con AGENTE_LLM_FALSO=<segundos por token> se usa un modelo local falso (pruebas de streaming)
+    if os.getenv("AGENTE_LLM_FALSO"):
+        from modelo_falso import ModeloFalsoLento
+        llm = ModeloFalsoLento(retardo=float(os.getenv("AGENTE_LLM_FALSO")))
+    else:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-flash-latest",
+            temperature=0,
+            google_api_key=GOOGLE_API_KEY,
+            convert_system_message_to_human=True
+        )
 
     # 2. El Kit de Herramientas
-    tools = [consultar_knowledge_base, calcular_horas_estudio]
+    # Memoria por sesión: la misma búsqueda (o el mismo cálculo) no se repite en la conversación
+    sesion = SesionHerramientas()
+    tools = [
+        sesion.memoizar(tool(consultar_knowledge_base), clave_consulta,
+                        cachear=lambda r: not r.startswith("Error")),
+        sesion.memoizar(tool(calcular_horas_estudio),
+                        lambda semanas, horas_diarias: (int(semanas), float(horas_diarias))),
+    ]
 
     # 3. & 4. Ensamblaje del Agente (Forma moderna con LangGraph)
-    # LangGraph crea un grafo de ejecución que maneja el flujo automáticamente
-    agent_executor = create_react_agent(llm, tools)
+    # LangGraph crea un grafo de ejecución que maneja el flujo automáticamente.
+    # El ToolNode ejecuta en paralelo todas las tool calls de un mismo paso (hasta max_concurrency)
+    agent_executor = create_react_agent(
+        llm,
+        ToolNode(tools),
+        prompt="Si necesitas varias herramientas independientes entre sí, pídelas todas a la vez en el mismo paso.",
+    )
+    return sesion, agent_executor
+
+def main():
+    # Uso: python agente_langchain.py [--stream]
+    stream = "--stream" in sys.argv[1:]
+
+    # El agente, la tabla LanceDB y el cliente de embeddings se preparan mientras el usuario escribe
+    precalentador = arranque.Precalentador()
+    precalentador.lanzar("agente", construir_agente)
+    precalentador.lanzar("lancedb", precalentar)
+    precalentador.lanzar("gemini", lambda: obtener_cache(crear_cliente_genai()))
+    print("--- AGENTE ORQUESTADOR (LANGCHAIN + GEMINI 1.5) ---")
+    print(precalentador.listo())
 
     # 5. Bucle de Interacción
     while True:
         user_input = input("\nUsuario: ")
         if user_input.lower() in ["salir", "exit"]:
+            if arranque.PERFIL:
+                print(precalentador.resumen())
             break
-            
+
+        # Solo la primera vez puede tocar esperar a que termine de construirse
+        sesion, agent_executor = precalentador.resultado("agente")
+        medidor = MedidorTurno()
+        traza = sesion.nuevo_turno()
+        # Span raíz del turno (INSTRUMENTACION=jsonl|otlp): herramientas y búsqueda cuelgan de él
+        raiz = span("turno_agente", stream=stream)
         try:
-            # LangGraph usa un formato diferente - recibe mensajes
-            response = agent_executor.invoke({"messages": [("user", user_input)]})
-            # La respuesta viene en el último mensaje
-            print(f"🤖 Agente: {response['messages'][-1].content}")
+            with raiz:
+                if stream:
+                    # stream_mode="messages" emite los tokens del LLM según se generan;
+                    # solo mostramos los del nodo "agent" (no la salida cruda de las tools)
+                    from langchain_core.messages import AIMessageChunk
+
+                    def tokens():
+                        for chunk, meta in agent_executor.stream(
+                            {"messages": [("user", user_input)]}, sesion.config(), stream_mode="messages"
+                        ):
+                            if meta.get("langgraph_node") == "agent" and isinstance(chunk, AIMessageChunk):
+                                yield texto_de(chunk.content)
+
+                    print("🤖 Agente: ", end="", flush=True)
+                    imprimir_stream(tokens(), medidor)
+                else:
+                    # LangGraph usa un formato diferente - recibe mensajes
+                    response = agent_executor.invoke({"messages": [("user", user_input)]}, sesion.config())
+                    medidor.token()
+                    medidor.terminar()
+                    # La respuesta viene en el último mensaje
+                    print(f"🤖 Agente: {response['messages'][-1].content}")
+                print(medidor.resumen())
+                if traza.llamadas:
+                    print(traza.resumen())
             
         except Exception as e:
             print(f"❌ Error: {e}")
+        if instrumentacion_activa():
+            print(raiz.desglose())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,20 +1,30 @@
 import os
-import lancedb
+import sys
+import asyncio
+
+# Módulos compartidos del proyecto RAG (caché de embeddings, retriever...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Rag simple"))
+import arranque  # Primero: cronómetro y perfil de importaciones (ARRANQUE_PERFIL=1) desde el inicio
 from dotenv import load_dotenv
 
-# Importaciones de LangChain (La "Capa de Abstracción")
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
-from langchain.agents import create_tool_calling_agent, AgentExecutor
-from langchain_core.prompts import ChatPromptTemplate
+# Las importaciones de LangChain (La "Capa de Abstracción") se hacen en construir_agente,
+# en segundo plano mientras el usuario escribe (arranque.py)
+
+from enrutador_local import ACTIVO as RUTA_RAPIDA, enrutar
+from servicio_retriever import obtener_retriever, precalentar
+from motor_embeddings import crear_cliente_genai
+from cache_embeddings import obtener_cache
+from instrumentacion import activo as instrumentacion_activa, span, trazar
+from streaming import MedidorTurno, imprimir_stream_async, texto_de
 
 # 1. Configuración
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 # --- CAPA DE HERRAMIENTAS (Decoradores) ---
+# Funciones normales: construir_agente las convierte en tools de LangChain con tool(...)
 
-@tool
+@trazar("herramienta.consultar_knowledge_base")
 def consultar_knowledge_base(query: str) -> str:
     """
     Útil para buscar información teórica, explicaciones o contenido del curso en el PDF.
@@ -22,32 +32,21 @@ def consultar_knowledge_base(query: str) -> str:
     """
     print(f"\n   🦜 [LangChain] RAG Tool invocada: '{query}'")
     
-    # Lógica de LanceDB (Idéntica a antes, pero encapsulada)
-    # FIX RUTA: Intentamos ruta relativa y absoluta
-    db_paths = ["../lancedb_data", "./lancedb_data"]
-    db_path = next((p for p in db_paths if os.path.exists(p)), None)
+    # Lógica de LanceDB (Idéntica a antes, pero encapsulada en el Retriever compartido)
+    # FIX RUTA: el Retriever prueba ruta relativa y absoluta, y reutiliza conexión y cliente
+    retriever = obtener_retriever()
     
-    if not db_path:
+    if not retriever:
         return "Error: No encuentro la base de datos."
 
     try:
-        db = lancedb.connect(db_path)
-        tbl = db.open_table("documentos")
-        
-        # OJO: LangChain tiene su propio embedding, pero para no liar dependencias
-        # usaremos el cliente 'raw' de google solo para embeddear la query rápido
-        import google.genai as genai
-        raw_client = genai.Client(api_key=GOOGLE_API_KEY)
-        q_res = raw_client.models.embed_content(model="text-embedding-004", contents=query)
-        q_vec = [float(x) for x in q_res.embeddings[0].values]
-        
-        results = tbl.search(q_vec).limit(3).to_pandas()
-        return "\n".join([f"- {row['text']}" for _, row in results.iterrows()])
+        results = retriever.buscar(query, k=3)
+        return "\n".join([f"- {row.text}" for row in results])
         
     except Exception as e:
         return f"Error en DB: {e}"
 
-@tool
+@trazar("herramienta.calcular_horas_estudio")
 def calcular_horas_estudio(semanas: int, horas_diarias: float) -> str:
     """
     Útil para realizar cálculos matemáticos sobre tiempo de estudio.
@@ -56,21 +55,41 @@ def calcular_horas_estudio(semanas: int, horas_diarias: float) -> str:
     total = weeks = semanas * 7 * horas_diarias
     return f"El cálculo total es de {total} horas."
 
+# --- STREAMING ---
+
+async def tokens_agente(agent_executor, user_input: str):
+    """Tokens de los LLM del agente según se generan (las llamadas a tools no emiten texto)."""
+    async for evento in agent_executor.astream_events({"input": user_input}, version="v2"):
+        if evento["event"] == "on_chat_model_stream":
+            yield texto_de(evento["data"]["chunk"].content)
+
+# La ruta rápida llama directamente a la función: no necesita LangChain ni esperar al agente
+HERRAMIENTAS = {f.__name__: f for f in (consultar_knowledge_base, calcular_horas_estudio)}
+
 # --- ARQUITECTURA DEL AGENTE ---
 
-def main():
-    print("--- AGENTE LANGCHAIN (ABSTRACCIÓN) ---")
-    
+def construir_agente(llm=None):
+    """LLM + herramientas + prompt ensamblados en un AgentExecutor. `llm` sustituye al de Gemini (bench)."""
+    from langchain_core.tools import tool
+    from langchain.agents import create_tool_calling_agent, AgentExecutor
+    from langchain_core.prompts import ChatPromptTemplate
+
     # 1. El Cerebro (LLM)
     # LangChain maneja los reintentos y protocolos internamente
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash", # Intentamos el modelo estándar
-        temperature=0,
-        google_api_key=GOOGLE_API_KEY
-    )
+    # Con AGENTE_LLM_FALSO=<segundos por token> se usa un modelo local falso (pruebas de streaming)
+    if llm is None and os.getenv("AGENTE_LLM_FALSO"):
+        from modelo_falso import ModeloFalsoLento
+        llm = ModeloFalsoLento(retardo=float(os.getenv("AGENTE_LLM_FALSO")))
+    elif llm is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-1.5-flash", # Intentamos el modelo estándar
+            temperature=0,
+            google_api_key=GOOGLE_API_KEY
+        )
 
     # 2. Las Herramientas
-    tools = [consultar_knowledge_base, calcular_horas_estudio]
+    tools = [tool(f) for f in HERRAMIENTAS.values()]
 
     # 3. El Prompt (System Instruction)
     prompt = ChatPromptTemplate.from_messages([
@@ -81,22 +100,61 @@ def main():
 
     # 4. El Ensamblaje (Wiring)
     agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=False)
+    return AgentExecutor(agent=agent, tools=tools, verbose=False)
+
+def main():
+    # Uso: python agente_router.py [--stream]
+    stream = "--stream" in sys.argv[1:]
+
+    # El agente, la tabla LanceDB y el cliente de embeddings se preparan mientras el usuario escribe
+    precalentador = arranque.Precalentador()
+    precalentador.lanzar("agente", construir_agente)
+    precalentador.lanzar("lancedb", precalentar)
+    precalentador.lanzar("gemini", lambda: obtener_cache(crear_cliente_genai()))
+    print("--- AGENTE LANGCHAIN (ABSTRACCIÓN) ---")
+    print(precalentador.listo())
 
     # 5. Loop de Interacción
     while True:
         user_input = input("\nUsuario: ")
         if user_input.lower() in ["salir", "exit"]:
+            if arranque.PERFIL:
+                print(precalentador.resumen())
             break
             
+        medidor = MedidorTurno()
+        # Span raíz del turno (INSTRUMENTACION=jsonl|otlp): herramientas y búsqueda cuelgan de él
+        raiz = span("turno_agente", stream=stream)
         try:
-            # LangChain gestiona el bucle de "Pensar -> Ejecutar Tool -> Volver a pensar -> Responder"
-            response = agent_executor.invoke({"input": user_input})
-            print(f"🤖 Agente: {response['output']}")
+            with raiz:
+                # Ruta rápida: las cuentas obvias van directas a la herramienta, sin llamar a Gemini
+                ruta = enrutar(user_input) if RUTA_RAPIDA else None
+                if ruta:
+                    respuesta = HERRAMIENTAS[ruta.herramienta](**ruta.args)
+                    medidor.token()
+                    medidor.terminar()
+                    print(f"🤖 Agente: {respuesta}")
+                    print(f"{medidor.resumen()} | ⚡ ruta rápida (sin LLM)")
+                elif stream:
+                    agent_executor = precalentador.resultado("agente")
+                    # AgentExecutor no emite tokens con .stream(): usamos los eventos del modelo de chat
+                    print("🤖 Agente: ", end="", flush=True)
+                    asyncio.run(imprimir_stream_async(tokens_agente(agent_executor, user_input), medidor))
+                    print(medidor.resumen())
+                else:
+                    agent_executor = precalentador.resultado("agente")
+                    # LangChain gestiona el bucle de "Pensar -> Ejecutar Tool -> Volver a pensar -> Responder"
+                    response = agent_executor.invoke({"input": user_input})
+                    medidor.token()
+                    medidor.terminar()
+                    print(f"🤖 Agente: {response['output']}")
+                    print(medidor.resumen())
             
         except Exception as e:
             print(f"❌ Error de LangChain: {e}")
             print("💡 Pista: Si es un 404, prueba a cambiar el modelo a 'gemini-pro'")
+        if instrumentacion_activa():
+            print(raiz.desglose())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import io
+import os
+import csv
+import time
+import argparse
+import contextlib
+
+import numpy as np
+
+from enrutador_local import enrutar
+
+# Pre-enrutador sobre el conjunto etiquetado (intenciones_etiquetadas.csv):
+#   - tasa de ruta rápida: cuentas de horas que se resuelven sin LLM
+#   - falsos positivos: preguntas para el LLM que el enrutador se habría quedado (deben ser 0)
+#   - latencia medida de las dos rutas para las mismas cuentas: enrutador + herramienta frente al
+#     AgentExecutor de agente_router.py con un modelo falso (ModeloFalsoHerramientas, --retardo s/token)
+#     que pide la tool call y después responde: las 2 llamadas al LLM de un turno real.
+#   python bench_enrutador.py --retardo 0.05
+
+RUTA_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intenciones_etiquetadas.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=RUTA_CSV)
+    parser.add_argument("--retardo", type=float, default=0.02, help="Segundos por token del modelo falso")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.csv, encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+
+    aciertos = args_malos = falsos_positivos = 0
+    latencias = []
+    rapidas = []  # (texto, ruta) de las cuentas que la ruta rápida resuelve bien
+    for fila in filas:
+        t0 = time.perf_counter()
+        for _ in range(args.repeticiones):
+            ruta = enrutar(fila["texto"])
+        latencias.append((time.perf_counter() - t0) / args.repeticiones)
+
+        if fila["ruta"] == "llm":
+            if ruta is not None:
+                falsos_positivos += 1
+                print(f"   ⚠️ Falso positivo: {fila['texto']!r} -> {ruta}")
+            continue
+        if ruta is None:
+            print(f"   ↪️ Al LLM (podía ir directa): {fila['texto']!r}")
+            continue
+        esperado = {"semanas": int(fila["semanas"]), "horas_diarias": float(fila["horas_diarias"])}
+        if ruta.herramienta == fila["ruta"] and ruta.args == esperado:
+            aciertos += 1
+            rapidas.append((fila["texto"], ruta))
+        else:
+            args_malos += 1
+            print(f"   ❌ Argumentos: {fila['texto']!r} -> {ruta.args}, esperado {esperado}")
+
+    directas = sum(f["ruta"] != "llm" for f in filas)
+    al_llm = len(filas) - directas
+    ms = np.array(latencias) * 1000
+    print(f"--- PRE-ENRUTADOR ({len(filas)} frases: {directas} cuentas, {al_llm} para el LLM) ---")
+    print(f"Ruta rápida     : {aciertos}/{directas} cuentas ({aciertos / directas:.0%}) sin llamar al LLM")
+    print(f"Args erróneos   : {args_malos}")
+    print(f"Falsos positivos: {falsos_positivos}/{al_llm} (preguntas que no debían saltarse el LLM)")
+    print(f"Latencia        : enrutador p50 {np.percentile(ms, 50):.3f} ms / p99 {np.percentile(ms, 99):.3f} ms")
+
+    # Las mismas cuentas por las dos rutas, medidas de punta a punta
+    from agente_router import HERRAMIENTAS, construir_agente
+    from modelo_falso import ModeloFalsoHerramientas
+
+    guion = {texto: [{"name": ruta.herramienta, "args": ruta.args}] for texto, ruta in rapidas}
+    agente = construir_agente(ModeloFalsoHerramientas(retardo=args.retardo, guion=guion))
+    t_rapida, t_agente = [], []
+    with contextlib.redirect_stdout(io.StringIO()):  # Las herramientas imprimen al invocarse
+        for texto, _ in rapidas:
+            t0 = time.perf_counter()
+            ruta = enrutar(texto)
+            HERRAMIENTAS[ruta.herramienta](**ruta.args)
+            t_rapida.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            agente.invoke({"input": texto})
+            t_agente.append(time.perf_counter() - t0)
+    rapida_ms, agente_ms = np.array(t_rapida) * 1000, np.array(t_agente) * 1000
+    print(f"--- RUTA RÁPIDA VS AGENTE ({len(rapidas)} cuentas, modelo falso a {args.retardo * 1000:.0f} ms/token) ---")
+    print(f"Ruta rápida     : p50 {np.percentile(rapida_ms, 50):.3f} ms / p99 {np.percentile(rapida_ms, 99):.3f} ms")
+    print(f"Agente LLM      : p50 {np.percentile(agente_ms, 50):.0f} ms / p99 {np.percentile(agente_ms, 99):.0f} ms")
+    ahorro = sum(t_agente) - sum(t_rapida)
+    print(f"Ahorro medido   : {ahorro:.2f} s en estas {len(rapidas)} cuentas "
+          f"({ahorro / sum(t_agente):.0%} de su tiempo por el agente)")
+
+if __name__ == "__main__":
+    main()
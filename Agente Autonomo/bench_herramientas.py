@@ -0,0 +1,86 @@
+import time
+import argparse
+
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode, create_react_agent
+
+from herramientas_sesion import SesionHerramientas, clave_consulta
+from modelo_falso import ModeloFalsoHerramientas
+
+# Tool calls de una conversación con el grafo de LangGraph: secuencial y sin memoria (como antes)
+# frente a paralelo + memoria por sesión. Modelo y herramientas falsos: la búsqueda RAG tarda
+# --latencia-rag segundos, que es lo que cuesta embed + búsqueda contra la API real.
+#   python bench_herramientas.py --latencia-rag 0.5
+
+LATENCIA = {"rag": 0.3}
+
+
+@tool
+def consultar_knowledge_base(query: str) -> str:
+    """Busca en el curso."""
+    time.sleep(LATENCIA["rag"])
+    return f"- Fragmento sobre {query}"
+
+
+@tool
+def calcular_horas_estudio(semanas: int, horas_diarias: float) -> str:
+    """Calcula horas de estudio."""
+    return f"El cálculo matemático exacto es: {semanas * 7 * horas_diarias} horas totales."
+
+
+def rag(query: str) -> dict:
+    return {"name": "consultar_knowledge_base", "args": {"query": query}}
+
+
+def calc(semanas: int, horas: float) -> dict:
+    return {"name": "calcular_horas_estudio", "args": {"semanas": semanas, "horas_diarias": horas}}
+
+
+# Cada turno: pregunta del usuario -> tool calls que el modelo pide en un mismo paso
+CONVERSACION = {
+    "Compara LangChain y LanceDB y calcula 4 semanas a 2h": [
+        rag("¿Qué es LangChain?"), rag("¿Qué es LanceDB?"), calc(4, 2)],
+    "¿Y LangChain, otra vez? Y las mismas horas": [rag("¿qué es  langchain?"), calc(4, 2.0)],
+    "Háblame de agentes": [rag("agentes"), rag("Agentes"), rag("¿Qué es LanceDB?")],
+}
+
+
+def conversar(memoria: bool, paralelo: bool):
+    sesion = SesionHerramientas(max_concurrencia=8 if paralelo else 1)
+    tools = [  # Sin memoria solo se trazan
+        sesion.memoizar(consultar_knowledge_base, clave_consulta if memoria else None),
+        sesion.memoizar(calcular_horas_estudio,
+                        (lambda semanas, horas_diarias: (int(semanas), float(horas_diarias))) if memoria else None),
+    ]
+    agente = create_react_agent(ModeloFalsoHerramientas(retardo=0.0, guion=CONVERSACION), ToolNode(tools))
+
+    total = 0.0
+    for pregunta in CONVERSACION:
+        traza = sesion.nuevo_turno()
+        t0 = time.perf_counter()
+        agente.invoke({"messages": [("user", pregunta)]}, sesion.config())
+        segundos = time.perf_counter() - t0
+        total += segundos
+        print(f"   {segundos:5.2f}s | {traza.resumen()}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latencia-rag", type=float, default=0.3)
+    args = parser.parse_args()
+    LATENCIA["rag"] = args.latencia_rag
+
+    resultados = {}
+    for nombre, memoria, paralelo in (("secuencial", False, False), ("paralelo", False, True),
+                                      ("paralelo + memoria", True, True)):
+        print(f"--- {nombre.upper()} ---")
+        resultados[nombre] = conversar(memoria, paralelo)
+    base = resultados["secuencial"]
+    print("\n--- TOTAL CONVERSACIÓN ---")
+    for nombre, segundos in resultados.items():
+        print(f"{nombre:>18}: {segundos:5.2f}s (x{base / segundos:.1f})")
+
+
+if __name__ == "__main__":
+    main()
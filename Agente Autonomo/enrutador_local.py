@@ -0,0 +1,77 @@
+import os
+import re
+import unicodedata
+from typing import NamedTuple, Optional
+
+# Pre-enrutador local: antes de gastar una llamada a Gemini, reconoce con reglas las peticiones
+# que son solo la cuenta de calcular_horas_estudio ("8 semanas a 2 horas al día") y las manda
+# directas a la herramienta. Es conservador: si sobra cualquier palabra que no sea de la cuenta
+# ("explícame LangChain y calcula..."), hay varias cantidades o las horas no son diarias, devuelve
+# None y la pregunta sigue por el agente LLM. AGENTE_RUTA_RAPIDA=0 lo desactiva.
+
+ACTIVO = os.getenv("AGENTE_RUTA_RAPIDA", "1") != "0"
+
+NUMEROS = {
+    "un": 1, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6, "siete": 7,
+    "ocho": 8, "nueve": 9, "diez": 10, "once": 11, "doce": 12, "trece": 13, "catorce": 14, "quince": 15,
+    "dieciseis": 16, "diecisiete": 17, "dieciocho": 18, "diecinueve": 19, "veinte": 20, "treinta": 30,
+    "cuarenta": 40, "cincuenta": 50,
+}
+_NUM = r"(\d+(?:[.,]\d+)?|" + "|".join(sorted(NUMEROS, key=len, reverse=True)) + r")"
+_DIARIO = r"(?:al\s+dia|por\s+dia|cada\s+dia|a\s+diario|diari[ao]s?|/\s*dia|todos\s+los\s+dias)"
+
+_SEMANAS = re.compile(rf"\b{_NUM}\s*(?:semanas?|sem)\b")
+_HORAS_DIARIAS = re.compile(
+    rf"(?:\b{_NUM}\s*(?:horas?|hrs?|h)\b(?P<media>\s+y\s+media)?|(?P<hora_y_media>\bhora\s+y\s+media)"
+    rf"|(?P<media_hora>\bmedia\s+hora))\s*{_DIARIO}"
+)
+
+# Palabras que pueden acompañar a la cuenta sin cambiar la intención
+RELLENO = set("""
+a al algo calcula calculame calcular calculo con cuanto cuantas cuantos de del dedicando dedicar dedico
+dime durante el en es estudiando estudiar estudiare estudiaria estudio estudias favor hago haria hora
+horas la las lo los me mi necesito para plan por porfa que quiero saber salen se seria serian si son
+suma sumaria te tiempo total totales un una voy y hola vale ok oye
+""".split())
+
+
+class Ruta(NamedTuple):
+    herramienta: str
+    args: dict
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes, para que las reglas no dependan de cómo se escribió."""
+    sin_tildes = "".join(c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn")
+    return sin_tildes.lower()
+
+
+def _numero(token: str) -> float:
+    return NUMEROS[token] if token in NUMEROS else float(token.replace(",", "."))
+
+
+def enrutar(texto: str) -> Optional[Ruta]:
+    """Ruta directa a una herramienta si la intención es obvia; None si hay que preguntar al LLM."""
+    t = normalizar(texto)
+    semanas = list(_SEMANAS.finditer(t))
+    horas = list(_HORAS_DIARIAS.finditer(t))
+    if len(semanas) != 1 or len(horas) != 1:
+        return None
+
+    h = horas[0]
+    if h.group("media_hora"):
+        horas_diarias = 0.5
+    elif h.group("hora_y_media"):
+        horas_diarias = 1.5
+    else:
+        horas_diarias = _numero(h.group(1)) + (0.5 if h.group("media") else 0.0)
+    n_semanas = _numero(semanas[0].group(1))
+    if n_semanas != int(n_semanas) or not 0 < n_semanas <= 520 or not 0 < horas_diarias <= 24:
+        return None
+
+    # Lo que queda fuera de las dos cantidades solo puede ser relleno de la cuenta
+    # (otro número, "meses", "curso", "explica"... -> LLM)
+    (a, b), (c, d) = sorted([semanas[0].span(), h.span()])
+    if any(p not in RELLENO for p in re.findall(r"[a-z0-9]+", t[:a] + " " + t[b:c] + " " + t[d:])):
+        return None
+    return Ruta("calcular_horas_estudio", {"semanas": int(n_semanas), "horas_diarias": horas_diarias})
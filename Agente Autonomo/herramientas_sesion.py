@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Rag simple"))
+from cache_embeddings import normalizar_texto
+
+# Herramientas de los agentes con memoria por sesión y trazas por turno.
+#   - Resultados deterministas memoizados mientras dure la sesión (el proceso del agente):
+#     la búsqueda RAG por pregunta normalizada, la calculadora por sus argumentos.
+#   - Si dos llamadas iguales llegan a la vez (mismo paso del grafo), la segunda espera a la
+#     primera en vez de repetir el trabajo.
+#   - Las llamadas independientes de un mismo paso se ejecutan en paralelo: el ToolNode de
+#     LangGraph las reparte en un pool de hilos de hasta `max_concurrency` (config()).
+# La traza de cada turno separa el tiempo de pared de las herramientas del que se ahorró
+# por ejecutarlas en paralelo y por servirlas desde la memoria.
+
+MAX_HERRAMIENTAS = int(os.getenv("AGENTE_MAX_HERRAMIENTAS", "8"))  # Llamadas simultáneas por paso
+
+
+def clave_consulta(query: str) -> str:
+    """Dos preguntas que solo difieren en mayúsculas o espacios comparten resultado."""
+    return normalizar_texto(query).casefold()
+
+
+class Llamada(NamedTuple):
+    herramienta: str
+    inicio: float
+    fin: float
+    cacheada: bool
+    ahorrado: float  # Lo que costó la ejecución original (solo en las cacheadas)
+
+
+class TrazaTurno:
+    def __init__(self):
+        self.llamadas: List[Llamada] = []
+        self._lock = threading.Lock()
+
+    def registrar(self, llamada: Llamada):
+        with self._lock:
+            self.llamadas.append(llamada)
+
+    def tiempo_pared(self) -> float:
+        """Duración de la unión de los intervalos ejecutados (lo que el turno esperó a las tools)."""
+        total, hasta = 0.0, float("-inf")
+        for inicio, fin in sorted((l.inicio, l.fin) for l in self.llamadas if not l.cacheada):
+            if fin > hasta:
+                total += fin - max(inicio, hasta)
+                hasta = fin
+        return total
+
+    def resumen(self) -> str:
+        ejecutadas = [l for l in self.llamadas if not l.cacheada]
+        secuencial = sum(l.fin - l.inicio for l in ejecutadas)
+        pared = self.tiempo_pared()
+        memoria = sum(l.ahorrado for l in self.llamadas if l.cacheada)
+        return (f"🔧 Herramientas: {len(self.llamadas)} llamadas ({len(self.llamadas) - len(ejecutadas)} desde memoria) "
+                f"| pared {pared:.2f}s | ahorrado {secuencial - pared:.2f}s en paralelo + {memoria:.2f}s por memoria")
+
+
+class SesionHerramientas:
+    def __init__(self, max_concurrencia: int = MAX_HERRAMIENTAS):
+        self.max_concurrencia = max_concurrencia
+        self._memo: Dict[tuple, Future] = {}
+        self._segundos: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self.traza = TrazaTurno()
+
+    def nuevo_turno(self) -> TrazaTurno:
+        self.traza = TrazaTurno()
+        return self.traza
+
+    def config(self) -> dict:
+        """Config para invoke/stream del grafo: cuántas tool calls de un paso van en paralelo."""
+        return {"max_concurrency": self.max_concurrencia}
+
+    def memoizar(
+        self,
+        herramienta: BaseTool,
+        clave: Optional[Callable[..., Hashable]],
+        cachear: Callable[[str], bool] = lambda resultado: True,
+    ) -> BaseTool:
+        """
+        Misma tool (nombre, descripción y esquema) con memoria por sesión.
+        `clave(**args)` identifica llamadas equivalentes (None: sin memoria, solo traza);
+        `cachear(resultado)` permite no guardar p.ej. los mensajes de error, para que se reintenten.
+        """
+        def envoltorio(**kwargs):
+            if clave is None:
+                inicio = time.perf_counter()
+                resultado = herramienta.func(**kwargs)
+                self.traza.registrar(Llamada(herramienta.name, inicio, time.perf_counter(), False, 0.0))
+                return resultado
+            k = (herramienta.name, clave(**kwargs))
+            with self._lock:
+                futuro = self._memo.get(k)
+                propietario = futuro is None
+                if propietario:
+                    futuro = self._memo[k] = Future()
+            if not propietario:
+                inicio = time.perf_counter()
+                resultado = futuro.result()
+                self.traza.registrar(Llamada(herramienta.name, inicio, time.perf_counter(), True,
+                                             self._segundos.get(k, 0.0)))
+                return resultado
+
+            inicio = time.perf_counter()
+            try:
+                resultado = herramienta.func(**kwargs)
+            except BaseException as e:
+                with self._lock:
+                    self._memo.pop(k, None)
+                futuro.set_exception(e)
+                raise
+            fin = time.perf_counter()
+            self.traza.registrar(Llamada(herramienta.name, inicio, fin, False, 0.0))
+            if cachear(resultado):
+                self._segundos[k] = fin - inicio
+            else:
+                with self._lock:
+                    self._memo.pop(k, None)
+            futuro.set_result(resultado)
+            return resultado
+
+        return StructuredTool.from_function(
+            func=envoltorio,
+            name=herramienta.name,
+            description=herramienta.description,
+            args_schema=herramienta.args_schema,
+        )
@@ -0,0 +1,79 @@
+import json
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Modelo de chat falso para probar el streaming de los agentes sin llamar a Gemini.
+# Responde con un eco del último mensaje, emitiendo un token (palabra) cada `retardo` segundos.
+# Se activa en los agentes con la variable de entorno AGENTE_LLM_FALSO=<retardo>.
+
+
+class ModeloFalsoLento(BaseChatModel):
+    retardo: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "modelo-falso-lento"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        ultimo = messages[-1].content if messages else ""
+        ultimo = ultimo if isinstance(ultimo, str) else str(ultimo)
+        return ["Respuesta", " simulada:"] + [f" {p}" for p in ultimo.split()]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.retardo * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for token in self._tokens(messages):
+            time.sleep(self.retardo)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs: Any):
+        # El modelo falso nunca llama a herramientas: responde siempre directamente
+        return self
+
+
+class ModeloFalsoHerramientas(ModeloFalsoLento):
+    """
+    Como ModeloFalsoLento, pero si el último mensaje es del usuario y está en `guion`, pide de
+    golpe (en un mismo paso) esas tool calls: [{"name": ..., "args": {...}}, ...].
+    Pedirlas también tarda `retardo` por token del mensaje. Tras los resultados responde con el eco habitual.
+    """
+    guion: Dict[str, List[dict]] = {}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        llamadas = self._llamadas(messages)
+        if llamadas is not None:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="", tool_calls=llamadas))])
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # AgentExecutor consume el modelo en streaming: las tool calls van en un único chunk
+        llamadas = self._llamadas(messages)
+        if llamadas is None:
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+            return
+        trozos = [{"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                  for i, c in enumerate(llamadas)]
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=trozos))
+
+    def _llamadas(self, messages: List[BaseMessage]) -> Optional[List[dict]]:
+        """Las tool calls del guion para este turno (tras su `retardo`), o None si toca el eco."""
+        ultimo = messages[-1] if messages else None
+        if not (isinstance(ultimo, HumanMessage) and ultimo.content in self.guion):
+            return None
+        time.sleep(self.retardo * len(self._tokens(messages)))
+        return [dict(c, id=f"call_{uuid.uuid4().hex[:8]}") for c in self.guion[ultimo.content]]
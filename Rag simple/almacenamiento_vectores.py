@@ -0,0 +1,78 @@
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from indice_vectorial import cuantizar_int8
+from motor_embeddings import MODELO_EMBEDDINGS
+
+# Cómo se guardan los vectores en la tabla LanceDB (LANCEDB_VECTOR_TIPO):
+#   float32 -> columna `vector` exacta                                        (3 KB por vector de 768)
+#   float16 -> columna `vector` en media precisión; LanceDB busca sobre ella   (1.5 KB)
+#   int8    -> columnas `vector_i8` + `escala` (cuantización escalar por vector, 772 B).
+#              LanceDB no busca sobre int8: el Retriever carga los códigos en un IndiceVectorial.
+# Con float16/int8 el Retriever pide más candidatos y los re-puntúa con el vector float32 exacto
+# (el de la caché de embeddings; si ya no está, el descuantizado).
+# Los metadatos del esquema guardan el modelo de embeddings y la dimensión con que se indexó la tabla:
+# el indexador la reconstruye si cambia el modelo y el Retriever embede las preguntas con ese mismo.
+
+TIPO_VECTOR = os.getenv("LANCEDB_VECTOR_TIPO", "float32")
+TIPOS_VECTOR = ("float32", "float16", "int8")
+
+
+def _lista_fija(valores: np.ndarray, dim: int) -> pa.FixedSizeListArray:
+    return pa.FixedSizeListArray.from_arrays(pa.array(valores.ravel()), dim)
+
+
+def columnas_vector(m: np.ndarray, tipo: str = TIPO_VECTOR) -> Dict[str, pa.Array]:
+    """Columnas Arrow para una matriz (n, dim) de embeddings float32, según el tipo de almacenamiento."""
+    if tipo not in TIPOS_VECTOR:
+        raise ValueError(f"Tipo de vector no soportado: {tipo} (opciones: {', '.join(TIPOS_VECTOR)})")
+    m = np.asarray(m, dtype=np.float32)
+    if tipo == "int8":
+        codigos, escalas = cuantizar_int8(m)
+        return {"vector_i8": _lista_fija(codigos, m.shape[1]), "escala": pa.array(escalas)}
+    return {"vector": _lista_fija(m.astype(np.float16) if tipo == "float16" else m, m.shape[1])}
+
+
+def metadatos_embeddings(modelo: Optional[str], dim: int) -> Dict[str, str]:
+    """Metadatos de esquema de una tabla nueva (sin modelo conocido, solo la dimensión)."""
+    metadatos = {"embeddings_dim": str(dim)}
+    if modelo:
+        metadatos["embeddings_modelo"] = modelo
+    return metadatos
+
+
+def modelo_de_esquema(esquema: pa.Schema) -> str:
+    """Modelo con que se indexó la tabla; las anteriores a estos metadatos eran siempre de Gemini."""
+    return (esquema.metadata or {}).get(b"embeddings_modelo", MODELO_EMBEDDINGS.encode()).decode()
+
+
+def dimension_de_esquema(esquema: pa.Schema) -> Optional[int]:
+    nombre = "vector_i8" if "vector_i8" in esquema.names else "vector"
+    return esquema.field(nombre).type.list_size if nombre in esquema.names else None
+
+
+def tipo_de_esquema(esquema: pa.Schema) -> Optional[str]:
+    """Tipo de almacenamiento de una tabla existente (None si no tiene vectores)."""
+    if "vector_i8" in esquema.names:
+        return "int8"
+    if "vector" in esquema.names:
+        return "float16" if esquema.field("vector").type.value_type == pa.float16() else "float32"
+    return None
+
+
+def columnas_a_leer(tipo: str) -> List[str]:
+    return ["vector_i8", "escala"] if tipo == "int8" else ["vector"]
+
+
+def vectores_de_arrow(t: pa.Table) -> np.ndarray:
+    """Matriz float32 (n, dim) desde las columnas de vector de un resultado, sin pasar por listas."""
+    nombre = "vector_i8" if "vector_i8" in t.column_names else "vector"
+    columna = t.column(nombre).combine_chunks()
+    dim = columna.type.list_size
+    m = columna.flatten().to_numpy(zero_copy_only=False).reshape(-1, dim).astype(np.float32)
+    if nombre == "vector_i8":
+        m *= t.column("escala").to_numpy()[:, None]
+    return m
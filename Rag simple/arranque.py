@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import builtins
+import threading
+import contextvars
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+# Arranque rápido de los scripts interactivos (asistente y agentes): el prompt aparece en cuanto
+# se han importado los módulos ligeros, y lo pesado (google.genai, lancedb, langgraph, la tabla,
+# los clientes del modelo...) se importa y se prepara en hilos de fondo mientras el usuario escribe.
+#   ARRANQUE_RAPIDO=0   precalienta todo antes del prompt (comportamiento clásico, para comparar)
+#   ARRANQUE_PERFIL=1   al salir imprime qué importaciones costaron más y en qué hilo se pagaron
+# Importar este módulo antes que el resto para que el perfil y el cronómetro cubran todo el arranque.
+
+ACTIVO = os.getenv("ARRANQUE_RAPIDO", "1") != "0"
+PERFIL = os.getenv("ARRANQUE_PERFIL", "") == "1"
+INICIO = time.perf_counter()
+
+
+class PerfilImportaciones:
+    """
+    Mide los imports de primer nivel de cada hilo (el `import x` del script o de una tarea de fondo,
+    con todas sus dependencias dentro) y el hilo que los pagó, así que los tiempos se pueden sumar.
+    Envuelve builtins.__import__: solo se instala con ARRANQUE_PERFIL=1.
+    """
+
+    def __init__(self):
+        self.tiempos: Dict[str, Tuple[float, str]] = {}
+        self._original = builtins.__import__
+        self._local = threading.local()
+
+    def instalar(self):
+        builtins.__import__ = self._importar
+
+    def _importar(self, nombre, globals=None, locals=None, fromlist=(), level=0):
+        if level or nombre in sys.modules or getattr(self._local, "dentro", False):
+            return self._original(nombre, globals, locals, fromlist, level)
+        self._local.dentro = True
+        t0 = time.perf_counter()
+        try:
+            return self._original(nombre, globals, locals, fromlist, level)
+        finally:
+            self._local.dentro = False
+            self.tiempos.setdefault(nombre, (time.perf_counter() - t0, threading.current_thread().name))
+
+    def informe(self, n: int = 12) -> str:
+        lineas = [f"   {s * 1000:8.1f} ms  {nombre:<32} [{hilo}]"
+                  for nombre, (s, hilo) in sorted(self.tiempos.items(), key=lambda x: -x[1][0])[:n]]
+        return "📦 Importaciones más lentas (con sus dependencias):\n" + "\n".join(lineas)
+
+
+_perfil = PerfilImportaciones() if PERFIL else None
+if _perfil:
+    _perfil.instalar()
+
+
+class Precalentador:
+    """
+    Tareas de arranque con nombre, cada una en su hilo de fondo (daemon: no retrasan la salida).
+    `resultado(nombre)` espera a la tarea solo si aún no ha terminado; las tareas que solo calientan
+    (abrir la tabla, crear el cliente) no hace falta esperarlas: el primer uso real reaprovecha
+    lo que ya esté listo. Con en_fondo=False (ARRANQUE_RAPIDO=0) se ejecutan en el acto.
+    """
+
+    def __init__(self, en_fondo: bool = ACTIVO):
+        self.en_fondo = en_fondo
+        self._tareas: Dict[str, Future] = {}
+        self.duraciones: Dict[str, float] = {}
+        self.esperas: Dict[str, float] = defaultdict(float)
+
+    def lanzar(self, nombre: str, funcion: Callable, *args, **kwargs) -> Future:
+        futuro: Future = Future()
+
+        def ejecutar():
+            t0 = time.perf_counter()
+            try:
+                valor = funcion(*args, **kwargs)
+            except BaseException as e:
+                self.duraciones[nombre] = time.perf_counter() - t0
+                futuro.set_exception(e)
+            else:
+                self.duraciones[nombre] = time.perf_counter() - t0
+                futuro.set_result(valor)
+
+        self._tareas[nombre] = futuro
+        if self.en_fondo:
+            # Mismo contexto que el hilo principal (span activo de instrumentacion)
+            hilo = threading.Thread(target=contextvars.copy_context().run, args=(ejecutar,),
+                                    name=f"precalentar-{nombre}", daemon=True)
+            hilo.start()
+        else:
+            ejecutar()
+        return futuro
+
+    def resultado(self, nombre: str):
+        """Resultado de la tarea (relanza su excepción); lo que haya que esperar queda en `esperas`."""
+        futuro = self._tareas[nombre]
+        if futuro.done():
+            return futuro.result()
+        t0 = time.perf_counter()
+        try:
+            return futuro.result()
+        finally:
+            self.esperas[nombre] += time.perf_counter() - t0
+
+    def pendientes(self) -> List[str]:
+        return [nombre for nombre, futuro in self._tareas.items() if not futuro.done()]
+
+    def listo(self) -> str:
+        """Línea para justo antes del primer prompt."""
+        linea = f"⏱️ Listo en {(time.perf_counter() - INICIO) * 1000:.0f} ms"
+        pendientes = self.pendientes()
+        return f"{linea} (en segundo plano: {', '.join(pendientes)})" if pendientes else linea
+
+    def resumen(self) -> str:
+        partes = []
+        for nombre, futuro in self._tareas.items():
+            if not futuro.done():
+                estado = "en curso"
+            elif futuro.exception() is not None:
+                estado = f"error: {futuro.exception()}"
+            else:
+                estado = f"{self.duraciones.get(nombre, 0.0) * 1000:.0f} ms"
+            if self.esperas.get(nombre):
+                estado += f", esperado {self.esperas[nombre] * 1000:.0f} ms"
+            partes.append(f"{nombre} {estado}")
+        resumen = "🔥 Precalentamiento: " + " | ".join(partes)
+        return f"{resumen}\n{_perfil.informe()}" if _perfil else resumen
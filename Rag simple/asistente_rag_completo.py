@@ -1,49 +1,78 @@
 import os
-import lancedb
+import sys
+import time
+import threading
+from typing import Iterator, List, Optional
+import arranque  # Primero: cronómetro y perfil de importaciones (ARRANQUE_PERFIL=1) desde el inicio
 from dotenv import load_dotenv
-from google import genai
+from motor_embeddings import Vector, crear_cliente_genai
+from cache_embeddings import obtener_cache
+from cache_respuestas import CacheRespuestas, ids_contexto
+from servicio_retriever import Resultado, localizar_db, obtener_retriever, precalentar
+from constructor_contexto import construir_contexto
+from streaming import MedidorTurno, imprimir_stream
+from instrumentacion import activo as instrumentacion_activa, contador, histograma, span, trazar
 
 # 1. Configuración
 load_dotenv()
-client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+_client = None
+_client_lock = threading.Lock()
+cache_respuestas = CacheRespuestas()  # Preguntas frecuentes: se responden sin llamar a Gemini
 
-def buscar_contexto(query: str, db_path: str = "./lancedb_data") -> str:
-    db = lancedb.connect(db_path)
+def cliente():
+    """Cliente de Gemini compartido; se crea en el primer uso (importar google.genai cuesta ~0.4 s)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = crear_cliente_genai()
+            obtener_cache(_client)  # La caché de embeddings reutiliza este mismo cliente
+        return _client
+
+def recuperar_fragmentos(query: str, db_path: Optional[str] = None) -> Optional[List[Resultado]]:
+    # Conexión, tabla y cliente se reutilizan entre preguntas (Retriever compartido)
+    # LANCEDB_PATH elige la carpeta y LANCEDB_COLECCION la colección (o varias) del cliente
+    retriever = obtener_retriever(db_path)
+    if retriever is None:
+        return None
     try:
-        tbl = db.open_table("documentos")
-    except:
-        return ""
-
-    q_res = client.models.embed_content(
-        model="text-embedding-004",
-        contents=query
-    )
-    q_vec = [float(x) for x in q_res.embeddings[0].values]
-
-    # AUMENTAMOS EL LÍMITE A 10 CHUNKS (Para tener más contexto)
-    results = tbl.search(q_vec).limit(10).to_pandas()
-    
-    contexto_unificado = ""
+        # AUMENTAMOS EL LÍMITE A 10 CHUNKS (Para tener más contexto)
+        # Con sus vectores: el constructor de contexto los usa para deduplicar y diversificar
+        return retriever.buscar(query, k=10, con_vectores=True)
+    except Exception as e:
+        print(f"⚠️ Error en la búsqueda: {e}")
+        return None
+
+def embed_pregunta(query: str, db_path: Optional[str] = None) -> Vector:
+    """Embedding de la pregunta con el modelo con que se indexó la tabla (ya en caché tras la búsqueda)."""
+    embedder = getattr(obtener_retriever(db_path), "embedder", None) or obtener_cache()
+    return embedder.embed_uno(query)
+
+def formatear_contexto(results: List[Resultado], q_vec: Optional[Vector] = None) -> str:
+    # Sin casi-duplicados, reordenado con MMR y recortado al presupuesto de tokens (CONTEXTO_MAX_TOKENS)
+    with span("construir_contexto", candidatos=len(results)) as s:
+        contexto = construir_contexto(results, q_vec)
+        s.atributo("fragmentos", len(contexto.fragmentos))
+        s.atributo("tokens", contexto.tokens)
     
     print("\n--- DEBUG: LO QUE LA IA ESTÁ LEYENDO ---") 
-    for i, row in results.iterrows():
+    for i, row in enumerate(contexto.fragmentos):
         # Imprimimos los primeros 100 caracteres de cada hallazgo
-        print(f"[{i}] {row['text'][:100]}...") 
-        contexto_unificado += f"\nFragmento {i}: {row['text']}\n"
-        
+        print(f"[{i}] {row.text[:100]}...") 
+    print(f"({len(contexto.fragmentos)}/{len(results)} fragmentos, ~{contexto.tokens} tokens | "
+          f"{contexto.duplicados} duplicados, {contexto.fuera_de_presupuesto} fuera de presupuesto)")
     print("----------------------------------------\n")
-    return contexto_unificado
+    return contexto.texto
 
-# --- CAPA DE GENERACIÓN (LLM) ---
-def generar_respuesta(query: str, contexto: str):
-    """El cerebro: Combina la pregunta con los datos recuperados."""
-    
-    if not contexto:
-        return "No tengo información en mi base de datos sobre este tema."
+@trazar("buscar_contexto")
+def buscar_contexto(query: str, db_path: Optional[str] = None) -> str:
+    results = recuperar_fragmentos(query, db_path)
+    return formatear_contexto(results, embed_pregunta(query, db_path)) if results else ""
 
+# --- CAPA DE GENERACIÓN (LLM) ---
+def construir_prompt(query: str, contexto: str) -> str:
     # PROMPT DE ARQUITECTURA (RAG)
     # Le damos personalidad y reglas estrictas (Grounding)
-    prompt = f"""
+    return f"""
     Eres un Asistente Técnico experto en IA.
     Tu misión es responder a la pregunta del usuario BASÁNDOTE SOLO en el contexto proporcionado.
     
@@ -60,38 +89,118 @@ def generar_respuesta(query: str, contexto: str):
     4. Ignora pies de página, cookies o texto irrelevante del contexto.
     """
 
+@trazar("generar_respuesta")
+def generar_respuesta(query: str, contexto: str):
+    """El cerebro: Combina la pregunta con los datos recuperados."""
+    
+    if not contexto:
+        return "No tengo información en mi base de datos sobre este tema."
+
     print("🤖 Generando respuesta con Gemini...")
-    response = client.models.generate_content(
-        model="gemini-flash-latest",
-        contents=prompt
-    )
+    with span("construir_prompt"):
+        prompt = construir_prompt(query, contexto)
+    with span("gemini.generate_content", modelo="gemini-flash-latest", caracteres_prompt=len(prompt)):
+        response = cliente().models.generate_content(
+            model="gemini-flash-latest",
+            contents=prompt
+        )
     return response.text
 
+def generar_respuesta_stream(query: str, contexto: str) -> Iterator[str]:
+    """Igual que generar_respuesta, pero va entregando el texto a medida que Gemini lo genera."""
+    if not contexto:
+        yield "No tengo información en mi base de datos sobre este tema."
+        return
+
+    with span("construir_prompt"):
+        prompt = construir_prompt(query, contexto)
+    t0 = time.perf_counter()
+    primero = True
+    with span("gemini.generate_content_stream", modelo="gemini-flash-latest", caracteres_prompt=len(prompt)):
+        for chunk in cliente().models.generate_content_stream(
+            model="gemini-flash-latest",
+            contents=prompt
+        ):
+            if chunk.text:
+                if primero:
+                    histograma("gemini.primer_fragmento.segundos", time.perf_counter() - t0)
+                    primero = False
+                yield chunk.text
+
+# --- CACHÉ SEMÁNTICA ---
+def responder(query: str, results: List[Resultado], stream: bool = False) -> Iterator[str]:
+    """
+    Entrega la respuesta como fragmentos de texto: uno solo si viene de la caché semántica
+    (ya se contestó algo casi idéntico con los mismos chunks) o sin streaming; muchos con streaming.
+    """
+    q_vec = embed_pregunta(query)  # Ya está en la caché de embeddings tras la búsqueda
+    ids_chunks = ids_contexto(results)
+
+    with span("cache_respuestas.buscar"):
+        respuesta = cache_respuestas.buscar(q_vec, ids_chunks)
+    contador("cache_respuestas", resultado="miss" if respuesta is None else "hit")
+    if respuesta is not None:
+        print("⚡ Respuesta servida desde la caché semántica")
+        yield respuesta
+        return
+
+    t0 = time.perf_counter()
+    contexto = formatear_contexto(results, q_vec)
+    if stream:
+        partes = []
+        for texto in generar_respuesta_stream(query, contexto):
+            partes.append(texto)
+            yield texto
+        respuesta = "".join(partes)
+    else:
+        respuesta = generar_respuesta(query, contexto)
+        yield respuesta
+    cache_respuestas.guardar(q_vec, ids_chunks, respuesta, time.perf_counter() - t0)
+
 # --- MAIN ---
 def main():
+    # Uso: python asistente_rag_completo.py [--stream]
+    stream = "--stream" in sys.argv[1:]
+    # Mientras se escribe la primera pregunta: google.genai + cliente, y lancedb + tabla e índices
+    precalentador = arranque.Precalentador()
+    precalentador.lanzar("gemini", cliente)
+    precalentador.lanzar("lancedb", precalentar)
     print("--- SISTEMA RAG COMPLETO (LanceDB + Gemini) ---")
-    print("🧠 Memoria cargada desde ./lancedb_data")
+    print(f"🧠 Memoria cargada desde {localizar_db() or './lancedb_data'} "
+          f"(colección: {os.getenv('LANCEDB_COLECCION') or 'documentos'})")
+    print(precalentador.listo())
     
     while True:
         query = input("\nPregunta al Experto (o 'salir'): ")
         if query.lower() in ['salir', 'exit']:
+            if arranque.PERFIL:
+                print(precalentador.resumen())
             break
             
-        # PASO 1: RETRIEVAL (Búsqueda)
-        print("🔍 Buscando en la base de datos...")
-        contexto = buscar_contexto(query)
-        
-        if contexto:
-            # PASO 2: GENERATION (Síntesis)
-            respuesta = generar_respuesta(query, contexto)
+        # Un span raíz por pregunta: con INSTRUMENTACION=jsonl|otlp se ve en qué etapa se fue el tiempo
+        with span("pregunta", stream=stream) as raiz:
+            # PASO 1: RETRIEVAL (Búsqueda)
+            print("🔍 Buscando en la base de datos...")
+            medidor = MedidorTurno()
+            results = recuperar_fragmentos(query)
             
-            print("\n" + "="*50)
-            print(f"RESPUESTA GENERADA:")
-            print("="*50)
-            print(respuesta)
-            print("-" * 50)
-        else:
-            print("❌ Error: No se encontró la base de datos o está vacía. Ejecuta el indexador primero.")
+            if results:
+                # PASO 2: GENERATION (Síntesis, o caché si la pregunta ya se respondió)
+                fragmentos = responder(query, results, stream=stream)
+                if not stream:
+                    fragmentos = ["".join(fragmentos)]  # Bloquea hasta tener la respuesta completa
+                
+                print("\n" + "="*50)
+                print(f"RESPUESTA GENERADA:")
+                print("="*50)
+                imprimir_stream(fragmentos, medidor)
+                print("-" * 50)
+                print(medidor.resumen())
+                print(f"📊 Caché de respuestas: {cache_respuestas.estadisticas()}")
+            else:
+                print("❌ Error: No se encontró la base de datos o está vacía. Ejecuta el indexador primero.")
+        if instrumentacion_activa():
+            print(raiz.desglose())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
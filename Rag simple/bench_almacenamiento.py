@@ -0,0 +1,103 @@
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from bench_indice_vectorial import datos, recall
+
+# Almacenamiento de vectores en la tabla LanceDB: float32 vs float16 vs int8 (LANCEDB_VECTOR_TIPO).
+# Para cada modo: tamaño en disco, memoria que retiene el Retriever, recall@k respecto a la
+# búsqueda exacta en float32 (sin candidatos extra y con re-puntuado a precisión completa) y latencia.
+# Antes, lo que ocupa un vector como lista de floats de Python frente a un np.ndarray float32.
+#   python bench_almacenamiento.py --filas 20000
+
+
+def memoria_vectores(m: np.ndarray) -> tuple:
+    """Bytes por vector: lista de floats de Python (como el antiguo sanitize_vector) vs ndarray float32."""
+    tracemalloc.start()
+    listas = [[float(x) for x in v] for v in m]
+    por_lista = tracemalloc.get_traced_memory()[0] / len(m)
+    del listas
+    tracemalloc.stop()
+    tracemalloc.start()
+    arrays = [np.array(v, dtype=np.float32) for v in m]
+    por_array = tracemalloc.get_traced_memory()[0] / len(m)
+    del arrays
+    tracemalloc.stop()
+    return por_lista, por_array
+
+
+def tamano_carpeta(ruta: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(ruta) for f in fs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--consultas", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["EMBEDDINGS_CACHE_PATH"] = os.path.join(tmp, "emb.sqlite")
+    from cache_embeddings import CacheEmbeddings
+    from indexador_incremental import IndexadorIncremental
+    from motor_embeddings import MotorEmbeddings
+    from servicio_retriever import Retriever
+    from troceado import Chunk
+
+    x = datos(args.filas, args.dim)
+    textos = [f"chunk {i}" for i in range(args.filas)]
+    fila_de = {t: i for i, t in enumerate(textos)}
+    rng = np.random.default_rng(1)
+    objetivos = rng.choice(args.filas, args.consultas, replace=False)
+    consultas = x[objetivos] + rng.normal(size=(args.consultas, args.dim)).astype(np.float32) * 0.3
+    # Verdad de referencia: L2 exacta en float32 (|x|² - 2 x·q; |q|² no cambia el orden)
+    exactos = np.argsort((x ** 2).sum(axis=1)[None, :] - 2 * consultas @ x.T, axis=1)[:, :args.k]
+
+    por_lista, por_array = memoria_vectores(x[:2_000])
+    print(f"--- MEMORIA POR VECTOR ({args.dim} dims) ---")
+    print(f"lista de floats: {por_lista / 1024:6.1f} KiB | np.float32: {por_array / 1024:6.1f} KiB "
+          f"| corpus de {args.filas}: {por_lista * args.filas / 2**20:7.1f} MiB vs {por_array * args.filas / 2**20:6.1f} MiB")
+
+    # La caché de embeddings (float32 exacto) es la misma para los tres modos: es la que re-puntúa
+    cache = CacheEmbeddings(
+        motor=MotorEmbeddings(embed_lote=lambda lote: [x[fila_de[t]] for t in lote], peticiones_por_segundo=1_000),
+        ruta=os.environ["EMBEDDINGS_CACHE_PATH"], max_memoria=args.filas,
+    )
+    fuente = os.path.join(tmp, "corpus.txt")
+    with open(fuente, "w", encoding="utf-8") as f:
+        f.write("\n".join(textos))
+
+    print(f"\n--- TABLA LANCEDB ({args.filas} filas, {args.consultas} consultas, k={args.k}) ---")
+    for tipo in ("float32", "float16", "int8"):
+        db_path = os.path.join(tmp, f"db_{tipo}")
+        indexador = IndexadorIncremental(db_path, cache, lote_ingesta=2048, tipo_vector=tipo)
+        indexador.indexar_fuente(fuente, (Chunk(t, 1, 0, len(t)) for t in textos))
+        disco = tamano_carpeta(db_path)
+
+        retriever = Retriever(db_path)
+        retriever.embedder = cache
+        lineas = []
+        for reescorado in ((1,) if tipo == "float32" else (1, 4)):
+            retriever.reescorado = reescorado
+            retriever.buscar_vector(consultas[0], args.k)  # Calentamiento (y carga del índice int8)
+            encontrados, latencias = [], []
+            for q in consultas:
+                t0 = time.perf_counter()
+                resultados = retriever.buscar_vector(q, args.k)
+                latencias.append(time.perf_counter() - t0)
+                encontrados.append([r.id for r in resultados])
+            lineas.append(f"x{reescorado}: recall@{args.k} {recall(encontrados, exactos):6.1%} "
+                          f"p50 {np.percentile(latencias, 50) * 1000:6.2f} ms")
+        ram = retriever._indice_int8()[1].nbytes() if tipo == "int8" else 0
+        print(f"{tipo:>7}: disco {disco / 2**20:7.1f} MiB | RAM retriever {ram / 2**20:6.1f} MiB | "
+              + " | ".join(lineas))
+
+
+if __name__ == "__main__":
+    main()
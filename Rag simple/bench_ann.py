@@ -0,0 +1,86 @@
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+# Recall vs latencia: búsqueda exacta (escaneo completo) frente al índice IVF-PQ
+# con distintos nprobes / refine_factor, sobre una tabla sintética (1M filas por defecto).
+# Aviso: con 1M x 768 dims la tabla ocupa ~3 GB en disco; usa --filas para probar en pequeño.
+
+
+def vectores_sinteticos(n: int, centros: np.ndarray, rng) -> np.ndarray:
+    """Vectores agrupados en clusters (más realista que ruido uniforme para un IVF)."""
+    vec = centros[rng.integers(0, len(centros), n)] + 0.3 * rng.normal(size=(n, centros.shape[1])).astype(np.float32)
+    return vec / np.linalg.norm(vec, axis=1, keepdims=True)
+
+
+def lotes_sinteticos(filas: int, centros: np.ndarray, lote: int, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    dim = centros.shape[1]
+    for inicio in range(0, filas, lote):
+        n = min(lote, filas - inicio)
+        vec = vectores_sinteticos(n, centros, rng)
+        yield pa.table({
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(vec.ravel()), dim),
+            "id": pa.array(np.arange(inicio, inicio + n)),
+        })
+
+
+def ids(tbl, q, k, nprobes=None, refine=None):
+    consulta = tbl.search(q).limit(k).select(["id"])
+    if nprobes:
+        consulta = consulta.nprobes(nprobes)
+    if refine:
+        consulta = consulta.refine_factor(refine)
+    return consulta.to_arrow().column("id").to_pylist()
+
+
+def medir(tbl, consultas, k, **params):
+    tiempos, resultados = [], []
+    for q in consultas:
+        t0 = time.perf_counter()
+        resultados.append(ids(tbl, q, k, **params))
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return resultados, float(np.percentile(tiempos, 50)), float(np.percentile(tiempos, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--consultas", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = lancedb.connect(tmp)
+        print(f"--- Generando tabla sintética: {args.filas} filas x {args.dim} dims ---")
+        centros = np.random.default_rng(0).normal(size=(256, args.dim)).astype(np.float32)
+        lotes = lotes_sinteticos(args.filas, centros, 50_000)
+        tbl = db.create_table("documentos", data=next(lotes))
+        for lote in lotes:
+            tbl.add(lote)
+
+        consultas = list(vectores_sinteticos(args.consultas, centros, np.random.default_rng(7)))
+
+        verdad, p50, p99 = medir(tbl, consultas, args.k)
+        print(f"{'exacta (sin índice)':<28} recall@{args.k}=1.000  p50={p50:7.1f} ms  p99={p99:7.1f} ms")
+
+        particiones = max(1, min(4096, int(args.filas ** 0.5)))
+        t0 = time.perf_counter()
+        tbl.create_index(metric="L2", num_partitions=particiones, num_sub_vectors=args.dim // 16)
+        print(f"Índice IVF-PQ ({particiones} particiones) construido en {time.perf_counter() - t0:.1f}s")
+
+        for nprobes in (5, 10, 20, 50, 100):
+            for refine in (None, 5, 20):
+                res, p50, p99 = medir(tbl, consultas, args.k, nprobes=nprobes, refine=refine)
+                recall = np.mean([len(set(r) & set(v)) / args.k for r, v in zip(res, verdad)])
+                etiqueta = f"nprobes={nprobes} refine={refine or '-'}"
+                print(f"{etiqueta:<28} recall@{args.k}={recall:.3f}  p50={p50:7.1f} ms  p99={p99:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import selectors
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+from bench_hibrido import corpus
+from bench_ingesta import EmbedderFalso
+from servidor_fake_gemini import iniciar_servidor
+
+# Arranque en frío de los scripts interactivos (arranque.py): cada medida es un proceso nuevo con
+# cachés vacías, contra el servidor fake de Gemini y una tabla LanceDB de --chunks chunks.
+#   - hasta el primer prompt (lo que espera el usuario para empezar a escribir)
+#   - hasta la primera respuesta, enviando la pregunta tras --pensar segundos "escribiendo"
+# ARRANQUE_RAPIDO=1 (precalentamiento en segundo plano) frente a =0 (todo listo antes del prompt).
+# --raiz apunta a otra copia del repositorio (p.ej. un git worktree de la versión anterior) para medirla.
+#   python bench_arranque.py --repeticiones 5 --pensar 2
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {
+    "asistente": (os.path.join("Rag simple", "asistente_rag_completo.py"), "Pregunta al Experto (o 'salir'): "),
+    "agente": (os.path.join("Agente Autonomo", "agente_langchain.py"), "Usuario: "),
+}
+
+
+class Proceso:
+    """Script interactivo con stdin/stdout por tuberías; espera a que aparezca el prompt."""
+
+    def __init__(self, ruta: str, env: dict):
+        self.p = subprocess.Popen([sys.executable, ruta], cwd=os.path.dirname(ruta), env=env,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self.salida = b""
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.p.stdout, selectors.EVENT_READ)
+
+    def esperar(self, marca: str, veces: int, timeout: float = 120.0) -> bool:
+        """Lee hasta que `marca` haya salido `veces` veces; False si el proceso termina antes."""
+        marca = marca.encode("utf-8")
+        limite = time.monotonic() + timeout
+        while self.salida.count(marca) < veces:
+            if not self.selector.select(max(limite - time.monotonic(), 0)):
+                return False
+            datos = os.read(self.p.stdout.fileno(), 65536)
+            if not datos:
+                return False
+            self.salida += datos
+        return True
+
+    def escribir(self, linea: str):
+        self.p.stdin.write(linea.encode("utf-8") + b"\n")
+        self.p.stdin.flush()
+
+    def cerrar(self):
+        try:
+            self.escribir("salir")
+            self.p.wait(timeout=30)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            self.p.kill()
+
+
+def medir(ruta: str, prompt: str, pregunta: str, pensar: float, env: dict):
+    """(segundos hasta el prompt, segundos de la primera respuesta) o (None, None) si no arranca."""
+    t0 = time.perf_counter()
+    proceso = Proceso(ruta, env)
+    try:
+        if not proceso.esperar(prompt, 1):
+            print(f"   ⚠️ {os.path.basename(ruta)} no llegó al prompt: {proceso.salida.decode(errors='replace')[-300:]}")
+            return None, None
+        hasta_prompt = time.perf_counter() - t0
+        time.sleep(pensar)
+        t1 = time.perf_counter()
+        proceso.escribir(pregunta)
+        respuesta = time.perf_counter() - t1 if proceso.esperar(prompt, 2) else None
+        return hasta_prompt, respuesta
+    finally:
+        proceso.cerrar()
+
+
+def construir(db_path: str, chunks: int) -> str:
+    from indexador_incremental import IndexadorIncremental
+    from troceado import Chunk
+
+    textos, siglas = corpus(chunks)
+    fuente = os.path.join(os.path.dirname(db_path), "corpus.txt")
+    with open(fuente, "w", encoding="utf-8") as f:
+        f.write("\n".join(textos))
+    indexador = IndexadorIncremental(db_path, EmbedderFalso(), lote_ingesta=1024)
+    indexador.indexar_fuente(fuente, (Chunk(t, 1, 0, len(t)) for t in textos))
+    indexador.asegurar_fts()
+    return siglas[0]
+
+
+def fmt(segundos: Optional[float]) -> str:
+    return "    -   " if segundos is None else f"{segundos * 1000:6.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--pensar", type=float, default=2.0, help="Segundos que tarda el usuario en escribir")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--raiz", default=RAIZ, help="Raíz del repositorio cuyos scripts se miden")
+    parser.add_argument("--scripts", default="asistente,agente")
+    args = parser.parse_args()
+
+    _, url = iniciar_servidor(latencia=0.0, retardo_token=0.0)
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "lancedb_data")
+    sigla = construir(db_path, args.chunks)
+    pregunta = f"¿Qué se aprende en el curso {sigla}?"
+
+    print(f"--- ARRANQUE EN FRÍO ({args.repeticiones} procesos por caso, {args.pensar:.1f}s escribiendo) ---")
+    for nombre in args.scripts.split(","):
+        relativa, prompt = SCRIPTS[nombre]
+        ruta = os.path.join(args.raiz, relativa)
+        for rapido in ("0", "1"):
+            medidas = []
+            for i in range(args.repeticiones + 1):  # La primera solo calienta la caché de ficheros del SO
+                env = dict(os.environ, GEMINI_BASE_URL=url, LANCEDB_PATH=db_path, PYTHONUNBUFFERED="1",
+                           ARRANQUE_RAPIDO=rapido, AGENTE_LLM_FALSO="0",
+                           EMBEDDINGS_CACHE_PATH=os.path.join(tmp, f"emb_{nombre}_{rapido}_{i}.sqlite"),
+                           RESPUESTAS_CACHE_PATH=os.path.join(tmp, f"resp_{nombre}_{rapido}_{i}.sqlite"))
+                medida = medir(ruta, prompt, pregunta, args.pensar, env)
+                if i:
+                    medidas.append(medida)
+            prompts = [p for p, _ in medidas if p is not None]
+            respuestas = [r for _, r in medidas if r is not None]
+            mediana = lambda xs: float(np.median(xs)) if xs else None
+            modo = "rápido" if rapido == "1" else "clásico"
+            print(f"{nombre:>9} {modo:>8}: hasta el prompt {fmt(mediana(prompts))} | "
+                  f"primera respuesta {fmt(mediana(respuestas))} | "
+                  f"total {fmt(mediana([p + r for p, r in medidas if p is not None and r is not None]))} "
+                  f"(sin contar los {args.pensar:.1f}s escribiendo)")
+
+
+if __name__ == "__main__":
+    main()
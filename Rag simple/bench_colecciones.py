@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+from bench_hibrido import corpus
+from bench_ingesta import EmbedderFalso
+from servidor_fake_gemini import iniciar_servidor
+
+# Base de conocimiento multi-cliente (colecciones.py) con --colecciones colecciones de --chunks chunks:
+#   - latencia de una colección (tabla ya abierta) y de --varias colecciones a la vez:
+#     uno a uno + fusión ingenua por distancia frente a RegistroColecciones.buscar (paralelo, un solo
+#     embedding, fusión global vector + BM25); recall@k con la respuesta en una de las colecciones
+#   - memoria y latencia consultando todas las colecciones al azar con distintos tamaños del LRU
+#     de tablas abiertas (cada tamaño en su propio proceso, pico de RSS)
+#   python bench_colecciones.py --colecciones 200 --chunks 200
+
+
+def preguntas_de(siglas, n: int, semilla: int = 1):
+    rnd = random.Random(semilla)
+    return [(f"¿Qué se aprende en el curso {s}?", s) for s in rnd.sample(siglas, n)]
+
+
+def acierta(resultados, sigla: str) -> bool:
+    return any(sigla in r.text for r in resultados)
+
+
+def construir(db_path: str, colecciones: int, chunks: int) -> list:
+    from colecciones import obtener_registro
+    from troceado import Chunk
+
+    textos, siglas = corpus(colecciones * chunks)  # Siglas únicas en todo el corpus
+    registro = obtener_registro(db_path)
+    embedder = EmbedderFalso()
+    por_coleccion = []
+    for c in range(colecciones):
+        nombre = f"cliente_{c:03d}"
+        trozo = textos[c * chunks:(c + 1) * chunks]
+        fuente = os.path.join(os.path.dirname(db_path), f"{nombre}.txt")
+        with open(fuente, "w", encoding="utf-8") as f:
+            f.write("\n".join(trozo))
+        indexador = registro.indexador(nombre, embedder, lote_ingesta=1024)
+        indexador.indexar_fuente(fuente, (Chunk(t, 1, 0, len(t)) for t in trozo))
+        indexador.asegurar_fts()
+        por_coleccion.append((nombre, siglas[c * chunks:(c + 1) * chunks]))
+    return por_coleccion
+
+
+def medir_lru(db_path: str, abiertas: int, consultas: int, k: int) -> dict:
+    """Proceso hijo: consultas al azar repartidas por todas las colecciones con un LRU de `abiertas`."""
+    from cache_embeddings import obtener_cache
+    from colecciones import RegistroColecciones
+
+    with open(os.path.join(os.path.dirname(db_path), "siglas.json"), encoding="utf-8") as f:
+        por_coleccion = json.load(f)
+    rnd = random.Random(2)
+    preguntas = []
+    for _ in range(consultas):
+        nombre, siglas = rnd.choice(por_coleccion)
+        preguntas.append((nombre, *preguntas_de(siglas, 1, rnd.random())[0]))
+    obtener_cache().embed([p for _, p, _ in preguntas])  # Se mide la búsqueda, no el embedding
+    registro = RegistroColecciones(db_path, max_abiertas=abiertas)
+    latencias, aciertos = [], 0
+    for nombre, pregunta, sigla in preguntas:
+        t0 = time.perf_counter()
+        resultados = registro.buscar(nombre, pregunta, k)
+        latencias.append((time.perf_counter() - t0) * 1000)
+        aciertos += acierta(resultados, sigla)
+    return {"abiertas": len(registro.abiertas()), "p50": float(np.percentile(latencias, 50)),
+            "p99": float(np.percentile(latencias, 99)), "recall": aciertos / consultas,
+            "pico_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--colecciones", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=200, help="Chunks por colección")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--varias", type=int, default=8, help="Colecciones por búsqueda múltiple")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--lru", default="8,32,0", help="Tamaños del LRU a comparar (0 = sin límite)")
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--abiertas", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    _, url = iniciar_servidor(latencia=0.0, retardo_token=0.0)  # Embedding de las preguntas
+    os.environ["GEMINI_BASE_URL"] = url
+    if args.db:  # Proceso hijo: solo la medida del LRU
+        print(json.dumps(medir_lru(args.db, args.abiertas, args.consultas, args.k)))
+        return
+
+    tmp = tempfile.mkdtemp()
+    os.environ["EMBEDDINGS_CACHE_PATH"] = os.path.join(tmp, "emb.sqlite")
+    from colecciones import obtener_registro
+
+    db_path = os.path.join(tmp, "lancedb_data")
+    t0 = time.perf_counter()
+    por_coleccion = construir(db_path, args.colecciones, args.chunks)
+    with open(os.path.join(tmp, "siglas.json"), "w", encoding="utf-8") as f:
+        json.dump(por_coleccion, f)
+    print(f"📚 {args.colecciones} colecciones x {args.chunks} chunks indexadas en {time.perf_counter() - t0:.1f}s")
+
+    registro = obtener_registro(db_path)
+    k = args.k
+    nombre, siglas = por_coleccion[0]
+    preguntas = preguntas_de(siglas, min(args.consultas, len(siglas)))
+    for pregunta, _ in preguntas:  # Calentamiento: tabla abierta y embeddings de las preguntas en caché
+        registro.buscar(nombre, pregunta, k)
+    latencias, aciertos = [], 0
+    for pregunta, sigla in preguntas:
+        t0 = time.perf_counter()
+        aciertos += acierta(registro.buscar(nombre, pregunta, k), sigla)
+        latencias.append((time.perf_counter() - t0) * 1000)
+    print(f"--- UNA COLECCIÓN (híbrida, k={k}) ---")
+    print(f"p50 {np.percentile(latencias, 50):6.2f} ms | p99 {np.percentile(latencias, 99):6.2f} ms | "
+          f"recall@{k} {aciertos / len(preguntas):.1%}")
+
+    # Varias colecciones: la respuesta está en una de ellas (al azar), se pregunta a todas
+    grupo = por_coleccion[:args.varias]
+    nombres = [n for n, _ in grupo]
+    rnd = random.Random(3)
+    preguntas = []
+    for _ in range(args.consultas):
+        _, siglas = rnd.choice(grupo)
+        sigla = rnd.choice(siglas)
+        preguntas.append((f"¿Qué se aprende en el curso {sigla}?", sigla))
+    for pregunta, _ in preguntas:  # Calentamiento: tablas abiertas y embeddings de las preguntas en caché
+        registro.buscar(nombres, pregunta, k)
+
+    print(f"--- {args.varias} COLECCIONES A LA VEZ (k={k}, {args.consultas} preguntas) ---")
+    for modo_busqueda in ("vector", "texto", "hibrido"):
+        for forma in ("uno_a_uno", "registro"):
+            latencias, aciertos = [], 0
+            for pregunta, sigla in preguntas:
+                t0 = time.perf_counter()
+                if forma == "uno_a_uno":
+                    # Lo que haría un cliente sin registro: cada colección por separado y los k más cercanos
+                    listas = [registro.retriever(n).buscar(pregunta, k, modo=modo_busqueda) for n in nombres]
+                    resultados = heapq.nsmallest(k, (r for lista in listas for r in lista), key=lambda r: r.distancia)
+                else:
+                    resultados = registro.buscar(nombres, pregunta, k, modo=modo_busqueda)
+                latencias.append((time.perf_counter() - t0) * 1000)
+                aciertos += acierta(resultados, sigla)
+            print(f"{modo_busqueda:>8} {forma:>10}: p50 {np.percentile(latencias, 50):6.2f} ms | "
+                  f"p99 {np.percentile(latencias, 99):6.2f} ms | recall@{k} {aciertos / len(preguntas):.1%}")
+
+    print(f"--- LRU DE TABLAS ABIERTAS ({args.consultas} consultas al azar sobre {args.colecciones} colecciones) ---")
+    for abiertas in (int(a) for a in args.lru.split(",")):
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--db", db_path, "--abiertas", str(abiertas or 10**9),
+             "--consultas", str(args.consultas), "--k", str(k)],
+            capture_output=True, text=True, check=True, env=dict(os.environ),
+        ).stdout
+        r = json.loads(salida.strip().splitlines()[-1])
+        etiqueta = abiertas or "sin límite"
+        print(f"LRU {etiqueta!s:>10}: {r['abiertas']:>4} tablas abiertas | pico RSS {r['pico_rss_mb']:6.0f} MB | "
+              f"p50 {r['p50']:6.2f} ms | p99 {r['p99']:7.2f} ms | recall@{k} {r['recall']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
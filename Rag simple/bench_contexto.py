@@ -0,0 +1,101 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+from indexador_incremental import huella_chunk
+from servidor_fake_gemini import iniciar_servidor, vector_falso
+
+# Tamaño del prompt y latencia extremo a extremo (embed + búsqueda + generación) con el contexto
+# original (los 10 chunks concatenados) frente al constructor de contexto (dedup + MMR + presupuesto).
+# El documento sintético repite párrafos con pequeñas variaciones, como los PDF con cabeceras,
+# pies de página y diapositivas repetidas; se trocea con el corte fijo de 500 caracteres.
+
+TEMAS = {
+    "python": "Python es el lenguaje principal del curso para programar agentes y pipelines de datos.",
+    "langchain": "LangChain permite encadenar modelos, herramientas y memoria para construir agentes.",
+    "lancedb": "LanceDB guarda los embeddings en disco y permite búsquedas vectoriales rápidas.",
+    "gemini": "Gemini es el modelo de Google que genera las respuestas y los embeddings del RAG.",
+    "evaluacion": "La evaluación del proyecto final incluye una demo y un informe técnico escrito.",
+    "horas": "El curso requiere unas diez horas semanales de estudio durante doce semanas.",
+}
+PREGUNTAS = [
+    "¿Qué lenguaje se usa para programar agentes?",
+    "¿Para qué sirve LangChain?",
+    "¿Dónde se guardan los embeddings?",
+    "¿Qué modelo genera las respuestas?",
+    "¿Cómo se evalúa el proyecto final?",
+    "¿Cuántas horas de estudio requiere el curso?",
+]
+
+
+def documento_sintetico(repeticiones: int, semilla: int = 0) -> str:
+    rng = random.Random(semilla)
+    parrafos = []
+    for _ in range(repeticiones):
+        for tema, frase in TEMAS.items():
+            relleno = " ".join(rng.choice(list(TEMAS.values())).split()[:4])
+            parrafos.append(f"Módulo {tema}. {frase} {frase} Nota: {relleno}. Curso de IA aplicada - página.")
+    return " ".join(parrafos)
+
+
+def crear_tabla(ruta: str, texto: str):
+    chunks = [texto[i:i + 500] for i in range(0, len(texto), 500)]
+    vectores = np.array([vector_falso(c) for c in chunks], dtype=np.float32)
+    lancedb.connect(ruta).create_table("documentos", data=pa.table({
+        "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectores.ravel()), vectores.shape[1]),
+        "text": pa.array(chunks),
+        "source": pa.array(["sintetico.pdf"] * len(chunks)),
+        "id": pa.array(np.arange(len(chunks))),
+        "chunk_hash": pa.array([huella_chunk(c) for c in chunks]),
+    }))
+    return len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=40)
+    parser.add_argument("--presupuesto", type=int, default=400, help="Tokens de contexto")
+    parser.add_argument("--retardo-prompt", type=float, default=0.0005, help="Segundos por palabra del prompt")
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(latencia=0.05, retardo_token=0.005, retardo_prompt=args.retardo_prompt)
+    tmp = tempfile.mkdtemp()
+    os.environ["GEMINI_BASE_URL"] = url
+    os.environ["EMBEDDINGS_CACHE_PATH"] = os.path.join(tmp, "emb.sqlite")
+    os.environ["RESPUESTAS_CACHE_PATH"] = os.path.join(tmp, "resp.sqlite")
+    db_path = os.path.join(tmp, "lancedb_data")
+    n_chunks = crear_tabla(db_path, documento_sintetico(args.repeticiones))
+
+    import asistente_rag_completo as rag  # Tras fijar las variables: el cliente apunta al fake
+    from cache_embeddings import embed_texto
+    from constructor_contexto import construir_contexto, contar_tokens
+
+    def original(pregunta, results):
+        return "".join(f"\nFragmento {i}: {r.text}\n" for i, r in enumerate(results))
+
+    def constructor(pregunta, results):
+        return construir_contexto(results, embed_texto(pregunta), presupuesto_tokens=args.presupuesto).texto
+
+    print(f"--- CONTEXTO ({n_chunks} chunks, {len(PREGUNTAS)} preguntas, presupuesto {args.presupuesto} tokens) ---")
+    for nombre, construir in (("original", original), ("constructor", constructor)):
+        tokens, latencias = [], []
+        for pregunta in PREGUNTAS:
+            t0 = time.perf_counter()
+            results = rag.recuperar_fragmentos(pregunta, db_path)
+            contexto = construir(pregunta, results)
+            rag.generar_respuesta(pregunta, contexto)
+            latencias.append(time.perf_counter() - t0)
+            tokens.append(contar_tokens(rag.construir_prompt(pregunta, contexto)))
+        print(f"{nombre:>12}: prompt medio ~{np.mean(tokens):6.0f} tokens | "
+              f"latencia media {np.mean(latencias) * 1000:6.0f} ms | p99 {np.percentile(latencias, 99) * 1000:6.0f} ms")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
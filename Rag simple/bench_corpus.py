@@ -0,0 +1,50 @@
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from bench_ingesta import generar_pdf_sintetico
+from ingesta_corpus import paginas_en_paralelo
+
+# Escalado de la extracción paralela: páginas/segundo con 1, 2, 4... procesos
+# sobre un corpus sintético. Solo mide la extracción de texto (sin embeddings).
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--paginas", type=int, default=500)
+    parser.add_argument("--max-procesos", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rutas = []
+        for n in range(args.pdfs):
+            ruta = os.path.join(tmp, f"doc_{n}.pdf")
+            generar_pdf_sintetico(ruta, args.paginas, semilla=n)
+            rutas.append(ruta)
+        total_paginas = args.pdfs * args.paginas
+
+        procesos = [1]
+        while procesos[-1] * 2 <= args.max_procesos:
+            procesos.append(procesos[-1] * 2)
+        if procesos[-1] != args.max_procesos:
+            procesos.append(args.max_procesos)
+
+        print(f"--- EXTRACCIÓN PARALELA: {args.pdfs} PDFs x {args.paginas} páginas ---")
+        base = None
+        for n in procesos:
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                t0 = time.perf_counter()
+                for ruta in rutas:
+                    for _ in paginas_en_paralelo(pool, ruta, ventana=n * 2):
+                        pass
+                segundos = time.perf_counter() - t0
+            pps = total_paginas / segundos
+            base = base or pps
+            print(f"{n:>3} procesos: {pps:8.0f} pág/s  (x{pps / base:.2f}, eficiencia {pps / base / n:.0%})")
+
+
+if __name__ == "__main__":
+    main()
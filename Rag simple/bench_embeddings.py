@@ -0,0 +1,70 @@
+import time
+import argparse
+
+import numpy as np
+
+from motor_embeddings import MotorEmbeddings, crear_cliente_genai
+from servidor_fake_gemini import iniciar_servidor
+
+# Benchmark: bucle original (1 chunk por llamada + sleep) vs MotorEmbeddings (lotes concurrentes).
+# Todo corre contra el servidor fake local, no consume cuota.
+
+
+def chunks_sinteticos(n: int):
+    return [f"Fragmento {i}: curso de inteligencia artificial con Python y Gemini " * 8 for i in range(n)]
+
+
+def bucle_original(client, chunks, pausa: float):
+    vectors = []
+    for text in chunks:
+        time.sleep(pausa)
+        result = client.models.embed_content(model="text-embedding-004", contents=text)
+        vectors.append([float(x) for x in result.embeddings[0].values])
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--muestra-original", type=int, default=20, help="chunks medidos con el bucle original")
+    parser.add_argument("--pausa-original", type=float, default=1.0)
+    parser.add_argument("--latencia", type=float, default=0.08)
+    parser.add_argument("--limite-rps", type=int, default=10)
+    parser.add_argument("--tam-lote", type=int, default=100)
+    parser.add_argument("--concurrencia", type=int, default=4)
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(latencia=args.latencia, limite_rps=args.limite_rps)
+    client = crear_cliente_genai(base_url=url)
+
+    muestra = chunks_sinteticos(args.muestra_original)
+    t0 = time.perf_counter()
+    bucle_original(client, muestra, args.pausa_original)
+    cps_original = len(muestra) / (time.perf_counter() - t0)
+
+    chunks = chunks_sinteticos(args.chunks)
+    motor = MotorEmbeddings(
+        client=client,
+        tam_lote=args.tam_lote,
+        max_concurrencia=args.concurrencia,
+        peticiones_por_segundo=args.limite_rps,
+    )
+    t0 = time.perf_counter()
+    vectores = motor.embed(chunks)
+    cps_motor = len(vectores) / (time.perf_counter() - t0)
+    peticiones, errores_cuota = motor.peticiones, motor.errores_cuota
+
+    # El orden debe ser estable: comparamos contra una llamada unitaria
+    esperado = motor.embed([chunks[-1]])[0]
+    assert np.array_equal(vectores[-1], esperado), "El orden de salida no coincide con la entrada"
+
+    print("--- BENCHMARK EMBEDDINGS ---")
+    print(f"Bucle original : {cps_original:8.1f} chunks/s ({len(muestra)} chunks)")
+    print(f"MotorEmbeddings: {cps_motor:8.1f} chunks/s ({len(chunks)} chunks, "
+          f"{peticiones} peticiones, {errores_cuota} respuestas 429)")
+    print(f"Aceleración    : x{cps_motor / cps_original:.1f}")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+from bench_ingesta import EmbedderFalso
+from servidor_fake_gemini import vector_falso
+
+# Recall@k y latencia: búsqueda solo vectorial vs solo texto (BM25) vs híbrida (RRF).
+# Cada chunk sintético menciona un curso con sigla propia ("curso QX-417 de ...") y las
+# preguntas la citan tal cual, con signos de puntuación pegados. Igual que un embedding real
+# con siglas raras, el embedding falso no las distingue bien; el índice de texto sí.
+
+TEMAS = ["python", "agentes", "lancedb", "gemini", "langchain", "prompts", "vectores", "datos"]
+RELLENO = ("el curso explica como usar modelos de lenguaje en proyectos reales con ejemplos practicos "
+           "y ejercicios guiados sobre cada modulo del temario").split()
+
+
+class EmbedderPregunta:
+    def embed_uno(self, texto: str):
+        return vector_falso(texto)
+
+
+def corpus(filas: int, semilla: int = 0):
+    rnd = random.Random(semilla)
+    siglas = set()
+    while len(siglas) < filas:
+        siglas.add(f"{rnd.choice('BCDFGHJKLMNPQRSTVWXZ')}{rnd.choice('BCDFGHJKLMNPQRSTVWXZ')}-{rnd.randint(100, 999)}")
+    siglas = sorted(siglas)
+    rnd.shuffle(siglas)
+    textos = []
+    for i, sigla in enumerate(siglas):
+        tema = TEMAS[i % len(TEMAS)]
+        relleno = " ".join(rnd.choice(RELLENO) for _ in range(40))
+        textos.append(f"El curso {sigla} de {tema} {relleno}.")
+    return textos, siglas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=5_000)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["EMBEDDINGS_CACHE_PATH"] = os.path.join(tmp, "emb.sqlite")
+    from indexador_incremental import IndexadorIncremental
+    from servicio_retriever import Retriever
+    from troceado import Chunk
+
+    textos, siglas = corpus(args.filas)
+    db_path = os.path.join(tmp, "lancedb_data")
+    fuente = os.path.join(tmp, "corpus.txt")
+    with open(fuente, "w", encoding="utf-8") as f:
+        f.write("\n".join(textos))
+
+    indexador = IndexadorIncremental(db_path, EmbedderFalso(), lote_ingesta=1024)
+    indexador.indexar_fuente(fuente, (Chunk(t, 1, 0, len(t)) for t in textos))
+    indexador.asegurar_fts()
+
+    retriever = Retriever(db_path)
+    retriever.embedder = EmbedderPregunta()
+    rnd = random.Random(1)
+    objetivos = rnd.sample(range(args.filas), args.consultas)
+    preguntas = [(f"¿Qué se aprende en el curso {siglas[i]}?", i) for i in objetivos]
+
+    print(f"--- BÚSQUEDA ({args.filas} chunks, {args.consultas} preguntas, k={args.k}) ---")
+    for modo in ("vector", "texto", "hibrido"):
+        retriever.buscar(preguntas[0][0], args.k, modo=modo)  # Calentamiento
+        aciertos, latencias = 0, []
+        for pregunta, i in preguntas:
+            t0 = time.perf_counter()
+            resultados = retriever.buscar(pregunta, args.k, modo=modo)
+            latencias.append(time.perf_counter() - t0)
+            aciertos += any(r.id == i for r in resultados)
+        print(f"{modo:>8}: recall@{args.k} {aciertos / len(preguntas):6.1%} | "
+              f"p50 {np.percentile(latencias, 50) * 1000:6.2f} ms | p99 {np.percentile(latencias, 99) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
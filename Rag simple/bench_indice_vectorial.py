@@ -0,0 +1,87 @@
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+from indice_vectorial import IndiceVectorial
+
+# IndiceVectorial (NumPy, float32/float16/int8) frente a LanceDB (escaneo exacto, sin índice ANN)
+# con 10k / 100k / 1M vectores: latencia por consulta (una a una y en lote), recall@10 respecto
+# al float32 exacto, memoria del índice y tiempo de carga con mmap.
+#   python bench_indice_vectorial.py --tamanos 10000,100000,1000000
+# (1M x 768 en float32 son ~3 GB: con poca RAM, usa --dim 384 o quita el 1M)
+
+
+def datos(n: int, dim: int, semilla: int = 0) -> np.ndarray:
+    """Vectores en grupos (como embeddings reales de pocos temas) para que el top-k no sea ruido."""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(64, dim)).astype(np.float32)
+    x = np.empty((n, dim), dtype=np.float32)
+    for inicio in range(0, n, 100_000):
+        fin = min(inicio + 100_000, n)
+        x[inicio:fin] = centros[rng.integers(0, 64, fin - inicio)] + rng.normal(size=(fin - inicio, dim)) * 0.8
+    return x
+
+
+def recall(encontrados: np.ndarray, exactos: np.ndarray) -> float:
+    return float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(encontrados, exactos)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanos", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--consultas", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    for n in (int(t) for t in args.tamanos.split(",")):
+        x = datos(n, args.dim)
+        q = datos(args.consultas, args.dim, semilla=1)
+        print(f"\n--- {n} vectores x {args.dim} dims, {args.consultas} consultas, k={args.k} ---")
+        exactos = None
+        with tempfile.TemporaryDirectory() as tmp:
+            for tipo in ("float32", "float16", "int8"):
+                indice = IndiceVectorial(args.dim, tipo, capacidad=n)
+                indice.agregar(x)
+                indice.guardar(os.path.join(tmp, tipo))
+                t0 = time.perf_counter()
+                indice = IndiceVectorial.cargar(os.path.join(tmp, tipo), mmap=True)
+                t_carga = time.perf_counter() - t0
+                indice.buscar(q[:1], args.k)  # Calentamiento (y páginas del mmap en caché)
+
+                t0 = time.perf_counter()
+                for v in q:
+                    indice.buscar(v, args.k)
+                t_una = (time.perf_counter() - t0) / len(q)
+                t0 = time.perf_counter()
+                _, ids = indice.buscar(q, args.k)
+                t_lote = (time.perf_counter() - t0) / len(q)
+                exactos = ids if exactos is None else exactos
+                print(f"numpy {tipo:>7}: {t_una * 1000:7.2f} ms/consulta | lote {t_lote * 1000:7.2f} ms/consulta | "
+                      f"recall@{args.k} {recall(ids, exactos):6.1%} | {indice.nbytes() / 2**20:7.1f} MiB | "
+                      f"carga mmap {t_carga * 1000:5.1f} ms")
+                del indice
+
+            # LanceDB con la misma métrica (coseno) y búsqueda exacta
+            xn = x / np.linalg.norm(x, axis=1, keepdims=True)
+            tbl = lancedb.connect(os.path.join(tmp, "lancedb")).create_table("documentos", data=pa.table({
+                "vector": pa.FixedSizeListArray.from_arrays(pa.array(xn.ravel()), args.dim),
+                "id": pa.array(np.arange(n)),
+            }))
+            del xn
+            buscar = lambda v: tbl.search(v).metric("cosine").limit(args.k).select(["id", "_distance"]).to_arrow()
+            buscar(q[0])
+            t0 = time.perf_counter()
+            ids = [buscar(v).column("id").to_numpy() for v in q]
+            t_lance = (time.perf_counter() - t0) / len(q)
+            print(f"lancedb  flat  : {t_lance * 1000:7.2f} ms/consulta |                         | "
+                  f"recall@{args.k} {recall(ids, exactos):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import json
+import random
+import resource
+import argparse
+import tempfile
+import subprocess
+
+# Benchmark de memoria y throughput: ingesta original (texto completo en memoria + create_table)
+# vs IndexadorIncremental en streaming, sobre un PDF sintético de 2.000 páginas.
+# Cada modo corre en un subproceso propio para que el pico de RSS (ru_maxrss) sea comparable.
+
+PALABRAS = ("curso inteligencia artificial python gemini modelo datos vector agente "
+            "prompt red neuronal aprendizaje embedding lancedb busqueda contexto").split()
+
+
+def _escapar(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def generar_pdf_sintetico(ruta: str, paginas: int, lineas: int = 45, semilla: int = 0):
+    """Escribe un PDF mínimo válido (Helvetica, texto ASCII) página a página."""
+    rnd = random.Random(semilla)
+    offsets = []
+
+    with open(ruta, "wb") as f:
+        def objeto(num: int, cuerpo: bytes):
+            offsets.append((num, f.tell()))
+            f.write(f"{num} 0 obj\n".encode() + cuerpo + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(paginas))
+        objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        objeto(2, f"<< /Type /Pages /Kids [{kids}] /Count {paginas} >>".encode())
+        objeto(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for p in range(paginas):
+            texto = ["BT /F1 9 Tf 40 800 Td 12 TL"]
+            for _ in range(lineas):
+                linea = " ".join(rnd.choice(PALABRAS) for _ in range(14))
+                texto.append(f"({_escapar(f'p{p} ' + linea)}) Tj T*")
+            texto.append("ET")
+            stream = "\n".join(texto).encode("latin-1")
+            objeto(4 + 2 * p, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                               f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * p} 0 R >>").encode())
+            objeto(5 + 2 * p, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+        inicio_xref = f.tell()
+        total = 3 + 2 * paginas
+        f.write(f"xref\n0 {total + 1}\n0000000000 65535 f \n".encode())
+        for _, off in sorted(offsets):
+            f.write(f"{off:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {total + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode())
+
+
+class EmbedderFalso:
+    """Embeddings deterministas en proceso (sin HTTP) para medir solo la ingesta."""
+
+    def __init__(self, dim: int = 768):
+        from motor_embeddings import MotorEmbeddings
+        from servidor_fake_gemini import vector_falso
+        self.motor = MotorEmbeddings(embed_lote=lambda textos: [vector_falso(t, dim) for t in textos])
+
+    def embed(self, textos, tolerante=False, progreso=None):
+        return self.motor.embed(textos, tolerante=tolerante, progreso=progreso)
+
+
+def modo_original(pdf: str, db_path: str) -> int:
+    import lancedb
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf)
+    full_text = ""
+    for page in reader.pages:
+        full_text += page.extract_text() or ""
+    chunks = [full_text[i:i + 500] for i in range(0, len(full_text), 500)]
+    vectors = EmbedderFalso().embed(chunks)
+    data = [{"vector": vectors[i], "text": chunks[i], "source": pdf, "id": i} for i in range(len(chunks))]
+    lancedb.connect(db_path).create_table("documentos", data=data)
+    return len(chunks)
+
+
+def modo_streaming(pdf: str, db_path: str) -> int:
+    from indexador_incremental import IndexadorIncremental
+
+    indexador = IndexadorIncremental(db_path, EmbedderFalso(), estrategia="fijo")  # Mismos chunks que el original
+    indexador.indexar([pdf])
+    return indexador.manifiesto[indexador.fuente(pdf)]["chunks"]
+
+
+def ejecutar_modo(modo: str, pdf: str, db_path: str):
+    t0 = time.perf_counter()
+    chunks = (modo_original if modo == "original" else modo_streaming)(pdf, db_path)
+    segundos = time.perf_counter() - t0
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KiB
+    print(json.dumps({"modo": modo, "chunks": chunks, "segundos": segundos, "rss_mb": rss_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paginas", type=int, default=2000)
+    parser.add_argument("--modo", choices=["original", "streaming"])
+    parser.add_argument("--pdf")
+    parser.add_argument("--db")
+    args = parser.parse_args()
+
+    if args.modo:  # Subproceso hijo
+        ejecutar_modo(args.modo, args.pdf, args.db)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "sintetico.pdf")
+        generar_pdf_sintetico(pdf, args.paginas)
+        print(f"📄 PDF sintético: {args.paginas} páginas, {os.path.getsize(pdf) / 1e6:.1f} MB")
+        for modo in ("original", "streaming"):
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--modo", modo,
+                 "--pdf", pdf, "--db", os.path.join(tmp, f"db_{modo}")],
+                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout
+            r = json.loads(salida.strip().splitlines()[-1])
+            print(f"{modo:>10}: {r['chunks']} chunks en {r['segundos']:.1f}s "
+                  f"({r['chunks'] / r['segundos']:.0f} chunks/s), pico RSS {r['rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
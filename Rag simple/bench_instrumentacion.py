@@ -0,0 +1,112 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+import instrumentacion
+from instrumentacion import contador, span
+from bench_hibrido import EmbedderPregunta, corpus
+from bench_ingesta import EmbedderFalso
+
+# Coste de la instrumentación (instrumentacion.py):
+#   - por span / contador, desactivada y activada (exportando a JSONL)
+#   - en una búsqueda híbrida real sobre LanceDB: latencia con y sin instrumentación
+# y, con ella activada, el resumen por etapa y el desglose de una pregunta
+# (embedding, búsqueda vectorial, BM25, conversión, fusión, construcción del contexto).
+#   python bench_instrumentacion.py --filas 5000 --consultas 300
+
+
+def coste_por_llamada(n: int) -> dict:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with span("bench", k=3):
+            pass
+    t_span = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    for _ in range(n):
+        contador("bench.contador")
+    t_contador = (time.perf_counter() - t0) / n
+    return {"span": t_span, "contador": t_contador}
+
+
+def latencias(retriever, preguntas, k: int) -> np.ndarray:
+    from constructor_contexto import construir_contexto
+
+    tiempos = []
+    for pregunta in preguntas:
+        t0 = time.perf_counter()
+        with span("pregunta"):
+            resultados = retriever.buscar(pregunta, k, con_vectores=True)
+            with span("construir_contexto"):
+                construir_contexto(resultados, retriever.embedder.embed_uno(pregunta))
+        tiempos.append(time.perf_counter() - t0)
+    return np.array(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=5_000)
+    parser.add_argument("--consultas", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--llamadas", type=int, default=200_000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["EMBEDDINGS_CACHE_PATH"] = os.path.join(tmp, "emb.sqlite")
+    from indexador_incremental import IndexadorIncremental
+    from servicio_retriever import Retriever
+    from troceado import Chunk
+
+    textos, siglas = corpus(args.filas)
+    db_path = os.path.join(tmp, "lancedb_data")
+    fuente = os.path.join(tmp, "corpus.txt")
+    with open(fuente, "w", encoding="utf-8") as f:
+        f.write("\n".join(textos))
+    indexador = IndexadorIncremental(db_path, EmbedderFalso(), lote_ingesta=1024)
+    indexador.indexar_fuente(fuente, (Chunk(t, 1, 0, len(t)) for t in textos))
+    indexador.asegurar_fts()
+    retriever = Retriever(db_path)
+    retriever.embedder = EmbedderPregunta()
+    preguntas = [f"¿Qué se aprende en el curso {s}?" for s in random.Random(1).sample(siglas, args.consultas)]
+
+    print(f"--- COSTE POR LLAMADA ({args.llamadas} llamadas) ---")
+    apagada = coste_por_llamada(args.llamadas)
+    latencias(retriever, preguntas[:20], args.k)  # Calentamiento
+    ms_apagada = latencias(retriever, preguntas, args.k)
+
+    instrumentacion.activar("jsonl", os.path.join(tmp, "trazas.jsonl"))
+    encendida = coste_por_llamada(args.llamadas)
+    instrumentacion.exportar()  # Que el hilo exportador no compita con las búsquedas medidas
+    for nombre in ("span", "contador"):
+        print(f"{nombre:>9}: desactivada {apagada[nombre] * 1e9:7.0f} ns | activada {encendida[nombre] * 1e9:7.0f} ns")
+
+    ms_encendida = latencias(retriever, preguntas, args.k)
+    print(f"--- BÚSQUEDA HÍBRIDA + CONTEXTO ({args.filas} chunks, {args.consultas} preguntas, k={args.k}) ---")
+    for nombre, ms in (("desactivada", ms_apagada), ("activada", ms_encendida)):
+        print(f"{nombre:>11}: p50 {np.percentile(ms, 50):6.2f} ms | p99 {np.percentile(ms, 99):6.2f} ms")
+    extra = np.percentile(ms_encendida, 50) - np.percentile(ms_apagada, 50)
+    print(f"sobrecoste activada: {extra:+.3f} ms por pregunta ({extra / np.percentile(ms_apagada, 50):+.1%})")
+
+    # Desglose de una pregunta más y resumen agregado (sin el span "bench" del micro-benchmark)
+    with span("pregunta") as raiz:
+        resultados = retriever.buscar(preguntas[0], args.k, con_vectores=True)
+        with span("construir_contexto"):
+            from constructor_contexto import construir_contexto
+            construir_contexto(resultados, retriever.embedder.embed_uno(preguntas[0]))
+    print("--- DESGLOSE DE UNA PREGUNTA ---")
+    print(raiz.desglose())
+    for hijo in raiz.hijos:
+        if hijo.hijos:
+            print("   " + hijo.desglose())
+    print("--- RESUMEN POR ETAPA ---")
+    print("\n".join(l for l in instrumentacion.resumen().splitlines() if not l.startswith("bench ")))
+    instrumentacion.exportar()
+    lineas = sum(1 for _ in open(os.path.join(tmp, "trazas.jsonl"), encoding="utf-8"))
+    print(f"📄 {lineas} líneas exportadas a trazas.jsonl")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+from bench_hibrido import corpus
+from servidor_fake_gemini import iniciar_servidor
+
+# Backends de embeddings (motor_embeddings.py) sobre los mismos --chunks chunks:
+#   - Gemini contra el servidor fake (--latencia por lote, límite de tasa del backend o --rps)
+#   - local: modelo ONNX en CPU (--modelo-local: carpeta con model.onnx + tokenizer.json o repo HF)
+#   chunks/s, tiempo de carga del modelo y pico de RSS, cada backend en su propio proceso.
+# Sin --modelo-local se genera un modelo ONNX SINTÉTICO con la forma de paraphrase-multilingual-MiniLM-L12
+# (vocabulario de 250k x 384, 12 capas y las mismas multiplicaciones por token, sin atención) y un
+# tokenizer WordPiece entrenado con el corpus: sirve para medir el coste en CPU, no la calidad.
+# Necesita el paquete `onnx` solo para generarlo. Después:
+#   - metadatos de la tabla (modelo y dimensión) y reconstrucción al cambiar de modelo
+#   - chunks que fallan: reintento por mitades frente a perder el lote entero
+#   python bench_modelos_embeddings.py --chunks 2000 --latencia 0.3
+
+
+def modelo_sintetico(carpeta: str, textos, capas: int = 12, dim: int = 384, filas_vocabulario: int = 250_002) -> str:
+    """model.onnx (input_ids, attention_mask, token_type_ids -> last_hidden_state) + tokenizer.json."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors, trainers
+
+    os.makedirs(carpeta, exist_ok=True)
+    tokenizer = Tokenizer(models.WordPiece(unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    # [PAD] el primero: id 0, el que usa enable_padding() por defecto
+    tokenizer.train_from_iterator(textos, trainers.WordPieceTrainer(
+        vocab_size=8000, special_tokens=["[PAD]", "[UNK]", "[CLS]", "[SEP]"]))
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        special_tokens=[("[CLS]", tokenizer.token_to_id("[CLS]")), ("[SEP]", tokenizer.token_to_id("[SEP]"))])
+    tokenizer.save(os.path.join(carpeta, "tokenizer.json"))
+
+    # Por token, MiniLM hace 4·d² (proyecciones de atención) + 8·d² (FFN) multiplicaciones por capa:
+    # aquí una FFN de 6·d da las mismas 12·d², con conexión residual
+    rnd = np.random.default_rng(0)
+    oculta = 6 * dim
+    filas = max(filas_vocabulario, tokenizer.get_vocab_size())
+    pesos = [numpy_helper.from_array((rnd.standard_normal((filas, dim)) * 0.1).astype(np.float32), "embeddings")]
+    nodos = [helper.make_node("Gather", ["embeddings", "input_ids"], ["h0"])]
+    for c in range(capas):
+        pesos += [
+            numpy_helper.from_array((rnd.standard_normal((dim, oculta)) / np.sqrt(dim)).astype(np.float32), f"w1_{c}"),
+            numpy_helper.from_array((rnd.standard_normal((oculta, dim)) / np.sqrt(oculta) * 0.3).astype(np.float32), f"w2_{c}"),
+        ]
+        nodos += [
+            helper.make_node("MatMul", [f"h{c}", f"w1_{c}"], [f"a{c}"]),
+            helper.make_node("Relu", [f"a{c}"], [f"r{c}"]),
+            helper.make_node("MatMul", [f"r{c}", f"w2_{c}"], [f"b{c}"]),
+            helper.make_node("Add", [f"h{c}", f"b{c}"], [f"h{c + 1}"]),
+        ]
+    nodos.append(helper.make_node("Identity", [f"h{capas}"], ["last_hidden_state"]))
+    entradas = [helper.make_tensor_value_info(n, TensorProto.INT64, ["lote", "tokens"])
+                for n in ("input_ids", "attention_mask", "token_type_ids")]
+    salida = helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["lote", "tokens", dim])
+    grafo = helper.make_graph(nodos, "minilm_sintetico", entradas, [salida], pesos)
+    modelo = helper.make_model(grafo, opset_imports=[helper.make_opsetid("", 17)])
+    modelo.ir_version = 8
+    onnx.save(modelo, os.path.join(carpeta, "model.onnx"))
+    return carpeta
+
+
+def pico_rss_mb() -> float:
+    """Pico de RSS de este proceso. ru_maxrss sobrevive a exec (heredaría el del padre); VmHWM no."""
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("VmHWM:")) / 1024
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir_backend(modelo: str, chunks: int, rps: float) -> dict:
+    """Proceso hijo: embeddings de todo el corpus con un backend, sin caché."""
+    from motor_embeddings import MotorEmbeddings
+
+    textos, _ = corpus(chunks)
+    motor = MotorEmbeddings(modelo=modelo, peticiones_por_segundo=rps or None)
+    rss_inicial = pico_rss_mb()
+    t0 = time.perf_counter()
+    motor.embed(textos[:1])  # Crea el cliente o carga el modelo
+    carga = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vectores = motor.embed(textos)
+    segundos = time.perf_counter() - t0
+    return {"chunks_s": len(textos) / segundos, "carga_ms": carga * 1000, "dim": len(vectores[0]),
+            "peticiones": motor.peticiones, "errores_cuota": motor.errores_cuota,
+            "rss_inicial_mb": rss_inicial, "pico_rss_mb": pico_rss_mb()}
+
+
+def fallos_aislados(chunks: int, rotos: int) -> tuple:
+    """(vectores guardados ahora, los que se guardarían si cada lote fallido se perdiera entero)."""
+    from motor_embeddings import MotorEmbeddings
+
+    textos, _ = corpus(chunks)
+    malos = set(range(0, chunks, max(1, chunks // rotos))[:rotos])
+    for i in malos:
+        textos[i] = "ROTO " + textos[i]
+
+    def embed_lote(lote):  # Un texto que la API rechaza hace fallar su lote entero
+        if any(t.startswith("ROTO") for t in lote):
+            raise ValueError("400 INVALID_ARGUMENT")
+        return [np.ones(8, dtype=np.float32) for _ in lote]
+
+    motor = MotorEmbeddings(embed_lote=embed_lote, max_reintentos=1, espera_base=0.001, peticiones_por_segundo=1e6)
+    vectores = motor.embed(textos, tolerante=True)
+    lotes_rotos = {i // motor.tam_lote for i in malos}
+    perdidos_antes = sum(len(textos[l * motor.tam_lote:(l + 1) * motor.tam_lote]) for l in lotes_rotos)
+    return sum(v is not None for v in vectores), chunks - perdidos_antes, motor.peticiones
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latencia", type=float, default=0.3, help="Segundos por lote de la API fake")
+    parser.add_argument("--rps", type=float, default=0, help="Peticiones/s a Gemini (0 = las del backend)")
+    parser.add_argument("--modelo-local", help="Carpeta o repo HF del modelo ONNX (por defecto, uno sintético)")
+    parser.add_argument("--indexar", type=int, default=500, help="Chunks de la prueba de metadatos de la tabla")
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:  # Proceso hijo: solo la medida de ese backend
+        print(json.dumps(medir_backend(args.backend, args.chunks, args.rps)))
+        return
+
+    servidor, url = iniciar_servidor(latencia=args.latencia)
+    tmp = tempfile.mkdtemp()
+    os.environ.update(GEMINI_BASE_URL=url, EMBEDDINGS_CACHE_PATH=os.path.join(tmp, "emb.sqlite"))
+    from motor_embeddings import MODELO_EMBEDDINGS, PREFIJO_LOCAL
+
+    carpeta = args.modelo_local
+    if carpeta is None:
+        t0 = time.perf_counter()
+        carpeta = modelo_sintetico(os.path.join(tmp, "minilm_sintetico"), corpus(5000)[0])
+        print(f"🧪 Modelo ONNX sintético en {carpeta} ({time.perf_counter() - t0:.1f}s): mide el coste en CPU, no la calidad")
+    modelos = [MODELO_EMBEDDINGS, PREFIJO_LOCAL + carpeta]
+
+    print(f"--- BACKENDS ({args.chunks} chunks, Gemini fake con {args.latencia * 1000:.0f} ms por lote) ---")
+    for modelo in modelos:
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--backend", modelo, "--chunks", str(args.chunks),
+             "--rps", str(args.rps)],
+            capture_output=True, text=True, check=True, env=dict(os.environ),
+        ).stdout
+        r = json.loads(salida.strip().splitlines()[-1])
+        nombre = "gemini" if modelo == MODELO_EMBEDDINGS else "local"
+        print(f"{nombre:>7}: {r['chunks_s']:8.1f} chunks/s | {r['dim']} dims | carga {r['carga_ms']:6.0f} ms | "
+              f"pico RSS {r['pico_rss_mb']:5.0f} MB (+{r['pico_rss_mb'] - r['rss_inicial_mb']:.0f} MB) | "
+              f"{r['peticiones']} lotes, {r['errores_cuota']} respuestas 429")
+
+    # La tabla sabe con qué modelo se indexó; el Retriever usa ese y el indexador reconstruye si cambia
+    from cache_embeddings import obtener_cache
+    from indexador_incremental import IndexadorIncremental
+    from servicio_retriever import Retriever
+    from troceado import Chunk
+
+    print(f"--- METADATOS DE LA TABLA ({args.indexar} chunks) ---")
+    textos, siglas = corpus(args.indexar)
+    fuente = os.path.join(tmp, "corpus.txt")
+    with open(fuente, "w", encoding="utf-8") as f:
+        f.write("\n".join(textos))
+    db_path = os.path.join(tmp, "lancedb_data")
+    for modelo in reversed(modelos):
+        indexador = IndexadorIncremental(db_path, obtener_cache(modelo=modelo), lote_ingesta=1024)
+        t0 = time.perf_counter()
+        indexador.indexar_fuente(fuente, (Chunk(t, 1, 0, len(t)) for t in textos))
+        segundos = time.perf_counter() - t0
+        metadatos = {k.decode(): v.decode() for k, v in (indexador.tabla().schema.metadata or {}).items()}
+        retriever = Retriever(db_path)
+        resultados = retriever.buscar(f"¿Qué se aprende en el curso {siglas[0]}?", k=3, modo="vector")
+        print(f"{metadatos} | indexado en {segundos:.1f}s | el Retriever embebe con "
+              f"{retriever.embedder.modelo} ({len(resultados)} resultados)")
+
+    print("--- CHUNKS QUE FALLAN ---")
+    rotos = 3
+    guardados, antes, peticiones = fallos_aislados(args.chunks, rotos)
+    print(f"{rotos} chunks rechazados por la API: {guardados}/{args.chunks} vectores guardados con reintento por "
+          f"mitades ({peticiones} peticiones) | {antes}/{args.chunks} si se pierde el lote entero (antes: a cero)")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+from indexador_incremental import huella_chunk
+from servicio_retriever import COLUMNAS, Resultado
+
+# Microbenchmark del coste posterior a la búsqueda:
+#   antes:  .to_pandas() + iterrows() leyendo row['text'] y row['_distance']
+#   ahora:  .select(COLUMNAS).to_arrow() + columnas -> Resultado (NamedTuple)
+# Se mide por consulta, con k=10 y k=100.
+
+
+def antes(tbl, q, k):
+    df = tbl.search(q).limit(k).to_pandas()
+    return [(row["text"], row["_distance"]) for _, row in df.iterrows()]
+
+
+def ahora(tbl, q, k):
+    t = tbl.search(q).limit(k).select(COLUMNAS).to_arrow()
+    return [
+        Resultado(*fila)
+        for fila in zip(
+            t.column("text").to_pylist(),
+            t.column("_distance").to_pylist(),
+            t.column("source").to_pylist(),
+            t.column("id").to_pylist(),
+        )
+    ]
+
+
+def medir(fn, tbl, consultas, k) -> float:
+    fn(tbl, consultas[0], k)  # Calentamiento
+    t0 = time.perf_counter()
+    for q in consultas:
+        fn(tbl, q, k)
+    return (time.perf_counter() - t0) / len(consultas) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vec = rng.normal(size=(args.filas, args.dim)).astype(np.float32)
+    datos = pa.table({
+        "vector": pa.FixedSizeListArray.from_arrays(pa.array(vec.ravel()), args.dim),
+        "text": pa.array([f"Fragmento {i} " + "texto de ejemplo " * 30 for i in range(args.filas)]),
+        "source": pa.array(["sintetico.pdf"] * args.filas),
+        "id": pa.array(np.arange(args.filas)),
+    })
+    datos = datos.append_column("chunk_hash", pa.array([huella_chunk(t) for t in datos.column("text").to_pylist()]))
+    consultas = list(rng.normal(size=(args.consultas, args.dim)).astype(np.float32))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tbl = lancedb.connect(tmp).create_table("documentos", data=datos)
+        print(f"--- COSTE POR CONSULTA ({args.filas} filas, {args.consultas} consultas) ---")
+        for k in (10, 100):
+            t_antes = medir(antes, tbl, consultas, k)
+            t_ahora = medir(ahora, tbl, consultas, k)
+            print(f"k={k:<4} pandas+iterrows: {t_antes:7.2f} ms | arrow+Resultado: {t_ahora:7.2f} ms "
+                  f"| ahorro {t_antes - t_ahora:6.2f} ms/consulta")
+
+
+if __name__ == "__main__":
+    main()
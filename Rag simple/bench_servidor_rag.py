@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+from indexador_incremental import huella_chunk
+from servidor_fake_gemini import iniciar_servidor, vector_falso
+
+# Benchmark de carga del servidor RAG asíncrono contra el fake de Gemini:
+# para cada nivel de concurrencia lanza N preguntas y mide latencia p50/p99 y QPS.
+# Con el bucle bloqueante de asistente_rag_completo el QPS sería ~1/latencia por pregunta.
+
+TEMAS = ["python", "agentes", "gemini", "lancedb", "embeddings", "langchain", "vectores", "prompts"]
+
+
+def crear_tabla(ruta: str, filas: int):
+    textos = [f"Fragmento {i} sobre {TEMAS[i % len(TEMAS)]} y {TEMAS[(i * 7) % len(TEMAS)]}" for i in range(filas)]
+    vectores = np.array([vector_falso(t) for t in textos], dtype=np.float32)
+    datos = pa.table({
+        "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectores.ravel()), vectores.shape[1]),
+        "text": pa.array(textos),
+        "source": pa.array(["sintetico.pdf"] * filas),
+        "id": pa.array(np.arange(filas)),
+        "chunk_hash": pa.array([huella_chunk(t) for t in textos]),
+    })
+    lancedb.connect(ruta).create_table("documentos", data=datos)
+
+
+async def preguntar(host: str, puerto: int, pregunta: str) -> int:
+    reader, writer = await asyncio.open_connection(host, puerto)
+    cuerpo = json.dumps({"pregunta": pregunta}).encode("utf-8")
+    writer.write(
+        f"POST /preguntar HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode("latin-1") + cuerpo
+    )
+    await writer.drain()
+    linea = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(linea.split()[1])
+
+
+async def carga(host: str, puerto: int, concurrencia: int, total: int, desfase: int):
+    latencias, errores = [], 0
+    cola = asyncio.Queue()
+    for i in range(total):
+        cola.put_nowait(f"¿Qué dice el documento sobre {TEMAS[i % len(TEMAS)]}? (pregunta {desfase + i})")
+
+    async def trabajador():
+        nonlocal errores
+        while not cola.empty():
+            pregunta = cola.get_nowait()
+            t = time.perf_counter()
+            codigo = await preguntar(host, puerto, pregunta)
+            latencias.append(time.perf_counter() - t)
+            errores += codigo != 200
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return latencias, errores, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=2_000)
+    parser.add_argument("--preguntas", type=int, default=200, help="Preguntas por nivel de concurrencia")
+    parser.add_argument("--concurrencias", default="1,4,16,64")
+    parser.add_argument("--max-llm", type=int, default=16)
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latencia del fake por llamada")
+    parser.add_argument("--retardo-token", type=float, default=0.005)
+    args = parser.parse_args()
+
+    fake, url = iniciar_servidor(latencia=args.latencia, retardo_token=args.retardo_token)
+    tmp = tempfile.mkdtemp()
+    os.environ["GEMINI_BASE_URL"] = url
+    os.environ["EMBEDDINGS_CACHE_PATH"] = os.path.join(tmp, "emb.sqlite")
+    os.environ["RESPUESTAS_CACHE_PATH"] = os.path.join(tmp, "resp.sqlite")
+    db_path = os.path.join(tmp, "lancedb_data")
+    crear_tabla(db_path, args.filas)
+
+    from motor_embeddings import TokenBucket
+    from servidor_rag_async import ServidorRAG  # Tras fijar las variables: el cliente apunta al fake
+
+    # Sin caché de respuestas: cada pregunta debe pasar por las tres etapas
+    servidor = ServidorRAG(db_path, max_llm=args.max_llm, usar_cache_respuestas=False)
+    # El fake no tiene cuota: que el limitador de embeddings (5 rps por defecto) no sea el cuello de botella
+    servidor.embedder.motor.bucket = TokenBucket(1_000)
+    host = "127.0.0.1"
+    listo = threading.Event()
+
+    def arrancar():
+        async def _servir():
+            evento = asyncio.Event()
+            tarea = asyncio.create_task(servidor.servir(host, 0, evento))  # Puerto libre cualquiera
+            await evento.wait()
+            listo.set()
+            await tarea
+
+        asyncio.run(_servir())
+
+    threading.Thread(target=arrancar, daemon=True).start()
+    listo.wait()
+    puerto = servidor.puerto
+
+    print(f"--- SERVIDOR RAG ASYNC ({args.preguntas} preguntas/nivel, máx {args.max_llm} llamadas LLM) ---")
+    desfase = 0
+    for concurrencia in (int(c) for c in args.concurrencias.split(",")):
+        latencias, errores, segundos = asyncio.run(carga(host, puerto, concurrencia, args.preguntas, desfase))
+        desfase += args.preguntas
+        p50, p99 = np.percentile(latencias, [50, 99]) * 1000
+        print(f"concurrencia {concurrencia:>3}: p50 {p50:7.0f} ms | p99 {p99:7.0f} ms | "
+              f"{len(latencias) / segundos:6.1f} QPS | errores {errores}")
+    fake.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import argparse
+import tempfile
+
+from servidor_fake_gemini import iniciar_servidor
+
+# Tiempo hasta el primer token (TTFT) y tiempo total: generar_respuesta (bloqueante)
+# vs generar_respuesta_stream, contra el servidor fake con un retardo configurable por token.
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--retardo-token", type=float, default=0.03)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--turnos", type=int, default=5)
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(latencia=0.1, retardo_token=args.retardo_token, tokens_respuesta=args.tokens)
+    os.environ["GEMINI_BASE_URL"] = url
+    tmp = tempfile.mkdtemp()
+    os.environ["EMBEDDINGS_CACHE_PATH"] = os.path.join(tmp, "emb.sqlite")
+    os.environ["RESPUESTAS_CACHE_PATH"] = os.path.join(tmp, "resp.sqlite")
+    import asistente_rag_completo as rag  # Tras fijar las variables: el cliente apunta al fake
+
+    from streaming import MedidorTurno
+
+    contexto = "Fragmento 0: " + "Python y Gemini para agentes de IA. " * 50
+    print(f"--- STREAMING vs BLOQUEANTE ({args.tokens} tokens, {args.retardo_token * 1000:.0f} ms/token) ---")
+    for modo in ("bloqueante", "streaming"):
+        ttfts, totales = [], []
+        for i in range(args.turnos):
+            medidor = MedidorTurno()
+            if modo == "bloqueante":
+                rag.generar_respuesta(f"pregunta {i}", contexto)
+                medidor.token()
+            else:
+                for _ in rag.generar_respuesta_stream(f"pregunta {i}", contexto):
+                    medidor.token()
+            medidor.terminar()
+            ttfts.append(medidor.ttft)
+            totales.append(medidor.total)
+        print(f"{modo:>10}: TTFT medio {sum(ttfts) / len(ttfts) * 1000:7.0f} ms | "
+              f"total medio {sum(totales) / len(totales) * 1000:7.0f} ms")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
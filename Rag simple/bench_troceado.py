@@ -0,0 +1,124 @@
+import os
+import re
+import time
+import random
+import argparse
+import tempfile
+
+import lancedb
+
+from bench_ingesta import EmbedderFalso, _escapar
+from servidor_fake_gemini import vector_falso
+from troceado import ESTRATEGIAS
+
+# Compara las estrategias de troceado sobre un PDF sintético con secciones (títulos en fuente
+# grande) y una frase "dato" por sección escondida entre frases de relleno:
+#   - chunks por documento (= llamadas de embedding y filas en la tabla)
+#   - hit-rate@k: la pregunta recupera, entre los k primeros, un chunk que contiene la frase dato completa
+# Con troceado fijo la frase dato suele quedar partida entre dos chunks.
+
+TEMAS = ["python", "langchain", "lancedb", "gemini", "agentes", "embeddings", "prompts", "evaluacion",
+         "vectores", "memoria", "herramientas", "despliegue", "seguridad", "datos", "metricas", "costes"]
+RELLENO = ("el curso explica como usar modelos de lenguaje en proyectos reales con ejemplos practicos "
+           "y ejercicios guiados sobre cada modulo del temario para afianzar los conceptos vistos").split()
+
+
+def pseudopalabra(rnd: random.Random) -> str:
+    return "".join(rnd.choice("bcdfglmnprstvz") + rnd.choice("aeiou") for _ in range(3))
+
+
+def generar_pdf_secciones(ruta: str, secciones: int, frases: int = 12, semilla: int = 0) -> list:
+    """PDF con título (15 pt) + cuerpo (10 pt) por sección. Devuelve [(pregunta, frase_dato)]."""
+    rnd = random.Random(semilla)
+    datos, lineas = [], []
+    for s in range(secciones):
+        tema = f"{TEMAS[s % len(TEMAS)]}{s // len(TEMAS) or ''}"
+        herramienta, tecnica = pseudopalabra(rnd), pseudopalabra(rnd)
+        cuerpo = [" ".join(rnd.choice(RELLENO) for _ in range(rnd.randint(8, 16))).capitalize() + "."
+                  for _ in range(frases)]
+        dato = f"En el modulo {tema} se usa la herramienta {herramienta} junto a la tecnica {tecnica} para el proyecto."
+        cuerpo.insert(rnd.randint(1, frases - 1), dato)
+        # Solo palabras clave: el embedding falso es léxico y sin IDF, las palabras vacías meten ruido
+        datos.append((f"herramienta {herramienta} tecnica {tecnica} modulo {tema}", dato))
+        lineas.append((15, f"{s + 1}. Modulo {tema}"))
+        texto, linea = " ".join(cuerpo), ""
+        for palabra in texto.split():  # Ajuste de línea a ~90 caracteres, como un PDF real
+            if len(linea) + len(palabra) > 90:
+                lineas.append((10, linea))
+                linea = ""
+            linea = f"{linea} {palabra}".strip()
+        lineas.append((10, linea))
+
+    paginas, actual, y = [], [], 800
+    for tamano, texto in lineas:
+        if y < 60:
+            paginas.append(actual)
+            actual, y = [], 800
+        actual.append(f"BT /F1 {tamano} Tf 40 {y} Td ({_escapar(texto)}) Tj ET")
+        y -= tamano + 4
+    paginas.append(actual)
+
+    offsets = []
+    with open(ruta, "wb") as f:
+        def objeto(num: int, cuerpo: bytes):
+            offsets.append((num, f.tell()))
+            f.write(f"{num} 0 obj\n".encode() + cuerpo + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(paginas)))
+        objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        objeto(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(paginas)} >>".encode())
+        objeto(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for p, contenido in enumerate(paginas):
+            stream = "\n".join(contenido).encode("latin-1")
+            objeto(4 + 2 * p, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                               f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * p} 0 R >>").encode())
+            objeto(5 + 2 * p, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+        inicio_xref = f.tell()
+        total = 3 + 2 * len(paginas)
+        f.write(f"xref\n0 {total + 1}\n0000000000 65535 f \n".encode())
+        for _, off in sorted(offsets):
+            f.write(f"{off:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {total + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode())
+    return datos
+
+
+def _normalizar(texto: str) -> str:
+    return re.sub(r"\s+", " ", texto)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--secciones", type=int, default=60)
+    parser.add_argument("--ks", default="1,3,5,10")
+    args = parser.parse_args()
+    ks = [int(k) for k in args.ks.split(",")]
+
+    from indexador_incremental import IndexadorIncremental
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "curso.pdf")
+        datos = generar_pdf_secciones(pdf, args.secciones)
+        print(f"--- TROCEADO ({args.secciones} secciones, {len(datos)} preguntas) ---")
+        for estrategia in ESTRATEGIAS:
+            db_path = os.path.join(tmp, f"db_{estrategia}")
+            t0 = time.perf_counter()
+            indexador = IndexadorIncremental(db_path, EmbedderFalso(), estrategia=estrategia)
+            indexador.indexar([pdf])
+            segundos = time.perf_counter() - t0
+            tbl = lancedb.connect(db_path).open_table("documentos")
+            n_chunks = tbl.count_rows()
+
+            aciertos = {k: 0 for k in ks}
+            for pregunta, dato in datos:
+                resultado = tbl.search(vector_falso(pregunta)).limit(max(ks)).select(["text", "_distance"]).to_arrow()
+                textos = resultado.column("text").to_pylist()
+                posicion = next((i for i, t in enumerate(textos) if dato in _normalizar(t)), None)
+                for k in ks:
+                    aciertos[k] += posicion is not None and posicion < k
+            hits = " | ".join(f"hit@{k} {aciertos[k] / len(datos):5.1%}" for k in ks)
+            print(f"{estrategia:>8}: {n_chunks:5d} chunks ({segundos:5.2f}s) | {hits}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,17 @@
 import os
+import sys
 import time
 import shutil
-import lancedb
-from typing import List
 from dotenv import load_dotenv
-from google import genai
-from pypdf import PdfReader
+from motor_embeddings import crear_cliente_genai
+from cache_embeddings import obtener_cache
+from colecciones import COLECCION_POR_DEFECTO, obtener_registro
 
 # 1. Configuración
 load_dotenv()
-client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+client = crear_cliente_genai()
 
 # --- UTILIDADES ---
-def sanitize_vector(vector_data) -> List[float]:
-    """Asegura que los datos sean floats puros de Python."""
-    return [float(x) for x in vector_data]
-
 def reset_db_folder(path: str):
     if os.path.exists(path):
         try:
@@ -25,77 +21,49 @@ def reset_db_folder(path: str):
         except Exception as e:
             print(f"⚠️ Aviso: {e}")
 
-# --- FASE 1: GENERACIÓN (Igual que antes) ---
-def generar_vectores(chunks: List[str]) -> List[List[float]]:
-    vectors = []
-    print(f"⚡ Generando vectores para {len(chunks)} fragmentos...")
-    
-    for i, text in enumerate(chunks):
-        try:
-            time.sleep(1.0) # Throttling API
-            result = client.models.embed_content(
-                model="text-embedding-004",
-                contents=text
-            )
-            vec = sanitize_vector(result.embeddings[0].values)
-            vectors.append(vec)
-            
-            if i % 10 == 0:
-                print(f"   ✓ {i} procesados...")
-        except Exception as e:
-            print(f"   ❌ Error en {i}: {e}")
-            vectors.append([0.0] * 768)
-    return vectors
+# --- GENERACIÓN: lotes concurrentes + caché persistente de embeddings (la usa el indexador) ---
+cache = obtener_cache(client)
 
 # --- MAIN ---
 def main():
-    db_path = "./lancedb_data" # Carpeta local donde se guardarán los datos
-    
-    print("--- INICIANDO MIGRACIÓN A LANCEDB (RUST ENGINE) ---")
-    reset_db_folder(db_path)
-    
-    # 1. Conexión a DB (Serverless, solo una carpeta)
-    db = lancedb.connect(db_path)
+    db_path = os.getenv("LANCEDB_PATH", "./lancedb_data") # Carpeta local donde se guardarán los datos
     
-    # 2. Leer PDF
-    pdf_file = "Los Mejores Cursos de IA para 2026 - by Daniel.pdf"
-    if not os.path.exists(pdf_file):
-        print("❌ Falta PDF.")
+    print("--- INDEXADOR INCREMENTAL LANCEDB (RUST ENGINE) ---")
+    # Uso: python buscador_lancedb.py [--reset] [--coleccion nombre] [pdf1 pdf2 ...]
+    args = sys.argv[1:]
+    coleccion = COLECCION_POR_DEFECTO
+    if "--coleccion" in args:
+        i = args.index("--coleccion")
+        coleccion = args[i + 1]
+        del args[i:i + 2]
+    if "--reset" in args:
+        args.remove("--reset")
+        registro = obtener_registro(db_path)
+        if coleccion == COLECCION_POR_DEFECTO and not registro.colecciones:
+            reset_db_folder(db_path)
+        elif coleccion in registro.listar():
+            registro.eliminar(coleccion)  # Solo esa colección; las de otros clientes no se tocan
+    pdf_files = args or ["Los Mejores Cursos de IA para 2026 - by Daniel.pdf"]
+
+    faltan = [p for p in pdf_files if not os.path.exists(p)]
+    if faltan:
+        print(f"❌ Falta PDF: {', '.join(faltan)}")
         return
 
-    reader = PdfReader(pdf_file)
-    full_text = ""
-    for page in reader.pages:
-        full_text += page.extract_text() or ""
-        
-    chunk_size = 500
-    chunks = [full_text[i:i+chunk_size] for i in range(0, len(full_text), chunk_size)]
-    print(f"📚 {len(chunks)} chunks detectados.")
+    # 1. Conexión a DB (Serverless, solo una carpeta) + estado del último indexado de la colección
+    registro = obtener_registro(db_path)
+    indexador = registro.indexador(coleccion, cache)
 
-    # 3. Vectorización (Compute)
-    vectors = generar_vectores(chunks)
+    # 2-4. Solo se leen los PDFs modificados y solo se embeden sus chunks nuevos
+    resumen = indexador.indexar(pdf_files)
+    print(f"✅ Índice sincronizado: {resumen}")
+    print(f"📦 Caché de embeddings ({cache.modelo}): {cache.estadisticas()}")
 
-    # 4. Ingestión (Storage)
-    print("\n💾 Guardando en LanceDB...")
-    
-    # Preparamos los datos como una lista de diccionarios (Formato NoSQL)
-    data = []
-    for i in range(len(chunks)):
-        data.append({
-            "vector": vectors[i],
-            "text": chunks[i],
-            "source": pdf_file,
-            "id": i
-        })
-    
-    # CREACIÓN DE LA TABLA
-    # LanceDB infiere el esquema automáticamente (vector size, tipos, etc.)
-    try:
-        tbl = db.create_table("documentos", data=data)
-        print("✅ ¡TABLA CREADA Y DATOS PERSISTIDOS!")
-    except Exception as e:
-        print(f"❌ Error creando tabla: {e}")
+    if indexador.tabla() is None:
+        print("❌ La tabla está vacía.")
         return
+    # Misma ruta de búsqueda que el asistente y los agentes (índice ANN + nprobes/refine_factor)
+    retriever = registro.vista(coleccion)
 
     # 5. Bucle de Búsqueda
     while True:
@@ -103,23 +71,16 @@ def main():
         if query.lower() in ['salir', 'exit']:
             break
         
-        # Embed Query
-        q_res = client.models.embed_content(
-            model="text-embedding-004",
-            contents=query
-        )
-        q_vec = sanitize_vector(q_res.embeddings[0].values)
-        
-        # Search Query (Sintaxis Fluida)
-        # .search(vector) -> .limit(3) -> .to_pandas()
-        results_df = tbl.search(q_vec).limit(3).to_pandas()
+        # Embed Query + Search Query (Sintaxis Fluida)
+        # .search(vector) -> .limit(3) [-> .nprobes() -> .refine_factor()]
+        results = retriever.buscar(query, k=3)
         
-        # Iterar resultados (ahora es un DataFrame de Pandas, muy cómodo)
-        for index, row in results_df.iterrows():
-            # LanceDB devuelve una columna '_distance' automáticamente
-            dist = row['_distance'] 
-            print(f"\n--- RESULTADO (Dist: {dist:.4f}) ---")
-            print(f"📜 ...{row['text'][:200]}...")
+        # Iterar resultados
+        for row in results:
+            # LanceDB devuelve una columna '_distance' automáticamente (Resultado.distancia);
+            # en modo texto no hay distancia y se muestra la puntuación BM25
+            print(f"\n--- RESULTADO ({row.relevancia()}) ---")
+            print(f"📜 ...{row.text[:200]}...")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,211 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from instrumentacion import contador
+from motor_embeddings import MODELO_POR_DEFECTO, MotorEmbeddings, Vector
+
+# Capa única de embeddings para todos los scripts.
+#   clave = sha256(modelo + texto normalizado)   (cada modelo/backend tiene sus propias entradas)
+#   1º LRU en memoria (dict ordenado) -> 2º SQLite en disco -> 3º API (MotorEmbeddings)
+# Así, reindexar el mismo PDF o repetir una pregunta no vuelve a pagar la llamada a Gemini.
+# Los vectores se guardan como float32 (BLOB de dim*4 bytes) y se devuelven como np.ndarray
+# de solo lectura: la caché los comparte entre llamadas, nadie debe modificarlos en sitio.
+
+RUTA_CACHE = os.getenv(
+    "EMBEDDINGS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "embeddings_cache.sqlite"),
+)
+
+
+def normalizar_texto(texto: str) -> str:
+    """Unicode NFC + espacios colapsados: dos textos que solo difieren en espacios comparten clave."""
+    return " ".join(unicodedata.normalize("NFC", texto).split())
+
+
+class CacheEmbeddings:
+    def __init__(
+        self,
+        motor: Optional[MotorEmbeddings] = None,
+        ruta: str = RUTA_CACHE,
+        modelo: Optional[str] = None,
+        max_memoria: int = 10_000,
+        max_disco: int = 500_000,
+    ):
+        self.motor = motor or MotorEmbeddings(modelo=modelo)
+        self.modelo = self.motor.modelo
+        self.max_memoria = max_memoria
+        self.max_disco = max_disco
+        self._memoria: "OrderedDict[str, Vector]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+
+        # WAL permite que varios procesos (indexador, asistente, agentes) lean a la vez
+        self._db = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " clave TEXT PRIMARY KEY, modelo TEXT, vector BLOB, ultimo_acceso REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_acceso ON embeddings(ultimo_acceso)")
+        self._db.commit()
+        # Filas estimadas: se cuenta de verdad (COUNT(*) recorre la tabla) solo al pasar de max_disco.
+        # Es una cota superior de lo insertado por este proceso (los REPLACE también suman).
+        self._filas_disco = self._contar_disco()
+
+    def clave(self, texto: str) -> str:
+        return hashlib.sha256(f"{self.modelo}\0{normalizar_texto(texto)}".encode("utf-8")).hexdigest()
+
+    def _recordar(self, clave: str, vector: Vector):
+        self._memoria[clave] = vector
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _leer_disco(self, claves: List[str]) -> dict:
+        encontrados = {}
+        for i in range(0, len(claves), 500):
+            bloque = claves[i:i + 500]
+            marcas = ",".join("?" * len(bloque))
+            filas = self._db.execute(
+                f"SELECT clave, vector FROM embeddings WHERE clave IN ({marcas})", bloque
+            ).fetchall()
+            for clave, blob in filas:
+                encontrados[clave] = np.frombuffer(blob, dtype=np.float32)
+        if encontrados:
+            ahora = time.time()
+            self._db.executemany(
+                "UPDATE embeddings SET ultimo_acceso = ? WHERE clave = ?",
+                [(ahora, c) for c in encontrados],
+            )
+            self._db.commit()
+        return encontrados
+
+    def _contar_disco(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _guardar_disco(self, nuevos: dict):
+        ahora = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (clave, modelo, vector, ultimo_acceso) VALUES (?, ?, ?, ?)",
+            [(c, self.modelo, v.tobytes(), ahora) for c, v in nuevos.items()],
+        )
+        self._filas_disco += len(nuevos)
+        if self._filas_disco > self.max_disco:
+            total = self._contar_disco()
+            if total > self.max_disco:
+                # Expulsamos los menos usados hasta quedar al 90% para no purgar en cada inserción
+                sobrantes = total - int(self.max_disco * 0.9)
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE clave IN "
+                    "(SELECT clave FROM embeddings ORDER BY ultimo_acceso LIMIT ?)",
+                    (sobrantes,),
+                )
+                total -= sobrantes
+            self._filas_disco = total
+        self._db.commit()
+
+    def _buscar_en_caches(self, claves: List[str]) -> dict:
+        """Memoria y después disco; nunca llama a la API."""
+        resultado: dict = {}
+        with self._lock:
+            pendientes = []
+            for c in claves:
+                if c in resultado:
+                    continue
+                if c in self._memoria:
+                    self._memoria.move_to_end(c)
+                    resultado[c] = self._memoria[c]
+                    self.hits_memoria += 1
+                else:
+                    pendientes.append(c)
+            if pendientes:
+                del_disco = self._leer_disco(list(dict.fromkeys(pendientes)))
+                for c, v in del_disco.items():
+                    self._recordar(c, v)
+                    resultado[c] = v
+                self.hits_disco += len(del_disco)
+        return resultado
+
+    def buscar_cacheados(self, textos: Sequence[str]) -> List[Optional[Vector]]:
+        """Solo lo que ya está en caché (None si no): p.ej. para re-puntuar con el vector exacto."""
+        claves = [self.clave(t) for t in textos]
+        resultado = self._buscar_en_caches(claves)
+        return [resultado.get(c) for c in claves]
+
+    def embed(
+        self,
+        textos: Sequence[str],
+        tolerante: bool = False,
+        progreso: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Optional[Vector]]:
+        """Mismo contrato que MotorEmbeddings.embed, pero solo llama a la API para los textos no vistos."""
+        claves = [self.clave(t) for t in textos]
+        resultado = self._buscar_en_caches(claves)
+
+        # Textos únicos que no están en ninguna caché -> API
+        faltan = {}
+        for c, t in zip(claves, textos):
+            if c not in resultado and c not in faltan:
+                faltan[c] = t
+        # Claves únicas: un texto repetido en la misma llamada no cuenta como acierto
+        contador("embeddings.cache_hits", len(set(claves)) - len(faltan))
+        if faltan:
+            contador("embeddings.cache_misses", len(faltan))
+            vectores = self.motor.embed(list(faltan.values()), tolerante=tolerante, progreso=progreso)
+            nuevos = {c: np.asarray(v, dtype=np.float32) for c, v in zip(faltan, vectores) if v is not None}
+            for v in nuevos.values():
+                v.flags.writeable = False
+            with self._lock:
+                self.misses += len(faltan)
+                for c, v in nuevos.items():
+                    self._recordar(c, v)
+                if nuevos:
+                    self._guardar_disco(nuevos)
+            resultado.update(nuevos)
+
+        return [resultado.get(c) for c in claves]
+
+    def embed_uno(self, texto: str) -> Vector:
+        return self.embed([texto])[0]
+
+    def estadisticas(self) -> dict:
+        total = self.hits_memoria + self.hits_disco + self.misses
+        return {
+            "hits_memoria": self.hits_memoria,
+            "hits_disco": self.hits_disco,
+            "misses": self.misses,
+            "tasa_acierto": (self.hits_memoria + self.hits_disco) / total if total else 0.0,
+        }
+
+
+_caches: Dict[str, CacheEmbeddings] = {}
+_cache_lock = threading.Lock()
+
+
+def obtener_cache(client=None, modelo: Optional[str] = None) -> CacheEmbeddings:
+    """
+    Instancia compartida por todo el proceso para cada modelo (EMBEDDINGS_MODELO por defecto).
+    Se crea en el primer uso y adopta el primer `client` de Gemini que reciba.
+    """
+    modelo = modelo or MODELO_POR_DEFECTO  # Es también el nombre del backend (motor.modelo)
+    with _cache_lock:
+        cache = _caches.get(modelo)
+        if cache is None:
+            cache = _caches[modelo] = CacheEmbeddings(motor=MotorEmbeddings(client=client, modelo=modelo))
+        elif client is not None and cache.motor.client is None:
+            cache.motor.client = client
+        return cache
+
+
+def embed_texto(texto: str) -> Vector:
+    return obtener_cache().embed_uno(texto)
@@ -0,0 +1,142 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# Caché semántica de respuestas del LLM.
+# Una respuesta se reutiliza si:
+#   1. se recuperaron exactamente los mismos chunks (hash de sus IDs, que incluyen el sha256 de su texto), y
+#   2. la pregunta es casi igual (similitud coseno del embedding >= umbral).
+# Con TTL (las respuestas caducan) y LRU (tamaño acotado). Persistida en SQLite.
+
+RUTA_CACHE = os.getenv(
+    "RESPUESTAS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "respuestas_cache.sqlite"),
+)
+
+
+def _normalizar(vec: Sequence[float]) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    return v / (float(np.linalg.norm(v)) or 1.0)
+
+
+def ids_contexto(resultados) -> List[str]:
+    """
+    Ids de los chunks recuperados (Resultado de servicio_retriever) para la clave de la caché.
+    Llevan la huella del texto (si se reindexa y cambia, la respuesta deja de valer) y la colección:
+    dos clientes con un PDF del mismo nombre nunca comparten respuestas cacheadas.
+    """
+    return [f"{r.coleccion}/{r.source}#{r.chunk_hash}" if r.coleccion else f"{r.source}#{r.chunk_hash}"
+            for r in resultados]
+
+
+def hash_contexto(ids_chunks: Sequence[str]) -> str:
+    """`ids_chunks` deben cambiar si cambia el texto del chunk: los de ids_contexto."""
+    return hashlib.sha256("\n".join(sorted(ids_chunks)).encode("utf-8")).hexdigest()
+
+
+class _Entrada(NamedTuple):
+    ctx_hash: str
+    vector: np.ndarray  # float32 normalizado: el coseno es un producto escalar
+    respuesta: str
+    creado: float
+    latencia: float
+
+
+class CacheRespuestas:
+    def __init__(
+        self,
+        ruta: str = RUTA_CACHE,
+        umbral: float = 0.95,
+        ttl: float = 24 * 3600,
+        max_entradas: int = 2_000,
+    ):
+        self.umbral = umbral
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[int, _Entrada]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.segundos_ahorrados = 0.0
+
+        self._db = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            " id INTEGER PRIMARY KEY, ctx_hash TEXT, vector BLOB, respuesta TEXT,"
+            " creado REAL, ultimo_acceso REAL, latencia REAL)"
+        )
+        self._db.execute("DELETE FROM respuestas WHERE creado < ?", (time.time() - ttl,))
+        self._db.commit()
+        filas = self._db.execute(
+            "SELECT id, ctx_hash, vector, respuesta, creado, latencia FROM respuestas "
+            "ORDER BY ultimo_acceso DESC LIMIT ?", (max_entradas,)
+        ).fetchall()
+        for id_, ctx_hash, blob, respuesta, creado, latencia in reversed(filas):
+            vec = np.frombuffer(blob, dtype=np.float32)
+            self._entradas[id_] = _Entrada(ctx_hash, vec, respuesta, creado, latencia)
+
+    def buscar(self, q_vec: Sequence[float], ids_chunks: Sequence[str]) -> Optional[str]:
+        ctx_hash = hash_contexto(ids_chunks)
+        q = _normalizar(q_vec)
+        ahora = time.time()
+        with self._lock:
+            mejor_id, mejor_sim = None, self.umbral
+            caducadas = []
+            for id_, e in self._entradas.items():
+                if ahora - e.creado > self.ttl:
+                    caducadas.append(id_)
+                    continue
+                if e.ctx_hash != ctx_hash:
+                    continue
+                sim = float(q @ e.vector)
+                if sim >= mejor_sim:
+                    mejor_id, mejor_sim = id_, sim
+            for id_ in caducadas:
+                self._borrar(id_)
+            if caducadas:
+                self._db.commit()
+
+            if mejor_id is None:
+                self.misses += 1
+                return None
+            entrada = self._entradas[mejor_id]
+            self._entradas.move_to_end(mejor_id)
+            self.hits += 1
+            self.segundos_ahorrados += entrada.latencia
+            self._db.execute("UPDATE respuestas SET ultimo_acceso = ? WHERE id = ?", (ahora, mejor_id))
+            self._db.commit()
+            return entrada.respuesta
+
+    def guardar(self, q_vec: Sequence[float], ids_chunks: Sequence[str], respuesta: str, latencia: float):
+        """`latencia` es lo que costó generar la respuesta: es lo que se ahorra en cada hit."""
+        entrada = _Entrada(hash_contexto(ids_chunks), _normalizar(q_vec), respuesta, time.time(), latencia)
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO respuestas (ctx_hash, vector, respuesta, creado, ultimo_acceso, latencia) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entrada.ctx_hash, entrada.vector.tobytes(), respuesta,
+                 entrada.creado, entrada.creado, latencia),
+            )
+            self._entradas[cur.lastrowid] = entrada
+            while len(self._entradas) > self.max_entradas:
+                self._borrar(next(iter(self._entradas)))
+            self._db.commit()
+
+    def _borrar(self, id_: int):
+        self._entradas.pop(id_, None)
+        self._db.execute("DELETE FROM respuestas WHERE id = ?", (id_,))
+
+    def estadisticas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "tasa_acierto": self.hits / total if total else 0.0,
+            "segundos_ahorrados": round(self.segundos_ahorrados, 2),
+        }
@@ -0,0 +1,358 @@
+import os
+import re
+import json
+import time
+import heapq
+import argparse
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from almacenamiento_vectores import TIPOS_VECTOR
+from instrumentacion import contador, span
+from motor_embeddings import modelo_de
+from servicio_retriever import TABLA, Resultado, Retriever, fusion_rrf, localizar_db
+from troceado import ESTRATEGIAS
+
+# Base de conocimiento multi-cliente: colecciones con nombre dentro de la misma carpeta LanceDB,
+# cada una con su tabla y sus ajustes de indexado y búsqueda (registro en _colecciones.json).
+#   - Las tablas se abren al primer uso y solo quedan abiertas las COLECCIONES_ABIERTAS usadas más
+#     recientemente (LRU de Retrievers sobre una única conexión): con cientos de colecciones la
+#     memoria depende de las que están en uso, no de cuántas hay.
+#   - buscar() acepta una colección o varias: con varias, la pregunta se embede una sola vez por modelo
+#     de embeddings (lo normal: uno para todas) y cada colección se consulta en paralelo. La fusión es
+#     global, como la híbrida de una sola tabla: candidatos por vector ordenados por distancia L2
+#     (solo comparable entre colecciones del mismo modelo), candidatos
+#     de texto por su puntuación BM25, y las dos listas combinadas con RRF. No se intercalan los top-k
+#     de cada colección por posición: una colección sin nada relevante no cuela su "mejor" resultado.
+#   - La colección "documentos" es la tabla de siempre: lo indexado antes sigue funcionando sin registrar nada.
+# Uso:
+#   python colecciones.py crear cliente_a --tipo-vector int8 --troceado titulos
+#   python colecciones.py listar
+#   python colecciones.py buscar "qué es RAG" --colecciones cliente_a,cliente_b
+#   LANCEDB_COLECCION=cliente_a,cliente_b python asistente_rag_completo.py
+
+REGISTRO = "_colecciones.json"
+COLECCION_POR_DEFECTO = TABLA
+COLECCIONES_ABIERTAS = int(os.getenv("LANCEDB_COLECCIONES_ABIERTAS", "32"))
+BUSQUEDAS_PARALELAS = int(os.getenv("LANCEDB_BUSQUEDAS_PARALELAS", "8"))
+AJUSTES_INDEXADOR = ("tipo_vector", "estrategia", "umbral_indice", "idioma_fts")
+AJUSTES_RETRIEVER = ("modo", "nprobes", "refine_factor", "reescorado")
+MODOS = ("vector", "texto", "hibrido")
+_NOMBRE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")  # Vale como nombre de tabla y de fichero
+
+
+def nombres_de(colecciones: Union[str, Sequence[str]]) -> List[str]:
+    """'a,b' o ['a', 'b'] -> ['a', 'b'] (sin repetidos, en orden)."""
+    if isinstance(colecciones, str):
+        colecciones = colecciones.split(",")
+    return list(dict.fromkeys(c.strip() for c in colecciones if c.strip()))
+
+
+def fusionar(por_vector: Sequence[Sequence[Resultado]], por_texto: Sequence[Sequence[Resultado]],
+             k: int, candidatos: int) -> List[Resultado]:
+    """
+    Top-k global a partir de los candidatos de cada colección: los `candidatos` más cercanos por vector
+    y los de mayor BM25 por texto, fusionados con RRF (o solo la rama que haya).
+    """
+    vector = heapq.nsmallest(candidatos, (r for lista in por_vector for r in lista), key=lambda r: r.distancia)
+    texto = heapq.nlargest(candidatos, (r for lista in por_texto for r in lista), key=lambda r: r.puntuacion or 0.0)
+    if not texto:
+        return vector[:k]
+    if not vector:
+        return texto[:k]
+    return fusion_rrf([vector, texto], k)
+
+
+def _validar_ajustes(ajustes: dict):
+    desconocidos = set(ajustes) - set(AJUSTES_INDEXADOR) - set(AJUSTES_RETRIEVER)
+    if desconocidos:
+        raise ValueError(f"Ajustes desconocidos: {', '.join(sorted(desconocidos))}")
+    if ajustes.get("tipo_vector", TIPOS_VECTOR[0]) not in TIPOS_VECTOR:
+        raise ValueError(f"Tipo de vector no soportado: {ajustes['tipo_vector']} (opciones: {', '.join(TIPOS_VECTOR)})")
+    if ajustes.get("estrategia", "frases") not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia de troceado desconocida: {ajustes['estrategia']} "
+                         f"(opciones: {', '.join(ESTRATEGIAS)})")
+    if ajustes.get("modo", "hibrido") not in MODOS:
+        raise ValueError(f"Modo de búsqueda desconocido: {ajustes['modo']} (opciones: {', '.join(MODOS)})")
+
+
+class RegistroColecciones:
+    """Colecciones de una carpeta LanceDB: alta/baja, indexadores y búsqueda con LRU de tablas abiertas."""
+
+    def __init__(self, db_path: str, max_abiertas: int = COLECCIONES_ABIERTAS,
+                 paralelas: int = BUSQUEDAS_PARALELAS):
+        self.db_path = db_path
+        self.max_abiertas = max_abiertas
+        self.paralelas = paralelas
+        self.ruta = os.path.join(db_path, REGISTRO)
+        self.colecciones = self._cargar()
+        self._abiertas: "OrderedDict[str, Retriever]" = OrderedDict()
+        self._db = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # --- Registro persistente ---
+    def _cargar(self) -> Dict[str, dict]:
+        if os.path.exists(self.ruta):
+            with open(self.ruta, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _guardar(self):
+        os.makedirs(self.db_path, exist_ok=True)
+        tmp = self.ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.colecciones, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.ruta)
+
+    def ajustes(self, nombre: str) -> dict:
+        if nombre not in self.colecciones:
+            self.colecciones = self._cargar()  # Puede haberla creado otro proceso (el indexador)
+        if nombre in self.colecciones:
+            return self.colecciones[nombre]
+        if nombre == COLECCION_POR_DEFECTO:
+            return {"tabla": TABLA}
+        raise ValueError(f"Colección desconocida: {nombre} (existentes: {', '.join(self.listar()) or 'ninguna'})")
+
+    def listar(self) -> List[str]:
+        nombres = set(self.colecciones)
+        if TABLA in self.conexion().table_names():
+            nombres.add(COLECCION_POR_DEFECTO)
+        return sorted(nombres)
+
+    def crear(self, nombre: str, **ajustes) -> dict:
+        """Registra (o actualiza) una colección. Su tabla se crea al indexar el primer documento."""
+        if not _NOMBRE.match(nombre):
+            raise ValueError(f"Nombre de colección no válido: {nombre!r} (letras, dígitos, _ y -; máx. 64)")
+        ajustes = {k: v for k, v in ajustes.items() if v is not None}
+        _validar_ajustes(ajustes)
+        previa = self.colecciones.get(nombre, {"tabla": nombre, "creada": round(time.time())})
+        self.colecciones[nombre] = {**previa, **ajustes}
+        self._guardar()
+        self.cerrar(nombre)  # Que la próxima búsqueda use los ajustes nuevos
+        return self.colecciones[nombre]
+
+    def eliminar(self, nombre: str):
+        """Borra la tabla, sus ficheros de estado y la entrada del registro."""
+        from indexador_incremental import ESTADO_INDICE, MANIFIESTO, fichero_de_tabla
+
+        tabla = self.ajustes(nombre)["tabla"]
+        self.cerrar(nombre)
+        if tabla in self.conexion().table_names():
+            self.conexion().drop_table(tabla)
+        for fichero in (MANIFIESTO, ESTADO_INDICE):
+            ruta = os.path.join(self.db_path, fichero_de_tabla(fichero, tabla))
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        if self.colecciones.pop(nombre, None) is not None:
+            self._guardar()
+
+    # --- Tablas abiertas (LRU) ---
+    def conexion(self):
+        """Una sola conexión LanceDB compartida por todos los Retrievers del registro."""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    import lancedb
+                    self._db = lancedb.connect(self.db_path)
+        return self._db
+
+    def retriever(self, nombre: str) -> Retriever:
+        """Retriever de la colección; abre su tabla si hace falta y cierra la menos usada si sobran."""
+        with self._lock:
+            r = self._abiertas.get(nombre)
+            if r is not None:
+                self._abiertas.move_to_end(nombre)
+                return r
+        ajustes = self.ajustes(nombre)
+        nuevo = Retriever(self.db_path, tabla=ajustes["tabla"], db=self.conexion(),
+                          **{k: ajustes[k] for k in AJUSTES_RETRIEVER if k in ajustes})
+        with self._lock:
+            r = self._abiertas.setdefault(nombre, nuevo)
+            self._abiertas.move_to_end(nombre)
+            while len(self._abiertas) > self.max_abiertas:
+                self._abiertas.popitem(last=False)  # Quien lo esté usando lo termina; luego se libera
+                contador("colecciones.cerradas")
+        if r is nuevo:
+            contador("colecciones.abiertas")
+        return r
+
+    def cerrar(self, nombre: Optional[str] = None):
+        """Suelta la tabla (y su índice int8 en memoria) de una colección, o de todas."""
+        with self._lock:
+            if nombre is None:
+                self._abiertas.clear()
+            else:
+                self._abiertas.pop(nombre, None)
+
+    def abiertas(self) -> List[str]:
+        with self._lock:
+            return list(self._abiertas)
+
+    def indexador(self, nombre: str, embedder, **opciones):
+        """IndexadorIncremental de la colección con sus ajustes; si no existe se registra con los de por defecto."""
+        from indexador_incremental import IndexadorIncremental
+
+        if nombre != COLECCION_POR_DEFECTO and nombre not in self.colecciones:
+            self.crear(nombre)
+        ajustes = self.ajustes(nombre)
+        opciones = {**{k: ajustes[k] for k in AJUSTES_INDEXADOR if k in ajustes}, **opciones}
+        return IndexadorIncremental(self.db_path, embedder, tabla=ajustes["tabla"], **opciones)
+
+    # --- Búsqueda ---
+    def _no_disponible(self, nombre: str, e: Exception):
+        print(f"⚠️ Colección '{nombre}' no disponible (¿sin indexar?): {e}")
+        contador("colecciones.errores")
+
+    def _candidatos(self, nombre: str, query: str, n: int, con_vectores: bool, modo: Optional[str],
+                    q_vecs: Dict[str, np.ndarray]) -> Tuple[List[Resultado], List[Resultado]]:
+        """Candidatos (por vector, por texto) de una colección según su modo, etiquetados con su nombre."""
+        try:
+            retriever = self.retriever(nombre)
+            q_vec = q_vecs.get(modelo_de(retriever.embedder))
+            modo = modo or retriever.modo
+            por_vector = retriever.buscar_vector(q_vec, n, con_vectores) if modo != "texto" else []
+            por_texto = retriever.buscar_texto(query, n, q_vec, con_vectores) if modo != "vector" else []
+        except Exception as e:
+            self._no_disponible(nombre, e)
+            return [], []
+        return ([r._replace(coleccion=nombre) for r in por_vector],
+                [r._replace(coleccion=nombre) for r in por_texto])
+
+    def buscar(self, colecciones: Union[str, Sequence[str]], query: str, k: int = 3,
+               con_vectores: bool = False, modo: Optional[str] = None) -> List[Resultado]:
+        """
+        Top-k de una colección o de varias ('a,b' o lista). Con varias, cada una aporta sus k mejores
+        (buscadas en paralelo, con un único embedding de la pregunta) y se fusionan en un top-k global.
+        """
+        nombres = nombres_de(colecciones)
+        for nombre in nombres:
+            self.ajustes(nombre)  # Nombre desconocido: error antes de lanzar nada
+        if len(nombres) == 1:
+            try:
+                resultados = self.retriever(nombres[0]).buscar(query, k, con_vectores, modo)
+            except Exception as e:
+                self._no_disponible(nombres[0], e)
+                return []
+            return [r._replace(coleccion=nombres[0]) for r in resultados]
+
+        with span("colecciones.buscar", colecciones=len(nombres), k=k):
+            # Un embedding de la pregunta por modelo; no hace falta si todas son solo texto
+            q_vecs: Dict[str, np.ndarray] = {}
+            if modo != "texto" and (modo or any(self.retriever(n).modo != "texto" for n in nombres)):
+                for nombre in nombres:
+                    try:
+                        embedder = self.retriever(nombre).embedder
+                        if modelo_de(embedder) not in q_vecs:
+                            with span("embedding"):
+                                q_vecs[modelo_de(embedder)] = embedder.embed_uno(query)
+                    except Exception:
+                        pass  # _candidatos la dará por no disponible
+            candidatos = max(2 * k, 20)  # Como la híbrida de una tabla: cada rama aporta max(2k, 20)
+            if self._pool is None:
+                with self._lock:
+                    if self._pool is None:
+                        self._pool = ThreadPoolExecutor(max_workers=self.paralelas, thread_name_prefix="colecciones")
+            # Cada colección en una copia del contexto: sus spans cuelgan de colecciones.buscar
+            futuros = [self._pool.submit(contextvars.copy_context().run, self._candidatos,
+                                         nombre, query, candidatos, con_vectores, modo, q_vecs) for nombre in nombres]
+            ramas = [f.result() for f in futuros]
+            with span("fusion_colecciones"):
+                return fusionar([v for v, _ in ramas], [t for _, t in ramas], k, candidatos)
+
+    def vista(self, colecciones: Union[str, Sequence[str]]) -> "VistaColecciones":
+        return VistaColecciones(self, colecciones)
+
+
+class VistaColecciones:
+    """Misma interfaz que Retriever.buscar, fijada a una o varias colecciones del registro."""
+
+    def __init__(self, registro: RegistroColecciones, colecciones: Union[str, Sequence[str]]):
+        self.registro = registro
+        self.colecciones = nombres_de(colecciones)
+        for nombre in self.colecciones:
+            registro.ajustes(nombre)
+
+    @property
+    def embedder(self):
+        """El de la primera colección (con qué embeder la pregunta para el constructor de contexto)."""
+        return self.registro.retriever(self.colecciones[0]).embedder
+
+    def precalentar(self):
+        for nombre in self.colecciones:
+            self.registro.retriever(nombre).precalentar()
+
+    def buscar(self, query: str, k: int = 3, con_vectores: bool = False, modo: Optional[str] = None) -> List[Resultado]:
+        return self.registro.buscar(self.colecciones, query, k, con_vectores, modo)
+
+
+_registros: Dict[str, RegistroColecciones] = {}
+_registros_lock = threading.Lock()
+
+
+def obtener_registro(db_path: Optional[str] = None) -> RegistroColecciones:
+    """Registro compartido del proceso para esa carpeta LanceDB (LANCEDB_PATH o la que encuentre)."""
+    db_path = db_path or localizar_db() or "./lancedb_data"
+    clave = os.path.abspath(db_path)
+    with _registros_lock:
+        if clave not in _registros:
+            _registros[clave] = RegistroColecciones(db_path)
+        return _registros[clave]
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Colecciones de la base de conocimiento (una tabla LanceDB cada una)")
+    parser.add_argument("--db", default=None)
+    sub = parser.add_subparsers(dest="orden", required=True)
+    p_crear = sub.add_parser("crear")
+    p_crear.add_argument("nombre")
+    p_crear.add_argument("--tipo-vector", choices=TIPOS_VECTOR, default=None)
+    p_crear.add_argument("--troceado", choices=list(ESTRATEGIAS), default=None)
+    p_crear.add_argument("--umbral-indice", type=int, default=None)
+    p_crear.add_argument("--idioma-fts", default=None)
+    p_crear.add_argument("--modo", choices=MODOS, default=None)
+    p_crear.add_argument("--nprobes", type=int, default=None)
+    p_crear.add_argument("--refine-factor", type=int, default=None)
+    sub.add_parser("listar")
+    p_eliminar = sub.add_parser("eliminar")
+    p_eliminar.add_argument("nombre")
+    p_buscar = sub.add_parser("buscar")
+    p_buscar.add_argument("pregunta")
+    p_buscar.add_argument("--colecciones", required=True, help="Una o varias, separadas por comas")
+    p_buscar.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    load_dotenv()
+    registro = obtener_registro(args.db)
+    if args.orden == "crear":
+        ajustes = registro.crear(args.nombre, tipo_vector=args.tipo_vector, estrategia=args.troceado,
+                                 umbral_indice=args.umbral_indice, idioma_fts=args.idioma_fts, modo=args.modo,
+                                 nprobes=args.nprobes, refine_factor=args.refine_factor)
+        print(f"✅ Colección '{args.nombre}': {ajustes}")
+    elif args.orden == "listar":
+        tablas = set(registro.conexion().table_names())
+        for nombre in registro.listar():
+            ajustes = registro.ajustes(nombre)
+            filas = registro.conexion().open_table(ajustes["tabla"]).count_rows() if ajustes["tabla"] in tablas else 0
+            print(f"📚 {nombre}: {filas} chunks | {ajustes}")
+    elif args.orden == "eliminar":
+        registro.eliminar(args.nombre)
+        print(f"🗑️ Colección '{args.nombre}' eliminada")
+    else:
+        t0 = time.perf_counter()
+        resultados = registro.buscar(args.colecciones, args.pregunta, args.k)
+        print(f"🔎 {len(resultados)} resultados en {(time.perf_counter() - t0) * 1000:.0f} ms")
+        for r in resultados:
+            print(f"\n--- [{r.coleccion}] {r.source} #{r.id} ({r.relevancia()}) ---")
+            print(f"📜 ...{r.text[:200]}...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import math
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from servicio_retriever import Resultado
+
+# Construcción del contexto que se envía al LLM a partir de los chunks recuperados:
+#   1. Quita casi-duplicados (el troceo fijo de 500 caracteres repite mucho texto).
+#   2. Reordena con MMR (Maximal Marginal Relevance): relevantes pero distintos entre sí.
+#   3. Empaqueta los mejores fragmentos hasta un presupuesto de tokens.
+# La similitud usa los embeddings si vienen en el Resultado (con_vectores=True);
+# si no (p.ej. RetrieverRemoto antiguo), se usa Jaccard sobre shingles de palabras.
+
+PRESUPUESTO_TOKENS = int(os.getenv("CONTEXTO_MAX_TOKENS", "1500"))
+CARACTERES_POR_TOKEN = 4  # Aproximación habitual para texto en español/inglés con Gemini
+
+
+class ContextoConstruido(NamedTuple):
+    texto: str
+    fragmentos: List[Resultado]
+    duplicados: int  # Chunks descartados por casi-duplicados
+    fuera_de_presupuesto: int  # Chunks que no cupieron en el presupuesto
+    tokens: int
+
+
+def contar_tokens(texto: str) -> int:
+    return max(1, len(texto) // CARACTERES_POR_TOKEN)
+
+
+def _shingles(texto: str, n: int = 3) -> set:
+    palabras = re.findall(r"\w+", texto.lower())
+    return {" ".join(palabras[i:i + n]) for i in range(max(1, len(palabras) - n + 1))}
+
+
+def matriz_similitud(resultados: Sequence[Resultado]) -> np.ndarray:
+    """Similitud entre todos los pares de chunks: coseno de embeddings o Jaccard de shingles."""
+    if resultados and all(r.vector is not None for r in resultados):
+        m = np.asarray([r.vector for r in resultados], dtype=np.float32)
+        m /= np.linalg.norm(m, axis=1, keepdims=True) + 1e-12
+        return m @ m.T
+    conjuntos = [_shingles(r.text) for r in resultados]
+    n = len(conjuntos)
+    sim = np.eye(n, dtype=np.float32)
+    for i in range(n):
+        for j in range(i + 1, n):
+            union = len(conjuntos[i] | conjuntos[j])
+            sim[i, j] = sim[j, i] = len(conjuntos[i] & conjuntos[j]) / union if union else 0.0
+    return sim
+
+
+def relevancias(resultados: Sequence[Resultado], q_vec: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    Coseno con la pregunta si hay vectores; si no, se deriva de la distancia L2 de LanceDB
+    o, en resultados solo de texto (distancia NaN), de su posición.
+    """
+    if q_vec is not None and resultados and all(r.vector is not None for r in resultados):
+        m = np.asarray([r.vector for r in resultados], dtype=np.float32)
+        q = np.asarray(q_vec, dtype=np.float32)
+        return (m @ q) / (np.linalg.norm(m, axis=1) * np.linalg.norm(q) + 1e-12)
+    return np.asarray([1.0 / (1.0 + r.distancia) if not math.isnan(r.distancia) else 1.0 / (1.0 + i)
+                       for i, r in enumerate(resultados)], dtype=np.float32)
+
+
+def construir_contexto(
+    resultados: Sequence[Resultado],
+    q_vec: Optional[Sequence[float]] = None,
+    presupuesto_tokens: int = PRESUPUESTO_TOKENS,
+    umbral_duplicado: float = 0.9,
+    lambda_mmr: float = 0.7,
+) -> ContextoConstruido:
+    """
+    `umbral_duplicado`: a partir de esa similitud un chunk se considera copia de otro más relevante.
+    `lambda_mmr`: 1.0 = solo relevancia, 0.0 = solo diversidad.
+    """
+    if not resultados:
+        return ContextoConstruido("", [], 0, 0, 0)
+    rel = relevancias(resultados, q_vec)
+    sim = matriz_similitud(resultados)
+
+    # Casi-duplicados: se queda el más relevante de cada grupo
+    candidatos = []
+    for i in np.argsort(-rel):
+        if all(sim[i, j] < umbral_duplicado for j in candidatos):
+            candidatos.append(int(i))
+    duplicados = len(resultados) - len(candidatos)
+
+    # MMR voraz + empaquetado: si un fragmento no cabe se prueba con el siguiente
+    elegidos, tokens, fuera = [], 0, 0
+    while candidatos:
+        puntuaciones = [
+            lambda_mmr * rel[i] - (1 - lambda_mmr) * max((sim[i, j] for j in elegidos), default=0.0)
+            for i in candidatos
+        ]
+        i = candidatos.pop(int(np.argmax(puntuaciones)))
+        coste = contar_tokens(resultados[i].text)
+        if elegidos and tokens + coste > presupuesto_tokens:  # El primero entra siempre
+            fuera += 1
+            continue
+        elegidos.append(i)
+        tokens += coste
+
+    fragmentos = [resultados[i] for i in elegidos]
+    texto = "".join(f"\nFragmento {n}: {r.text}\n" for n, r in enumerate(fragmentos))
+    return ContextoConstruido(texto, fragmentos, duplicados, fuera, tokens)
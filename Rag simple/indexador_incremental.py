@@ -0,0 +1,395 @@
+import os
+import json
+import time
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import lancedb
+import numpy as np
+import pyarrow as pa
+
+from almacenamiento_vectores import (TIPO_VECTOR, columnas_vector, dimension_de_esquema, metadatos_embeddings,
+                                     modelo_de_esquema, tipo_de_esquema)
+from ingesta_streaming import con_prefetch, en_lotes
+from instrumentacion import LIMITES_CONTEO, contador, histograma, span, trazar
+from motor_embeddings import modelo_de
+from troceado import ESTRATEGIA, Chunk, leer_chunks
+
+# Indexador incremental: en vez de borrar ./lancedb_data y reconstruir todo,
+#   1. Huella de cada PDF (tamaño + mtime rápido, sha256 si cambian) -> si no cambió, ni se abre.
+#   2. Huella de cada chunk (sha256 del texto) -> solo se embeden los chunks nuevos.
+#   3. Los chunks que ya no existen en el PDF (o PDFs borrados) se eliminan de la tabla.
+# Varios PDFs conviven en la misma tabla, diferenciados por la columna `source`.
+# La ingesta es en streaming (página -> chunk -> lote -> embed -> tbl.add), con memoria acotada.
+# Al pasar de UMBRAL_INDICE filas se construye un índice ANN (IVF-PQ) sobre `vector`.
+# El troceado es el de troceado.py (CHUNKING); cada fila guarda su página y offsets.
+# `id` identifica el chunk dentro de su `source` y no cambia al reindexar (no es su posición en el PDF);
+# la identidad de contenido es `chunk_hash`, único por `source`.
+# Junto a los vectores se mantiene un índice de texto completo (FTS/BM25) sobre `text`
+# para la búsqueda híbrida del Retriever.
+# Los vectores se escriben en float32, float16 o int8 según LANCEDB_VECTOR_TIPO (almacenamiento_vectores.py).
+# Cada tabla (colección de colecciones.py) tiene su propio manifiesto y estado del índice ANN.
+# La tabla anota en sus metadatos el modelo de embeddings y la dimensión; si cambia el modelo se reconstruye.
+# Los chunks cuyo embedding falla (tras reintentarlo) no se guardan: se reintentan en la siguiente ejecución.
+# Con INSTRUMENTACION activa: spans indexador.* (fuente, embed, insertar, borrar, índices) y contadores de chunks.
+
+TABLA = "documentos"
+MANIFIESTO = "_manifiesto_indexador.json"
+COLUMNAS_REQUERIDAS = {"chunk_hash", "pagina", "inicio", "fin"}
+LOTE_INGESTA = 256  # Chunks por ronda de embed + tbl.add
+ESTADO_INDICE = "_estado_indice.json"
+UMBRAL_INDICE = int(os.getenv("LANCEDB_UMBRAL_INDICE", "50000"))  # Por debajo, el escaneo exacto es suficiente
+IDIOMA_FTS = os.getenv("LANCEDB_IDIOMA_FTS", "Spanish")  # Stemming y palabras vacías del índice de texto
+
+
+def huella_archivo(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella_chunk(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def leer_chunks_pdf(ruta: str, estrategia: str = ESTRATEGIA) -> Iterable[Chunk]:
+    return leer_chunks(ruta, estrategia)
+
+
+def fichero_de_tabla(nombre: str, tabla: str) -> str:
+    """Fichero de estado de `tabla`; los de la tabla por defecto conservan su nombre de siempre."""
+    if tabla == TABLA:
+        return nombre
+    base, ext = os.path.splitext(nombre)
+    return f"{base}.{tabla}{ext}"
+
+
+def _sql(valor: str) -> str:
+    return "'" + valor.replace("'", "''") + "'"
+
+
+class IndexadorIncremental:
+    def __init__(
+        self,
+        db_path: str,
+        embedder,
+        tabla: str = TABLA,
+        lote_ingesta: int = LOTE_INGESTA,
+        umbral_indice: int = UMBRAL_INDICE,
+        estrategia: str = ESTRATEGIA,
+        tipo_vector: str = TIPO_VECTOR,
+        idioma_fts: str = IDIOMA_FTS,
+    ):
+        """
+        `embedder` debe ofrecer embed(textos, tolerante=True, progreso=...) (p.ej. CacheEmbeddings).
+        `estrategia` de troceado: si cambia respecto a la indexación anterior, los PDFs se re-trocean.
+        `tipo_vector`: float32, float16 o int8; si la tabla existente usa otro, se reconstruye.
+        El modelo de `embedder` (su atributo `modelo`) queda en los metadatos de la tabla.
+        """
+        self.db_path = db_path
+        self.estrategia = estrategia
+        self.tipo_vector = tipo_vector
+        self.lote_ingesta = lote_ingesta
+        self.umbral_indice = umbral_indice
+        self.idioma_fts = idioma_fts
+        self.embedder = embedder
+        self.modelo = modelo_de(embedder)
+        self.nombre_tabla = tabla
+        self.db = lancedb.connect(db_path)
+        self.ruta_manifiesto = os.path.join(db_path, fichero_de_tabla(MANIFIESTO, tabla))
+        self.ruta_estado_indice = os.path.join(db_path, fichero_de_tabla(ESTADO_INDICE, tabla))
+        self.manifiesto = self._cargar_manifiesto()
+        self._comprobar_esquema()
+
+    # --- Estado persistente ---
+    def _cargar_manifiesto(self) -> Dict[str, dict]:
+        if os.path.exists(self.ruta_manifiesto):
+            with open(self.ruta_manifiesto, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _guardar_manifiesto(self):
+        os.makedirs(self.db_path, exist_ok=True)
+        tmp = self.ruta_manifiesto + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifiesto, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.ruta_manifiesto)
+
+    def tabla(self):
+        if self.nombre_tabla in self.db.table_names():
+            return self.db.open_table(self.nombre_tabla)
+        return None
+
+    def _comprobar_esquema(self):
+        """
+        Las tablas de versiones anteriores (sin chunk_hash o sin página/offsets) se reconstruyen una vez.
+        También si cambia el tipo de vector: los embeddings salen de la caché, no se vuelve a pagar la API.
+        Y si cambia el modelo de embeddings: los vectores de dos modelos no son comparables.
+        """
+        tbl = self.tabla()
+        if tbl is None:
+            return
+        if not COLUMNAS_REQUERIDAS <= set(tbl.schema.names):
+            print(f"♻️ La tabla '{self.nombre_tabla}' es de una versión anterior, se reconstruye.")
+        elif tipo_de_esquema(tbl.schema) != self.tipo_vector:
+            print(f"♻️ La tabla '{self.nombre_tabla}' guarda vectores {tipo_de_esquema(tbl.schema)}, "
+                  f"se reconstruye en {self.tipo_vector}.")
+        elif self.modelo and modelo_de_esquema(tbl.schema) != self.modelo:
+            print(f"♻️ La tabla '{self.nombre_tabla}' se indexó con {modelo_de_esquema(tbl.schema)}, "
+                  f"se reconstruye con {self.modelo}.")
+        else:
+            return
+        self.db.drop_table(self.nombre_tabla)
+        self.manifiesto = {}
+        # El estado del índice ANN era el de la tabla borrada: la nueva se indexa desde cero
+        if os.path.exists(self.ruta_estado_indice):
+            os.remove(self.ruta_estado_indice)
+
+    def fuente(self, ruta: str) -> str:
+        """Clave `source`: ruta relativa a la carpeta que contiene la DB (no depende del cwd)."""
+        base = os.path.dirname(os.path.abspath(self.db_path))
+        return os.path.relpath(os.path.abspath(ruta), base)
+
+    def _ruta_de_fuente(self, fuente: str) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), fuente)
+
+    # --- Operaciones sobre la tabla ---
+    def _hashes_existentes(self, fuente: str) -> Tuple[set, int]:
+        """Huellas de los chunks ya guardados de `fuente` y el primer `id` libre para los nuevos."""
+        tbl = self.tabla()
+        if tbl is None:
+            return set(), 0
+        filtro = f"source = {_sql(fuente)}"
+        n = tbl.count_rows(filtro)
+        if n == 0:
+            return set(), 0
+        datos = tbl.search().where(filtro).select(["chunk_hash", "id"]).limit(n).to_arrow()
+        hashes, ids = datos.column("chunk_hash").to_pylist(), datos.column("id").to_pylist()
+        # El manifiesto recuerda también los ids de chunks ya borrados: nunca se reutilizan
+        siguiente = max(max(ids) + 1, self.manifiesto.get(fuente, {}).get("siguiente_id", 0))
+        # Tablas de versiones anteriores: el id era la posición en el PDF y podía repetirse tras reindexar
+        vistos = set()
+        for h, id_ in zip(hashes, ids):
+            if id_ in vistos:
+                tbl.update(where=f"{filtro} AND chunk_hash = {_sql(h)}", values={"id": siguiente})
+                siguiente += 1
+            vistos.add(id_)
+        return set(hashes), siguiente
+
+    @trazar("indexador.borrar")
+    def _borrar(self, fuente: str, hashes: Optional[List[str]] = None):
+        tbl = self.tabla()
+        if tbl is None:
+            return
+        filtro = f"source = {_sql(fuente)}"
+        if hashes is None:
+            tbl.delete(filtro)
+            return
+        for i in range(0, len(hashes), 500):
+            lista = ", ".join(_sql(h) for h in hashes[i:i + 500])
+            tbl.delete(f"{filtro} AND chunk_hash IN ({lista})")
+
+    @trazar("indexador.insertar")
+    def _insertar(self, filas: List[dict], vectores: List[np.ndarray]):
+        """`filas` sin vector; los vectores se añaden como columnas Arrow del tipo configurado."""
+        if not filas:
+            return
+        m = np.stack(vectores)
+        datos = pa.Table.from_pylist(filas)
+        for nombre, columna in columnas_vector(m, self.tipo_vector).items():
+            datos = datos.append_column(nombre, columna)
+        tbl = self.tabla()
+        if tbl is None:
+            datos = datos.replace_schema_metadata(metadatos_embeddings(self.modelo, m.shape[1]))
+            self.db.create_table(self.nombre_tabla, data=datos)
+            return
+        dim = dimension_de_esquema(tbl.schema)
+        if dim != m.shape[1]:
+            raise ValueError(f"La tabla '{self.nombre_tabla}' tiene vectores de {dim} dimensiones "
+                             f"({modelo_de_esquema(tbl.schema)}) y el embedder devuelve {m.shape[1]}")
+        tbl.add(datos)
+
+    # --- Índice ANN ---
+    def _leer_estado_indice(self) -> dict:
+        if os.path.exists(self.ruta_estado_indice):
+            with open(self.ruta_estado_indice, encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _guardar_estado_indice(self, estado: dict):
+        with open(self.ruta_estado_indice, "w", encoding="utf-8") as f:
+            json.dump(estado, f, indent=2)
+
+    @trazar("indexador.indice_ann")
+    def asegurar_indice(self, hubo_cambios: bool = True, forzar: bool = False) -> Optional[str]:
+        """
+        Crea el índice IVF-PQ cuando la tabla supera el umbral y lo reconstruye si la tabla
+        ha duplicado su tamaño desde la última vez (las particiones se quedan desequilibradas).
+        Entre reconstrucciones, optimize() incorpora las filas nuevas al índice existente.
+        Con vectores int8 no hay índice ANN: el Retriever busca sobre los códigos en memoria.
+        """
+        tbl = self.tabla()
+        if tbl is None or self.tipo_vector == "int8":
+            return None
+        filas = tbl.count_rows()
+        estado = self._leer_estado_indice()
+        if filas < self.umbral_indice and not forzar:
+            return None
+
+        # El JSON solo dice cuándo se construyó; que el índice exista lo dice la tabla
+        tiene_indice = any("vector" in i.columns and i.index_type != "FTS" for i in tbl.list_indices())
+        if forzar or not tiene_indice or not estado or filas >= 2 * estado.get("filas", 0):
+            dim = tbl.schema.field("vector").type.list_size
+            num_particiones = max(1, min(4096, int(filas ** 0.5)))
+            num_subvectores = next(d for d in (dim // 16, dim // 8, dim // 4, 1) if d and dim % d == 0)
+            print(f"🧭 Construyendo índice IVF-PQ: {filas} filas, {num_particiones} particiones, "
+                  f"{num_subvectores} subvectores...")
+            t0 = time.perf_counter()
+            tbl.create_index(
+                metric="L2",
+                vector_column_name="vector",
+                num_partitions=num_particiones,
+                num_sub_vectors=num_subvectores,
+                replace=True,
+            )
+            self._guardar_estado_indice({"filas": filas, "particiones": num_particiones, "subvectores": num_subvectores})
+            print(f"   ✓ Índice listo en {time.perf_counter() - t0:.1f}s")
+            return "creado"
+
+        if hubo_cambios:
+            tbl.optimize()  # Compacta fragmentos e indexa las filas añadidas desde la última vez
+            return "optimizado"
+        return None
+
+    @trazar("indexador.indice_fts")
+    def asegurar_fts(self, hubo_cambios: bool = True) -> Optional[str]:
+        """
+        Crea el índice FTS sobre `text` si no existe. Las filas añadidas después se buscan igual
+        (sin indexar, más lento); si quedan pendientes tras asegurar_indice, optimize() las incorpora.
+        """
+        tbl = self.tabla()
+        if tbl is None:
+            return None
+        fts = next((i for i in tbl.list_indices() if i.index_type == "FTS"), None)
+        if fts is None:
+            print("🔤 Construyendo índice de texto completo (BM25) sobre 'text'...")
+            tbl.create_fts_index("text", language=self.idioma_fts, replace=True)
+            return "creado"
+        if hubo_cambios and getattr(fts, "num_unindexed_rows", 0):
+            tbl.optimize()
+            return "optimizado"
+        return None
+
+    # --- API pública ---
+    def sin_cambios(self, ruta: str) -> bool:
+        previo = self.manifiesto.get(self.fuente(ruta))
+        if not previo or previo.get("estrategia") != self.estrategia:
+            return False
+        st = os.stat(ruta)
+        if previo.get("tam") == st.st_size and previo.get("mtime") == st.st_mtime:
+            return True
+        if previo.get("huella") != huella_archivo(ruta):
+            return False
+        # Contenido idéntico (p.ej. copiado o "touch"): actualizamos la marca rápida y seguimos
+        previo.update(tam=st.st_size, mtime=st.st_mtime)
+        self._guardar_manifiesto()
+        return True
+
+    @trazar("indexador.fuente")
+    def indexar_fuente(self, ruta: str, chunks: Iterable[Chunk]) -> dict:
+        """
+        Sincroniza la tabla con los chunks actuales de un PDF: añade nuevos y borra desaparecidos.
+        `chunks` se consume en streaming; solo se guardan en memoria las huellas ya vistas.
+        """
+        fuente = self.fuente(ruta)
+        existentes, siguiente_id = self._hashes_existentes(fuente)
+        vistos = set()
+        nuevos = fallidos = total = 0
+
+        # El productor (lectura + troceado) va por delante como mucho 2 lotes
+        for lote in con_prefetch(en_lotes(chunks, self.lote_ingesta), maxsize=2):
+            pendientes = []
+            for chunk in lote:
+                h = huella_chunk(chunk.text)
+                total += 1
+                # Chunks idénticos dentro del mismo PDF (pies de página, cabeceras) se guardan una sola vez
+                if h in vistos:
+                    continue
+                vistos.add(h)
+                if h not in existentes:
+                    pendientes.append((h, chunk))
+            if not pendientes:
+                continue
+
+            histograma("indexador.lote", len(pendientes), LIMITES_CONTEO)
+            with span("indexador.embed", textos=len(pendientes)):
+                vectores = self.embedder.embed([c.text for _, c in pendientes], tolerante=True)
+            filas, validos = [], []
+            for (h, chunk), vec in zip(pendientes, vectores):
+                if vec is None:
+                    fallidos += 1  # No guardamos vectores vacíos: se reintentará en la próxima ejecución
+                    continue
+                validos.append(vec)
+                # Los chunks que siguen en el PDF conservan su id: los nuevos toman ids aún no usados
+                filas.append({
+                    "text": chunk.text, "source": fuente, "id": siguiente_id, "chunk_hash": h,
+                    "pagina": chunk.pagina, "inicio": chunk.inicio, "fin": chunk.fin,
+                })
+                siguiente_id += 1
+            self._insertar(filas, validos)
+            nuevos += len(filas)
+            print(f"   ✓ {fuente}: {total} chunks leídos, {nuevos} nuevos guardados...")
+
+        eliminados = [h for h in existentes if h not in vistos]
+        self._borrar(fuente, eliminados)
+        contador("indexador.chunks", nuevos, resultado="nuevo")
+        contador("indexador.chunks", len(eliminados), resultado="eliminado")
+        contador("indexador.chunks", fallidos, resultado="fallido")
+
+        if fallidos == 0:
+            st = os.stat(ruta)
+            self.manifiesto[fuente] = {
+                "huella": huella_archivo(ruta),
+                "tam": st.st_size,
+                "mtime": st.st_mtime,
+                "chunks": len(vistos),
+                "estrategia": self.estrategia,
+                "siguiente_id": siguiente_id,
+            }
+            self._guardar_manifiesto()
+        return {"nuevos": nuevos, "eliminados": len(eliminados), "fallidos": fallidos}
+
+    @trazar("indexador.indexar")
+    def indexar(self, rutas: List[str], leer_chunks: Optional[Callable[[str], Iterable[Chunk]]] = None) -> dict:
+        """
+        Indexa varios PDFs y elimina de la tabla los que ya no existen en disco.
+        `leer_chunks` permite sustituir la extracción (p.ej. la paralela de ingesta_corpus).
+        """
+        leer_chunks = leer_chunks or (lambda ruta: leer_chunks_pdf(ruta, self.estrategia))
+        t0 = time.perf_counter()
+        resumen = {"sin_cambios": 0, "nuevos": 0, "eliminados": 0, "fallidos": 0, "tiempos": {}}
+
+        for fuente in list(self.manifiesto):
+            if not os.path.exists(self._ruta_de_fuente(fuente)):
+                print(f"🗑️ {fuente} ya no existe, se elimina del índice.")
+                self._borrar(fuente)
+                del self.manifiesto[fuente]
+                self._guardar_manifiesto()
+
+        for ruta in rutas:
+            if self.sin_cambios(ruta):
+                resumen["sin_cambios"] += 1
+                continue
+            t_archivo = time.perf_counter()
+            r = self.indexar_fuente(ruta, leer_chunks(ruta))
+            resumen["tiempos"][self.fuente(ruta)] = round(time.perf_counter() - t_archivo, 2)
+            for k, v in r.items():
+                resumen[k] += v
+
+        hubo_cambios = bool(resumen["nuevos"] or resumen["eliminados"])
+        resumen["indice"] = self.asegurar_indice(hubo_cambios=hubo_cambios)
+        resumen["indice_texto"] = self.asegurar_fts(hubo_cambios=hubo_cambios)
+        resumen["segundos"] = round(time.perf_counter() - t0, 2)
+        return resumen
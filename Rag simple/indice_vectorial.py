@@ -0,0 +1,154 @@
+import os
+import json
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Índice vectorial en memoria, solo con NumPy: vectores normalizados en un array contiguo,
+# similitud coseno = producto escalar, top-k con argpartition (O(n) en vez de ordenar todo).
+# Tipos de almacenamiento:
+#   float32 -> exacto                     (3 KB por vector de 768)
+#   float16 -> mitad de memoria           (1.5 KB)
+#   int8    -> cuantización escalar con una escala por vector (768 B + 4 B)
+# guardar()/cargar() usan .npy, así que cargar(mmap=True) no lee el fichero entero a RAM.
+
+TIPOS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+BLOQUE = 65_536  # Filas por bloque al puntuar: acota la memoria temporal con float16/int8
+
+
+def cuantizar_int8(m: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Cuantización escalar por vector: x ≈ codigos * escala, con escala = max|x| / 127."""
+    escalas = (np.abs(m).max(axis=1) / 127.0 + 1e-12).astype(np.float32)
+    return np.round(m / escalas[:, None]).astype(np.int8), escalas
+
+
+def normalizar(vectores) -> np.ndarray:
+    m = np.asarray(vectores, dtype=np.float32)
+    if m.ndim == 1:
+        m = m[None, :]
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-12)
+
+
+class IndiceVectorial:
+    def __init__(self, dim: int, tipo: str = "float32", capacidad: int = 1024):
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo no soportado: {tipo} (opciones: {', '.join(TIPOS)})")
+        self.dim = dim
+        self.tipo = tipo
+        self.n = 0
+        self._vectores = np.empty((capacidad, dim), dtype=TIPOS[tipo])
+        self._escalas = np.empty(capacidad, dtype=np.float32) if tipo == "int8" else None
+        self._ids = np.empty(capacidad, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def vectores(self) -> np.ndarray:
+        return self._vectores[:self.n]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self.n]
+
+    def nbytes(self) -> int:
+        total = self.vectores.nbytes + self.ids.nbytes
+        return total + (self._escalas[:self.n].nbytes if self._escalas is not None else 0)
+
+    def _reservar(self, extra: int):
+        if self.n + extra <= len(self._vectores):
+            return
+        capacidad = max(self.n + extra, 2 * len(self._vectores))
+        self._vectores = np.resize(self._vectores, (capacidad, self.dim))
+        self._ids = np.resize(self._ids, capacidad)
+        if self._escalas is not None:
+            self._escalas = np.resize(self._escalas, capacidad)
+
+    def agregar(self, vectores, ids: Optional[Sequence[int]] = None):
+        """`ids` opcionales (p.ej. el id de la fila en LanceDB); por defecto, la posición."""
+        m = normalizar(vectores)
+        if m.shape[1] != self.dim:
+            raise ValueError(f"Dimensión {m.shape[1]}, el índice espera {self.dim}")
+        self._reservar(len(m))
+        fin = self.n + len(m)
+        if self.tipo == "int8":
+            self._vectores[self.n:fin], self._escalas[self.n:fin] = cuantizar_int8(m)
+        else:
+            self._vectores[self.n:fin] = m
+        self._ids[self.n:fin] = np.arange(self.n, fin) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.n = fin
+
+    def agregar_int8(self, codigos: np.ndarray, ids: Optional[Sequence[int]] = None):
+        """
+        Códigos int8 ya cuantizados (p.ej. la columna vector_i8 de LanceDB), sin volver a float32.
+        La escala original no cambia el coseno: se sustituye por 1/|codigos| para normalizar.
+        """
+        if self.tipo != "int8" or codigos.shape[1] != self.dim:
+            raise ValueError("agregar_int8 necesita un índice int8 de la misma dimensión")
+        self._reservar(len(codigos))
+        fin = self.n + len(codigos)
+        self._vectores[self.n:fin] = codigos
+        for inicio in range(0, len(codigos), BLOQUE):  # Sin pasar la matriz entera a float32
+            bloque = codigos[inicio:inicio + BLOQUE].astype(np.float32)
+            self._escalas[self.n + inicio:self.n + inicio + len(bloque)] = 1.0 / (np.linalg.norm(bloque, axis=1) + 1e-12)
+        self._ids[self.n:fin] = np.arange(self.n, fin) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.n = fin
+
+    def _puntuar(self, inicio: int, fin: int, q: np.ndarray) -> np.ndarray:
+        bloque = self._vectores[inicio:fin]
+        if self.tipo == "float32":
+            return bloque @ q.T
+        puntuaciones = bloque.astype(np.float32) @ q.T
+        if self.tipo == "int8":
+            puntuaciones *= self._escalas[inicio:fin, None]
+        return puntuaciones
+
+    def buscar(self, consultas, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k por similitud coseno para una o varias consultas a la vez.
+        Devuelve (puntuaciones, ids), ambos de forma (n_consultas, k), ordenados de mayor a menor.
+        """
+        q = normalizar(consultas)
+        k = min(k, self.n)
+        if k == 0:
+            return np.empty((len(q), 0), dtype=np.float32), np.empty((len(q), 0), dtype=np.int64)
+        mejores_p = np.full((len(q), 0), -np.inf, dtype=np.float32)
+        mejores_i = np.empty((len(q), 0), dtype=np.int64)
+        for inicio in range(0, self.n, BLOQUE):
+            fin = min(inicio + BLOQUE, self.n)
+            p = self._puntuar(inicio, fin, q).T  # (n_consultas, filas del bloque)
+            kb = min(k, fin - inicio)
+            idx = np.argpartition(-p, kb - 1, axis=1)[:, :kb]
+            # Se fusiona con el top-k acumulado de los bloques anteriores
+            mejores_p = np.concatenate([mejores_p, np.take_along_axis(p, idx, axis=1)], axis=1)
+            mejores_i = np.concatenate([mejores_i, idx + inicio], axis=1)
+            if mejores_p.shape[1] > k:
+                sel = np.argpartition(-mejores_p, k - 1, axis=1)[:, :k]
+                mejores_p = np.take_along_axis(mejores_p, sel, axis=1)
+                mejores_i = np.take_along_axis(mejores_i, sel, axis=1)
+        orden = np.argsort(-mejores_p, axis=1)
+        return np.take_along_axis(mejores_p, orden, axis=1), self._ids[np.take_along_axis(mejores_i, orden, axis=1)]
+
+    def guardar(self, ruta: str):
+        """Carpeta con vectores.npy, ids.npy, escalas.npy (int8) y meta.json."""
+        os.makedirs(ruta, exist_ok=True)
+        np.save(os.path.join(ruta, "vectores.npy"), self.vectores)
+        np.save(os.path.join(ruta, "ids.npy"), self.ids)
+        if self._escalas is not None:
+            np.save(os.path.join(ruta, "escalas.npy"), self._escalas[:self.n])
+        with open(os.path.join(ruta, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "tipo": self.tipo, "n": self.n}, f)
+
+    @classmethod
+    def cargar(cls, ruta: str, mmap: bool = True) -> "IndiceVectorial":
+        """Con `mmap` los arrays se mapean desde disco (solo lectura: no admite agregar())."""
+        with open(os.path.join(ruta, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        modo = "r" if mmap else None
+        indice = cls(meta["dim"], meta["tipo"], capacidad=0)
+        indice._vectores = np.load(os.path.join(ruta, "vectores.npy"), mmap_mode=modo)
+        indice._ids = np.load(os.path.join(ruta, "ids.npy"), mmap_mode=modo)
+        if meta["tipo"] == "int8":
+            indice._escalas = np.load(os.path.join(ruta, "escalas.npy"), mmap_mode=modo)
+        indice.n = meta["n"]
+        return indice
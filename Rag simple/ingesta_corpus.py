@@ -0,0 +1,135 @@
+import os
+import glob
+import time
+import argparse
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+from dotenv import load_dotenv
+from pypdf import PdfReader
+
+from troceado import ESTRATEGIA, ESTRATEGIAS, Pagina, extraer_pagina, trocear
+
+# Ingesta de un corpus completo de PDFs:
+#   python ingesta_corpus.py ./pdfs "otros/*.pdf" --procesos 8
+# La extracción de texto (CPU) se reparte por rangos de páginas entre procesos.
+# Los rangos se recogen en orden, así que los chunks salen idénticos a la versión secuencial,
+# y alimentan el mismo indexador incremental (embed por lotes + caché + LanceDB).
+# Con --modelo local:<repo HF o carpeta ONNX> los embeddings se calculan en CPU, sin llamar a la API.
+
+PAGINAS_POR_TAREA = 25
+
+_lectores = {}
+
+
+def _lector(ruta: str) -> PdfReader:
+    """Cada proceso trabajador abre un PDF una sola vez y lo reutiliza entre rangos."""
+    if ruta not in _lectores:
+        if len(_lectores) >= 4:
+            _lectores.pop(next(iter(_lectores)))
+        _lectores[ruta] = PdfReader(ruta)
+    return _lectores[ruta]
+
+
+def extraer_rango(ruta: str, inicio: int, fin: int, con_estilo: bool = False) -> List[Pagina]:
+    paginas = _lector(ruta).pages
+    return [extraer_pagina(paginas[i], i + 1, con_estilo) for i in range(inicio, fin)]
+
+
+def contar_paginas(ruta: str) -> int:
+    return len(PdfReader(ruta).pages)
+
+
+def paginas_en_paralelo(
+    pool: Executor,
+    ruta: str,
+    ventana: int,
+    paginas_por_tarea: int = PAGINAS_POR_TAREA,
+    total: Optional[int] = None,
+    con_estilo: bool = False,
+) -> Iterator[Pagina]:
+    """
+    Genera cada página (Pagina) en orden. Como mucho `ventana` rangos en vuelo:
+    si el consumidor (embed + escritura) va más lento, no se extrae de más.
+    """
+    total = contar_paginas(ruta) if total is None else total
+    rangos = ((i, min(i + paginas_por_tarea, total)) for i in range(0, total, paginas_por_tarea))
+    en_vuelo = deque()
+    for inicio, fin in rangos:
+        en_vuelo.append(pool.submit(extraer_rango, ruta, inicio, fin, con_estilo))
+        if len(en_vuelo) >= ventana:
+            yield from en_vuelo.popleft().result()
+    while en_vuelo:
+        yield from en_vuelo.popleft().result()
+
+
+def expandir_rutas(entradas: List[str]) -> List[str]:
+    """Acepta carpetas (se recorren recursivamente), globs y rutas sueltas. Orden determinista."""
+    rutas = set()
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            rutas.update(glob.glob(os.path.join(entrada, "**", "*.pdf"), recursive=True))
+        else:
+            rutas.update(p for p in glob.glob(entrada, recursive=True) if p.lower().endswith(".pdf"))
+    return sorted(rutas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexa un corpus de PDFs en LanceDB")
+    parser.add_argument("entradas", nargs="+", help="Carpetas, globs o PDFs")
+    parser.add_argument("--db", default=os.getenv("LANCEDB_PATH", "./lancedb_data"))
+    parser.add_argument("--coleccion", default=None, help="Colección de destino (colecciones.py); por defecto 'documentos'")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--paginas-por-tarea", type=int, default=PAGINAS_POR_TAREA)
+    parser.add_argument("--troceado", choices=list(ESTRATEGIAS), default=None,
+                        help=f"Por defecto el de la colección o {ESTRATEGIA}")
+    parser.add_argument("--modelo", default=None,
+                        help="Modelo de embeddings (EMBEDDINGS_MODELO): text-embedding-004 o local:<repo HF o carpeta ONNX>")
+    args = parser.parse_args()
+
+    load_dotenv()
+    from cache_embeddings import obtener_cache
+    from colecciones import COLECCION_POR_DEFECTO, obtener_registro
+
+    rutas = expandir_rutas(args.entradas)
+    if not rutas:
+        print("❌ No se encontraron PDFs.")
+        return
+    print(f"--- INGESTA DE CORPUS: {len(rutas)} PDFs, {args.procesos} procesos ---")
+
+    opciones = {"estrategia": args.troceado} if args.troceado else {}
+    embedder = obtener_cache(modelo=args.modelo)
+    print(f"🧮 Embeddings: {embedder.modelo}")
+    indexador = obtener_registro(args.db).indexador(args.coleccion or COLECCION_POR_DEFECTO, embedder, **opciones)
+    estrategia = indexador.estrategia
+    paginas_por_archivo = {}
+
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        def leer_chunks(ruta: str):
+            paginas_por_archivo[ruta] = contar_paginas(ruta)
+            paginas = paginas_en_paralelo(pool, ruta, ventana=args.procesos * 2,
+                                          paginas_por_tarea=args.paginas_por_tarea,
+                                          total=paginas_por_archivo[ruta],
+                                          con_estilo=estrategia == "titulos")
+            return trocear(paginas, estrategia)
+
+        t0 = time.perf_counter()
+        resumen = indexador.indexar(rutas, leer_chunks=leer_chunks)
+        total = time.perf_counter() - t0
+
+    print("\n--- TIEMPOS POR ARCHIVO ---")
+    for ruta in rutas:
+        fuente = indexador.fuente(ruta)
+        if fuente not in resumen["tiempos"]:
+            print(f"   ⏭️ {fuente}: sin cambios")
+            continue
+        seg = resumen["tiempos"][fuente]
+        paginas = paginas_por_archivo[ruta]
+        print(f"   ⏱️ {fuente}: {paginas} páginas en {seg:.2f}s ({paginas / max(seg, 1e-9):.0f} pág/s)")
+    print(f"\n✅ {resumen['nuevos']} chunks nuevos, {resumen['eliminados']} eliminados, "
+          f"{resumen['fallidos']} fallidos, {resumen['sin_cambios']} PDFs sin cambios — {total:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import queue
+import threading
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+# Pipeline de ingesta por generadores: chunks -> lotes (la extracción y el troceado están en troceado.py).
+# Nada acumula el documento completo: en memoria solo hay el lote en curso y como mucho
+# `maxsize` elementos en la cola entre productor y consumidor.
+
+T = TypeVar("T")
+
+
+def en_lotes(iterable: Iterable[T], tam: int) -> Iterator[List[T]]:
+    it = iter(iterable)
+    while True:
+        lote = list(islice(it, tam))
+        if not lote:
+            return
+        yield lote
+
+
+_FIN = object()
+
+
+def con_prefetch(iterable: Iterable[T], maxsize: int = 4) -> Iterator[T]:
+    """
+    Consume `iterable` en un hilo productor y entrega sus elementos por una cola acotada.
+    Permite extraer/trocear el PDF mientras el consumidor embede y escribe; si el consumidor
+    va más lento, la cola se llena y el productor se bloquea (backpressure).
+    """
+    cola: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    parar = threading.Event()
+
+    def poner(item) -> bool:
+        """put() que se rinde si el consumidor ya no lee (break o excepción): el hilo no se queda colgado."""
+        while not parar.is_set():
+            try:
+                cola.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def productor():
+        try:
+            for item in iterable:
+                if not poner(item):
+                    return
+            poner(_FIN)
+        except BaseException as e:  # La excepción se relanza en el hilo consumidor
+            poner(e)
+        finally:
+            # Un generador a medias (p.ej. con el PdfReader abierto) se cierra aquí, no al recolectarlo
+            cerrar = getattr(iterable, "close", None)
+            if cerrar is not None:
+                cerrar()
+
+    hilo = threading.Thread(target=productor, daemon=True)
+    hilo.start()
+    try:
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        parar.set()
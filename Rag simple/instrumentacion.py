@@ -0,0 +1,355 @@
+import os
+import json
+import time
+import atexit
+import random
+import threading
+import functools
+import contextvars
+import urllib.request
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+# Instrumentación ligera: spans (trazas anidadas), contadores e histogramas.
+# Desactivada por defecto: span() devuelve un objeto vacío compartido y contador()/histograma()
+# retornan en la primera línea, así que el coste en el camino caliente es una llamada y un if.
+#   INSTRUMENTACION=jsonl  -> una línea JSON por span / métrica en INSTRUMENTACION_RUTA (trazas.jsonl)
+#   INSTRUMENTACION=otlp   -> OTLP/HTTP JSON a un collector OpenTelemetry local
+#                             (OTEL_EXPORTER_OTLP_ENDPOINT, por defecto http://127.0.0.1:4318)
+# La exportación va en un hilo aparte cada INTERVALO_EXPORTACION s (y al salir del proceso).
+# Los spans se anidan con contextvars: valen para hilos propios, asyncio y asyncio.to_thread.
+
+MODO = os.getenv("INSTRUMENTACION", "")
+RUTA_JSONL = os.getenv("INSTRUMENTACION_RUTA", "trazas.jsonl")
+URL_OTLP = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://127.0.0.1:4318").rstrip("/")
+SERVICIO = os.getenv("OTEL_SERVICE_NAME", "rag-simple")
+INTERVALO_EXPORTACION = 2.0
+LIMITES_HISTOGRAMA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Segundos
+LIMITES_CONTEO = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000)  # Tamaños de lote, fragmentos...
+MUESTRAS_RESUMEN = 10_000  # Duraciones recientes por span para los percentiles de resumen()
+
+_activo = False
+_span_actual: contextvars.ContextVar = contextvars.ContextVar("span_actual", default=None)
+
+
+_bits = random.getrandbits  # Ids como enteros; se formatean en hexadecimal al exportar
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def atributo(self, clave: str, valor):
+        pass
+
+    def desglose(self) -> str:
+        return ""
+
+
+_NULO = _SpanNulo()
+
+
+class Span:
+    __slots__ = ("nombre", "atributos", "traza", "id", "padre", "inicio_ns", "fin_ns", "_t0",
+                 "duracion", "error", "hijos", "_token")
+
+    def __init__(self, nombre: str, atributos: dict):
+        padre = _span_actual.get()
+        self.nombre = nombre
+        self.atributos = atributos
+        self.padre = padre
+        self.traza = padre.traza if padre is not None else _bits(128)
+        self.id = _bits(64)
+        self.error: Optional[str] = None
+        self.hijos: List["Span"] = []
+        self.duracion = 0.0
+
+    def __enter__(self):
+        self.inicio_ns = time.time_ns()
+        self._t0 = time.perf_counter()
+        self._token = _span_actual.set(self)
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        self.duracion = time.perf_counter() - self._t0
+        self.fin_ns = self.inicio_ns + int(self.duracion * 1e9)
+        try:
+            _span_actual.reset(self._token)
+        except ValueError:  # Cerrado en otro contexto (p.ej. un generador consumido desde otro hilo)
+            _span_actual.set(self.padre)
+        if exc is not None:
+            self.error = f"{tipo.__name__}: {exc}"
+        if self.padre is not None:
+            self.padre.hijos.append(self)
+        _registro.terminar(self)
+        return False
+
+    def atributo(self, clave: str, valor):
+        self.atributos[clave] = valor
+
+    def desglose(self) -> str:
+        """Dónde se fue el tiempo de este span: sus hijos directos y el resto sin instrumentar."""
+        partes = [f"{h.nombre} {h.duracion * 1000:.1f} ms" for h in self.hijos]
+        resto = self.duracion - sum(h.duracion for h in self.hijos)
+        return (f"⏱️ {self.nombre} {self.duracion * 1000:.1f} ms = " + " + ".join(partes)
+                + f"{' + ' if partes else ''}otros {max(resto, 0.0) * 1000:.1f} ms")
+
+
+class _Histograma:
+    __slots__ = ("limites", "cubetas", "n", "suma", "minimo", "maximo")
+
+    def __init__(self, limites: tuple = LIMITES_HISTOGRAMA):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)
+        self.n = 0
+        self.suma = 0.0
+        self.minimo = float("inf")
+        self.maximo = float("-inf")
+
+    def registrar(self, valor: float):
+        i = 0
+        while i < len(self.limites) and valor > self.limites[i]:
+            i += 1
+        self.cubetas[i] += 1
+        self.n += 1
+        self.suma += valor
+        self.minimo = min(self.minimo, valor)
+        self.maximo = max(self.maximo, valor)
+
+
+class _Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes: List[Span] = []
+        self._metricas_cambiadas = False
+        self.contadores: Dict[tuple, float] = defaultdict(float)
+        self.histogramas: Dict[tuple, _Histograma] = {}
+        self.duraciones: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MUESTRAS_RESUMEN))
+        self.inicio_ns = time.time_ns()
+        self._hilo: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._aviso_error = False
+
+    def terminar(self, span: Span):
+        # Camino caliente: solo encolar. El histograma de duraciones se actualiza al exportar.
+        with self._lock:
+            self._pendientes.append(span)
+            self.duraciones[span.nombre].append(span.duracion)
+
+    def contar(self, nombre: str, valor: float, atributos: dict):
+        with self._lock:
+            self.contadores[(nombre, tuple(sorted(atributos.items())))] += valor
+            self._metricas_cambiadas = True
+
+    def observar(self, nombre: str, valor: float, limites: tuple, atributos: dict):
+        with self._lock:
+            self._histograma((nombre, tuple(sorted(atributos.items()))), limites).registrar(valor)
+            self._metricas_cambiadas = True
+
+    def _histograma(self, clave: tuple, limites: tuple) -> _Histograma:
+        h = self.histogramas.get(clave)
+        if h is None:
+            h = self.histogramas[clave] = _Histograma(limites)
+        return h
+
+    # --- Exportación ---
+    def arrancar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="instrumentacion", daemon=True)
+            self._hilo.start()
+            atexit.register(self.exportar)
+
+    def _bucle(self):
+        while not self._parar.wait(INTERVALO_EXPORTACION):
+            self.exportar()
+
+    def exportar(self):
+        with self._lock:
+            spans, self._pendientes = self._pendientes, []
+            for sp in spans:
+                self._histograma((f"{sp.nombre}.segundos", ()), LIMITES_HISTOGRAMA).registrar(sp.duracion)
+            metricas = self._metricas_cambiadas or bool(spans)
+            self._metricas_cambiadas = False
+            contadores = dict(self.contadores)
+            histogramas = {k: (h.limites, list(h.cubetas), h.n, h.suma, h.minimo, h.maximo)
+                           for k, h in self.histogramas.items()}
+        if not spans and not metricas:
+            return
+        try:
+            if MODO == "otlp":
+                if spans:
+                    _enviar_otlp("/v1/traces", _otlp_trazas(spans))
+                if metricas:
+                    _enviar_otlp("/v1/metrics", _otlp_metricas(contadores, histogramas, self.inicio_ns))
+            else:
+                with open(RUTA_JSONL, "a", encoding="utf-8") as f:
+                    for s in spans:
+                        f.write(json.dumps(_span_dict(s), ensure_ascii=False, default=str) + "\n")
+                    if metricas:
+                        for linea in _metricas_dicts(contadores, histogramas):
+                            f.write(json.dumps(linea, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            if not self._aviso_error:
+                print(f"⚠️ Instrumentación: no se pudo exportar ({MODO}): {e}")
+                self._aviso_error = True
+
+
+_registro = _Registro()
+
+
+# --- Formatos de salida ---
+def _span_dict(s: Span) -> dict:
+    return {
+        "tipo": "span", "nombre": s.nombre, "traza": f"{s.traza:032x}", "id": f"{s.id:016x}",
+        "padre": f"{s.padre.id:016x}" if s.padre is not None else None,
+        "inicio_ns": s.inicio_ns, "duracion_ms": round(s.duracion * 1000, 3),
+        "atributos": s.atributos, "error": s.error,
+    }
+
+
+def _metricas_dicts(contadores: dict, histogramas: dict) -> List[dict]:
+    ahora = time.time_ns()
+    lineas = [{"tipo": "contador", "nombre": n, "atributos": dict(a), "valor": v, "ts_ns": ahora}
+              for (n, a), v in contadores.items()]
+    lineas += [{"tipo": "histograma", "nombre": n, "atributos": dict(a), "n": cnt, "suma": suma,
+                "min": mn, "max": mx, "limites": limites, "cubetas": cubetas, "ts_ns": ahora}
+               for (n, a), (limites, cubetas, cnt, suma, mn, mx) in histogramas.items()]
+    return lineas
+
+
+def _otlp_valor(valor) -> dict:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+def _otlp_atributos(atributos) -> List[dict]:
+    items = atributos.items() if isinstance(atributos, dict) else atributos
+    return [{"key": k, "value": _otlp_valor(v)} for k, v in items]
+
+
+def _otlp_recurso() -> dict:
+    return {"attributes": _otlp_atributos({"service.name": SERVICIO})}
+
+
+def _otlp_trazas(spans: List[Span]) -> dict:
+    return {"resourceSpans": [{"resource": _otlp_recurso(), "scopeSpans": [{
+        "scope": {"name": "instrumentacion"},
+        "spans": [{
+            "traceId": f"{s.traza:032x}", "spanId": f"{s.id:016x}",
+            "parentSpanId": f"{s.padre.id:016x}" if s.padre is not None else "",
+            "name": s.nombre, "kind": 1,
+            "startTimeUnixNano": str(s.inicio_ns), "endTimeUnixNano": str(s.fin_ns),
+            "attributes": _otlp_atributos(s.atributos),
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        } for s in spans],
+    }]}]}
+
+
+def _otlp_metricas(contadores: dict, histogramas: dict, inicio_ns: int) -> dict:
+    ahora = str(time.time_ns())
+    metricas = [{"name": n, "sum": {"aggregationTemporality": 2, "isMonotonic": True, "dataPoints": [{
+        "attributes": _otlp_atributos(a), "asDouble": v, "startTimeUnixNano": str(inicio_ns), "timeUnixNano": ahora,
+    }]}} for (n, a), v in contadores.items()]
+    metricas += [{"name": n, "histogram": {"aggregationTemporality": 2, "dataPoints": [{
+        "attributes": _otlp_atributos(a), "count": str(cnt), "sum": suma, "min": mn, "max": mx,
+        "bucketCounts": [str(c) for c in cubetas], "explicitBounds": [float(x) for x in limites],
+        "startTimeUnixNano": str(inicio_ns), "timeUnixNano": ahora,
+    }]}} for (n, a), (limites, cubetas, cnt, suma, mn, mx) in histogramas.items()]
+    return {"resourceMetrics": [{"resource": _otlp_recurso(), "scopeMetrics": [{
+        "scope": {"name": "instrumentacion"}, "metrics": metricas,
+    }]}]}
+
+
+def _enviar_otlp(ruta: str, cuerpo: dict):
+    peticion = urllib.request.Request(URL_OTLP + ruta, data=json.dumps(cuerpo).encode("utf-8"),
+                                      headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(peticion, timeout=5) as r:
+        r.read()
+
+
+# --- API pública ---
+def activar(modo: str = "jsonl", ruta: Optional[str] = None):
+    """Activa la instrumentación en tiempo de ejecución (además de con INSTRUMENTACION=...)."""
+    global _activo, MODO, RUTA_JSONL
+    if modo not in ("jsonl", "otlp"):
+        raise ValueError(f"Modo de instrumentación no soportado: {modo} (jsonl u otlp)")
+    MODO, RUTA_JSONL = modo, ruta or RUTA_JSONL
+    _activo = True
+    _registro.arrancar()
+
+
+def desactivar():
+    global _activo
+    _activo = False
+    _registro.exportar()
+
+
+def activo() -> bool:
+    return _activo
+
+
+def span(nombre: str, **atributos):
+    """`with span("lancedb.busqueda", k=10): ...` (no hace nada si está desactivada)."""
+    if not _activo:
+        return _NULO
+    return Span(nombre, atributos)
+
+
+def trazar(nombre: Optional[str] = None):
+    """Decorador: envuelve cada llamada a la función en un span."""
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltorio(*args, **kwargs):
+            if not _activo:
+                return funcion(*args, **kwargs)
+            with Span(etiqueta, {}):
+                return funcion(*args, **kwargs)
+        return envoltorio
+    return decorador
+
+
+def contador(nombre: str, valor: float = 1, **atributos):
+    if _activo:
+        _registro.contar(nombre, valor, atributos)
+
+
+def histograma(nombre: str, valor: float, limites: tuple = LIMITES_HISTOGRAMA, **atributos):
+    """`limites`: cubetas del histograma (segundos por defecto; LIMITES_CONTEO para tamaños)."""
+    if _activo:
+        _registro.observar(nombre, valor, limites, atributos)
+
+
+def exportar():
+    """Fuerza la exportación de lo pendiente (el hilo lo hace solo cada pocos segundos)."""
+    _registro.exportar()
+
+
+def resumen() -> str:
+    """Tabla por nombre de span: llamadas, p50, p99 y tiempo total (de las últimas muestras)."""
+    with _registro._lock:
+        datos = {n: sorted(d) for n, d in _registro.duraciones.items() if d}
+    lineas = [f"{'span':<28} {'n':>7} {'p50 ms':>9} {'p99 ms':>9} {'total s':>9}"]
+    for n, d in sorted(datos.items(), key=lambda x: -sum(x[1])):
+        p = lambda q: d[min(len(d) - 1, int(q * len(d)))] * 1000
+        lineas.append(f"{n:<28} {len(d):>7} {p(0.5):>9.2f} {p(0.99):>9.2f} {sum(d):>9.2f}")
+    return "\n".join(lineas)
+
+
+if MODO:
+    # Se importa desde todos los puntos de entrada: un valor mal escrito avisa, no los tumba
+    try:
+        activar(MODO)
+    except ValueError as e:
+        print(f"⚠️ INSTRUMENTACION={MODO!r} ignorada: {e}")
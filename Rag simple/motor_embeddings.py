@@ -0,0 +1,334 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from instrumentacion import LIMITES_CONTEO, histograma, span
+
+# Motor de embeddings por lotes:
+#   - Agrupa muchos fragmentos en una sola petición (batchEmbedContents admite hasta 100).
+#   - Lanza varias peticiones en paralelo (pool acotado de hilos).
+#   - Un "token bucket" limita las peticiones por segundo y se adapta si la API devuelve 429.
+#   - El orden de salida es siempre el mismo que el de entrada.
+#   - Cada vector es un np.ndarray float32 de forma (dim,): 3 KB para 768 dims,
+#     frente a ~24 KB de una lista de floats de Python.
+#   - Si la API rechaza un lote por su contenido (400), se reintenta por mitades hasta aislar los textos que fallan.
+# El modelo lo pone un backend intercambiable (EMBEDDINGS_MODELO):
+#   text-embedding-004 (defecto)  -> BackendGemini: API remota, 768 dims, con límite de tasa
+#   local:<repo HF o carpeta>     -> BackendLocal: sentence-transformer exportado a ONNX, en CPU y por
+#                                    lotes (onnxruntime + tokenizers), sin red una vez descargado
+
+MODELO_EMBEDDINGS = "text-embedding-004"
+MODELO_LOCAL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"  # 384 dims, multilingüe
+PREFIJO_LOCAL = "local:"
+MODELO_POR_DEFECTO = os.getenv("EMBEDDINGS_MODELO", MODELO_EMBEDDINGS)
+DIMENSIONES = {MODELO_EMBEDDINGS: 768, PREFIJO_LOCAL + MODELO_LOCAL: 384}
+Vector = np.ndarray  # float32, forma (dim,)
+
+
+def crear_cliente_genai(api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """Crea un cliente de Gemini. Si hay GEMINI_BASE_URL apunta a ese servidor (p.ej. el fake local)."""
+    from google import genai
+    from google.genai import types
+
+    base_url = base_url or os.getenv("GEMINI_BASE_URL")
+    api_key = api_key or os.getenv("GOOGLE_API_KEY")
+    if base_url:
+        return genai.Client(api_key=api_key or "fake", http_options=types.HttpOptions(base_url=base_url))
+    return genai.Client(api_key=api_key)
+
+
+def es_error_cuota(exc: Exception) -> bool:
+    """Detecta un 429 / RESOURCE_EXHAUSTED venga del SDK o de otra capa HTTP."""
+    codigo = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    texto = str(exc)
+    return codigo == 429 or "429" in texto or "RESOURCE_EXHAUSTED" in texto
+
+
+def es_error_entrada(exc: Exception) -> bool:
+    """
+    Un 400 / INVALID_ARGUMENT: la API rechaza algún texto del lote (demasiado largo, vacío...).
+    Solo estos se reintentan por partes; caídas, 5xx y timeouts fallarían igual en cada mitad.
+    """
+    codigo = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return codigo == 400 or "INVALID_ARGUMENT" in str(exc)
+
+
+class TokenBucket:
+    """Limitador de tasa compartido entre hilos, con ajuste adaptativo (AIMD)."""
+
+    def __init__(self, tasa: float, capacidad: Optional[float] = None, tasa_minima: float = 0.2):
+        self.tasa_maxima = tasa
+        self.tasa = tasa
+        self.tasa_minima = min(tasa_minima, tasa)
+        self.capacidad = capacidad if capacidad is not None else max(1.0, tasa)
+        self.tokens = self.capacidad
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _rellenar(self):
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+
+    def adquirir(self, n: float = 1.0):
+        """Bloquea hasta que haya `n` tokens disponibles."""
+        while True:
+            with self._lock:
+                self._rellenar()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                espera = (n - self.tokens) / self.tasa
+            time.sleep(espera)
+
+    def penalizar(self):
+        """La API nos ha frenado (429): reducimos la tasa a la mitad y vaciamos el cubo."""
+        with self._lock:
+            self.tasa = max(self.tasa_minima, self.tasa / 2)
+            self.tokens = 0.0
+
+    def recuperar(self):
+        """Petición correcta: subimos la tasa poco a poco hasta el máximo configurado."""
+        with self._lock:
+            self.tasa = min(self.tasa_maxima, self.tasa + self.tasa_maxima * 0.05)
+
+
+class BackendGemini:
+    """Embeddings remotos de Gemini: lotes de hasta 100 textos, varias peticiones en paralelo."""
+
+    tam_lote = 100
+    max_concurrencia = 4
+    peticiones_por_segundo: Optional[float] = 5.0
+
+    def __init__(self, client=None, modelo: str = MODELO_EMBEDDINGS):
+        self.client = client
+        self.nombre = modelo
+        self.dim = DIMENSIONES.get(modelo)
+
+    def embed_lote(self, textos: List[str]) -> List[Vector]:
+        if self.client is None:
+            self.client = crear_cliente_genai()
+        result = self.client.models.embed_content(model=self.nombre, contents=textos)
+        return [np.asarray(e.values, dtype=np.float32) for e in result.embeddings]
+
+
+class BackendLocal:
+    """
+    Sentence-transformer exportado a ONNX, en CPU: tokenizers + onnxruntime, mean pooling con la
+    máscara de atención y normalización L2 (lo mismo que hace sentence-transformers).
+    `modelo`: repo de Hugging Face (se descarga una vez a su caché) o carpeta con model.onnx
+    (u onnx/model.onnx) y tokenizer.json. Se carga en el primer lote.
+    Dentro de cada lote los textos se ordenan por longitud y van en sub-lotes de `tam_sublote`,
+    para no rellenar con padding los cortos hasta la longitud del más largo.
+    """
+
+    tam_lote = 256
+    max_concurrencia = 1  # onnxruntime ya usa todos los núcleos en cada llamada
+    peticiones_por_segundo: Optional[float] = None  # Sin límite de tasa
+
+    def __init__(self, modelo: str = MODELO_LOCAL, tam_sublote: int = 32, max_tokens: int = 256):
+        self.modelo = modelo
+        self.nombre = PREFIJO_LOCAL + modelo
+        self.dim = DIMENSIONES.get(self.nombre)
+        self.tam_sublote = tam_sublote
+        self.max_tokens = max_tokens
+        self._sesion = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _cargar(self):
+        with self._lock:
+            if self._sesion is not None:
+                return
+            import onnxruntime
+            from tokenizers import Tokenizer
+
+            carpeta = self.modelo
+            if not os.path.isdir(carpeta):
+                from huggingface_hub import snapshot_download
+                carpeta = snapshot_download(self.modelo, allow_patterns=["onnx/model.onnx", "model.onnx", "tokenizer.json"])
+            ruta_onnx = next(r for r in (os.path.join(carpeta, "onnx", "model.onnx"), os.path.join(carpeta, "model.onnx"))
+                             if os.path.exists(r))
+            tokenizer = Tokenizer.from_file(os.path.join(carpeta, "tokenizer.json"))
+            tokenizer.enable_truncation(self.max_tokens)
+            tokenizer.enable_padding()
+            sesion = onnxruntime.InferenceSession(ruta_onnx, providers=["CPUExecutionProvider"])
+            self._entradas = {e.name for e in sesion.get_inputs()}
+            self._tokenizer, self._sesion = tokenizer, sesion
+
+    def embed_lote(self, textos: List[str]) -> List[Vector]:
+        if self._sesion is None:
+            self._cargar()
+        orden = sorted(range(len(textos)), key=lambda i: len(textos[i]))
+        resultado: List[Optional[Vector]] = [None] * len(textos)
+        for i in range(0, len(orden), self.tam_sublote):
+            posiciones = orden[i:i + self.tam_sublote]
+            codificados = self._tokenizer.encode_batch([textos[p] for p in posiciones])
+            ids = np.array([c.ids for c in codificados], dtype=np.int64)
+            mascara = np.array([c.attention_mask for c in codificados], dtype=np.int64)
+            entradas = {"input_ids": ids, "attention_mask": mascara}
+            if "token_type_ids" in self._entradas:
+                entradas["token_type_ids"] = np.zeros_like(ids)
+            salida = self._sesion.run(None, entradas)[0]
+            if salida.ndim == 3:  # last_hidden_state (n, tokens, dim): media de los tokens reales
+                pesos = mascara[:, :, None].astype(np.float32)
+                salida = (salida * pesos).sum(axis=1) / np.maximum(pesos.sum(axis=1), 1e-9)
+            salida = salida / np.maximum(np.linalg.norm(salida, axis=1, keepdims=True), 1e-12)
+            for p, v in zip(posiciones, salida.astype(np.float32)):
+                resultado[p] = v
+        if self.dim is None:
+            self.dim = len(resultado[0])
+        return resultado
+
+
+def crear_backend(modelo: Optional[str] = None, client=None):
+    """Backend de `modelo` (EMBEDDINGS_MODELO por defecto): "local:..." en CPU, el resto Gemini."""
+    modelo = modelo or MODELO_POR_DEFECTO
+    if modelo.startswith(PREFIJO_LOCAL):
+        return BackendLocal(modelo[len(PREFIJO_LOCAL):])
+    return BackendGemini(client, modelo)
+
+
+def modelo_de(embedder) -> Optional[str]:
+    """Nombre del modelo de un embedder (CacheEmbeddings, MotorEmbeddings o uno que envuelva un motor)."""
+    modelo = getattr(embedder, "modelo", None)
+    if modelo is None and getattr(embedder, "motor", None) is not None:
+        modelo = getattr(embedder.motor, "modelo", None)
+    return modelo
+
+
+class MotorEmbeddings:
+    """Genera embeddings en lotes concurrentes respetando el límite de la API (o en CPU con BackendLocal)."""
+
+    def __init__(
+        self,
+        client=None,
+        modelo: Optional[str] = None,
+        tam_lote: Optional[int] = None,
+        max_concurrencia: Optional[int] = None,
+        peticiones_por_segundo: Optional[float] = None,
+        max_reintentos: int = 6,
+        espera_base: float = 0.5,
+        embed_lote: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        backend=None,
+    ):
+        """Lo que no se indique (tamaño de lote, concurrencia, límite de tasa) lo pone el backend."""
+        self.backend = backend or crear_backend(modelo, client)
+        self.modelo = self.backend.nombre
+        self.tam_lote = tam_lote or self.backend.tam_lote
+        self.max_concurrencia = max_concurrencia or self.backend.max_concurrencia
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        peticiones_por_segundo = peticiones_por_segundo or self.backend.peticiones_por_segundo
+        self.bucket = TokenBucket(peticiones_por_segundo) if peticiones_por_segundo else None
+        self._embed_lote = embed_lote or self.backend.embed_lote
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.errores_cuota = 0
+
+    @property
+    def client(self):
+        return getattr(self.backend, "client", None)
+
+    @client.setter
+    def client(self, client):
+        if isinstance(self.backend, BackendGemini):
+            self.backend.client = client
+
+    def _procesar_lote(self, textos: List[str], max_reintentos: Optional[int] = None) -> List[Vector]:
+        max_reintentos = self.max_reintentos if max_reintentos is None else max_reintentos
+        intento = 0
+        while True:
+            if self.bucket:
+                self.bucket.adquirir()
+            try:
+                with span("embeddings.api", textos=len(textos), intento=intento):
+                    vectores = self._embed_lote(textos)
+                with self._lock:
+                    self.peticiones += 1
+                if len(vectores) != len(textos):
+                    raise ValueError(f"La API devolvió {len(vectores)} vectores para {len(textos)} textos")
+                if self.bucket:
+                    self.bucket.recuperar()
+                # `embed_lote` propios (fakes, benchmarks) pueden devolver listas: todo sale como float32
+                return [np.asarray(v, dtype=np.float32) for v in vectores]
+            except Exception as e:
+                intento += 1
+                if intento > max_reintentos or es_error_entrada(e):  # El mismo lote volvería a fallar
+                    raise
+                if es_error_cuota(e):
+                    with self._lock:
+                        self.errores_cuota += 1
+                    if self.bucket:
+                        self.bucket.penalizar()
+                # Backoff exponencial con jitter para no sincronizar los reintentos de los hilos
+                time.sleep(self.espera_base * (2 ** (intento - 1)) * (0.5 + random.random()))
+
+    def _por_partes(self, textos: List[str]) -> List[Optional[Vector]]:
+        """
+        Un lote que la API rechazó por su contenido (es_error_entrada) se reintenta por mitades hasta
+        aislar los textos que fallan solos, que quedan como None: un chunk problemático no arrastra a
+        los demás. Con cualquier otro error (cuota, caída, 5xx) la mitad entera queda como None:
+        dividir solo multiplicaría las peticiones.
+        """
+        if len(textos) == 1:
+            return [None]
+        mitad = len(textos) // 2
+        resultado: List[Optional[Vector]] = []
+        for parte in (textos[:mitad], textos[mitad:]):
+            try:
+                resultado += self._procesar_lote(parte, max_reintentos=1)
+            except Exception as e:
+                resultado += self._por_partes(parte) if es_error_entrada(e) else [None] * len(parte)
+        return resultado
+
+    def embed(
+        self,
+        textos: Sequence[str],
+        tolerante: bool = False,
+        progreso: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Optional[Vector]]:
+        """
+        Devuelve un vector por texto, en el mismo orden.
+        Con `tolerante=True` los lotes que fallan quedan como None en vez de propagar la excepción;
+        si la API rechazó algún texto del lote, se reintenta por partes y solo esos quedan como None.
+        """
+        textos = list(textos)
+        lotes = [textos[i:i + self.tam_lote] for i in range(0, len(textos), self.tam_lote)]
+        resultados: List[Optional[Vector]] = [None] * len(textos)
+        if not lotes:
+            return resultados
+
+        hechos = 0
+        histograma("embeddings.lote", len(textos), LIMITES_CONTEO)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrencia, len(lotes))) as pool:
+            # Cada lote en una copia del contexto: sus spans cuelgan del span de quien llama
+            futuros = [pool.submit(contextvars.copy_context().run, self._procesar_lote, lote) for lote in lotes]
+            for n, futuro in enumerate(futuros):
+                inicio = n * self.tam_lote
+                try:
+                    vectores = futuro.result()
+                except Exception as e:
+                    if not tolerante:
+                        raise
+                    rango = f"{inicio}-{inicio + len(lotes[n]) - 1}"
+                    if es_error_entrada(e):
+                        print(f"   ⚠️ Error en lote {rango}: {e} (se reintenta por partes)")
+                        vectores = self._por_partes(lotes[n])
+                        fallidos = sum(v is None for v in vectores)
+                        if fallidos:
+                            print(f"   ❌ {fallidos} textos del lote {rango} siguen fallando")
+                    else:
+                        print(f"   ⚠️ Error en lote {rango}: {e}")
+                        vectores = [None] * len(lotes[n])
+                resultados[inicio:inicio + len(vectores)] = vectores
+                hechos += sum(v is not None for v in vectores)
+                if progreso:
+                    progreso(hechos, len(textos))
+        return resultados
@@ -0,0 +1,450 @@
+import os
+import math
+import json
+import time
+import argparse
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+
+from almacenamiento_vectores import (columnas_a_leer, dimension_de_esquema, modelo_de_esquema, tipo_de_esquema,
+                                     vectores_de_arrow)
+from cache_embeddings import obtener_cache
+from indice_vectorial import IndiceVectorial
+from instrumentacion import span
+
+# Retriever de larga vida: una conexión LanceDB, un handle de tabla y un cliente Gemini
+# (el de la caché de embeddings) para todo el proceso. Las búsquedas son thread-safe.
+# La búsqueda por defecto es híbrida: vector + texto completo (BM25, índice FTS de LanceDB)
+# fusionados con Reciprocal Rank Fusion, para no perder coincidencias exactas de nombres de
+# herramientas, títulos de cursos o siglas. RETRIEVER_MODO=vector|texto|hibrido.
+# Si la tabla guarda los vectores en float16 o int8 (LANCEDB_VECTOR_TIPO del indexador), se
+# piden k * LANCEDB_REESCORADO candidatos y se re-puntúan con el vector float32 exacto.
+# Las preguntas se embeden con el modelo con que se indexó la tabla (metadatos de su esquema).
+# Con varias colecciones (colecciones.py), LANCEDB_COLECCION=a,b hace que obtener_retriever
+# busque en esas colecciones en vez de en la tabla `documentos`.
+# Opcionalmente se publica por HTTP local para que varios procesos (agentes, asistente)
+# compartan la misma tabla abierta:
+#   python servicio_retriever.py --puerto 8770
+#   export RETRIEVER_URL=http://127.0.0.1:8770
+
+TABLA = "documentos"
+COLUMNAS = ["text", "source", "id", "chunk_hash"]  # Proyección: el vector solo se trae si se pide (con_vectores)
+MODO = os.getenv("RETRIEVER_MODO", "hibrido")
+K_RRF = 60  # Constante habitual de RRF: amortigua el peso de las primeras posiciones
+REESCORADO = int(os.getenv("LANCEDB_REESCORADO", "4"))  # Candidatos por resultado con vectores cuantizados
+
+
+class Resultado(NamedTuple):
+    text: str
+    distancia: float  # L2 con la pregunta; NaN en la búsqueda solo de texto (su orden es `puntuacion`)
+    source: Optional[str] = None
+    id: Optional[int] = None
+    vector: Optional[np.ndarray] = None  # float32; solo con con_vectores=True (deduplicado / MMR del contexto)
+    coleccion: Optional[str] = None  # Solo en búsquedas a través del registro de colecciones
+    puntuacion: Optional[float] = None  # BM25; solo en resultados de la búsqueda de texto
+    chunk_hash: Optional[str] = None  # Identidad del chunk dentro de su source (sha256 del texto)
+
+    def relevancia(self) -> str:
+        """Para mostrar: la distancia o, en resultados solo de texto, la puntuación BM25."""
+        if math.isnan(self.distancia) and self.puntuacion is not None:
+            return f"BM25: {self.puntuacion:.2f}"
+        return f"Dist: {self.distancia:.4f}"
+
+
+def _env_int(nombre: str) -> Optional[int]:
+    valor = os.getenv(nombre)
+    return int(valor) if valor else None
+
+
+def _sql(valor: str) -> str:
+    return "'" + valor.replace("'", "''") + "'"
+
+
+def localizar_db() -> Optional[str]:
+    """LANCEDB_PATH si está definida; si no, lancedb_data en el directorio padre, el cwd o la raíz del repo."""
+    if os.getenv("LANCEDB_PATH"):
+        return os.getenv("LANCEDB_PATH")
+    raiz = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    candidatas = ["../lancedb_data", "./lancedb_data", os.path.join(raiz, "lancedb_data")]
+    return next((p for p in candidatas if os.path.exists(p)), None)
+
+
+def fusion_rrf(listas: Sequence[Sequence[Resultado]], k: int, k_rrf: int = K_RRF) -> List[Resultado]:
+    """Reciprocal Rank Fusion: cada lista aporta 1 / (k_rrf + posición) a cada chunk (colección, source, chunk_hash)."""
+    puntos: Dict[tuple, float] = {}
+    por_clave: Dict[tuple, Resultado] = {}
+    for lista in listas:
+        for posicion, r in enumerate(lista, 1):
+            clave = (r.coleccion, r.source, r.chunk_hash)
+            puntos[clave] = puntos.get(clave, 0.0) + 1.0 / (k_rrf + posicion)
+            por_clave.setdefault(clave, r)
+    return [por_clave[c] for c in sorted(puntos, key=puntos.get, reverse=True)[:k]]
+
+
+class Retriever:
+    def __init__(
+        self,
+        db_path: str,
+        tabla: str = TABLA,
+        intervalo_recarga: float = 30.0,
+        nprobes: Optional[int] = None,
+        refine_factor: Optional[int] = None,
+        modo: str = MODO,
+        reescorado: int = REESCORADO,
+        db=None,
+    ):
+        """
+        `modo`: vector, texto (solo BM25) o hibrido (ambos fusionados con RRF).
+        `nprobes` (particiones IVF visitadas) y `refine_factor` (candidatos extra re-puntuados
+        con el vector exacto) solo afectan cuando la tabla tiene índice ANN; si no se pasan,
+        se leen de LANCEDB_NPROBES / LANCEDB_REFINE_FACTOR.
+        `reescorado`: candidatos por resultado pedidos cuando la tabla está en float16/int8.
+        `db`: conexión LanceDB ya abierta para compartirla (registro de colecciones).
+        """
+        self.db_path = db_path
+        self.nombre_tabla = tabla
+        self.intervalo_recarga = intervalo_recarga
+        self.nprobes = nprobes if nprobes is not None else _env_int("LANCEDB_NPROBES")
+        self.refine_factor = refine_factor if refine_factor is not None else _env_int("LANCEDB_REFINE_FACTOR")
+        self.modo = modo
+        self.reescorado = reescorado
+        self._aviso_fts = False
+        self._embedder = None  # Por defecto, la caché del modelo de la tabla (ver `embedder`)
+        self._modelo = None
+        self._dim = None
+        self._db = db
+        self._tbl = None
+        self._tipo_vector = "float32"
+        self._int8 = None  # (versión de la tabla, IndiceVectorial, fuentes, chunk_hash) en modo int8
+        self._abierta_en = 0.0
+        self._lock = threading.Lock()
+
+    def tabla(self):
+        """Handle compartido; se reabre cada `intervalo_recarga` s para ver lo que añada el indexador."""
+        if self._tbl is not None and time.monotonic() - self._abierta_en < self.intervalo_recarga:
+            return self._tbl
+        with self._lock:
+            if self._tbl is None or time.monotonic() - self._abierta_en >= self.intervalo_recarga:
+                import lancedb
+                if self._db is None:
+                    self._db = lancedb.connect(self.db_path)
+                self._tbl = self._db.open_table(self.nombre_tabla)
+                self._tipo_vector = tipo_de_esquema(self._tbl.schema) or "float32"
+                self._modelo = modelo_de_esquema(self._tbl.schema)
+                self._dim = dimension_de_esquema(self._tbl.schema)
+                self._abierta_en = time.monotonic()
+        return self._tbl
+
+    @property
+    def embedder(self):
+        """
+        Con qué se embeden las preguntas: el que se asigne explícitamente o, si no, la caché del
+        modelo con que se indexó la tabla (aunque EMBEDDINGS_MODELO diga otro).
+        """
+        if self._embedder is not None:
+            return self._embedder
+        if self._tbl is None:
+            try:
+                self.tabla()
+            except Exception:
+                pass  # Sin tabla todavía: el modelo por defecto
+        return obtener_cache(modelo=self._modelo)
+
+    @embedder.setter
+    def embedder(self, embedder):
+        self._embedder = embedder
+
+    def tipo_vector(self) -> str:
+        self.tabla()
+        return self._tipo_vector
+
+    def precalentar(self):
+        """Lo que pagaría la primera pregunta: importar lancedb, abrir la tabla y cargar sus índices."""
+        if self.tipo_vector() == "int8":
+            self._indice_int8()
+        if self.modo != "vector":
+            try:
+                self.tabla().search("precalentar", query_type="fts").limit(1).select(COLUMNAS + ["_score"]).to_arrow()
+            except Exception:
+                pass  # Sin índice FTS: buscar_texto ya avisará en la primera pregunta
+
+    def _indice_int8(self):
+        """Códigos vector_i8 de toda la tabla en un IndiceVectorial int8; se rehace si cambia la versión."""
+        tbl = self.tabla()
+        version = tbl.version
+        if self._int8 is not None and self._int8[0] == version:
+            return self._int8
+        with self._lock:
+            if self._int8 is None or self._int8[0] != version:
+                n = tbl.count_rows()
+                t = tbl.search().select(["source", "chunk_hash", "vector_i8"]).limit(max(n, 1)).to_arrow()
+                columna = t.column("vector_i8").combine_chunks()
+                indice = IndiceVectorial(columna.type.list_size, "int8", capacidad=max(t.num_rows, 1))
+                if t.num_rows:
+                    indice.agregar_int8(columna.flatten().to_numpy().reshape(t.num_rows, -1))
+                self._int8 = (version, indice, t.column("source").to_pylist(), t.column("chunk_hash").to_pylist())
+        return self._int8
+
+    def consulta(self, q_vec: np.ndarray, k: int, con_vectores: bool = False):
+        q = self.tabla().search(q_vec).limit(k).select(COLUMNAS + ["vector"] if con_vectores else COLUMNAS)
+        if self.nprobes:
+            q = q.nprobes(self.nprobes)
+        if self.refine_factor:
+            q = q.refine_factor(self.refine_factor)
+        return q
+
+    def buscar_arrow(self, q_vec: np.ndarray, k: int = 3, con_vectores: bool = False):
+        """Resultados como pyarrow.Table (text, source, id, _distance), sin pasar por pandas."""
+        return self.consulta(q_vec, k, con_vectores).to_arrow()
+
+    def _candidatos_int8(self, q_vec: np.ndarray, n: int):
+        """
+        Top-n por coseno sobre los códigos int8 en memoria; devuelve sus filas de la tabla,
+        buscadas por (source, chunk_hash), que el indexador mantiene únicos.
+        """
+        _, indice, fuentes, hashes = self._indice_int8()
+        _, posiciones = indice.buscar(q_vec, n)
+        columnas = COLUMNAS + columnas_a_leer("int8")
+        if not len(posiciones[0]):  # Tabla vacía
+            return pa.schema([self.tabla().schema.field(c) for c in columnas]).empty_table()
+        por_fuente: Dict[str, List[str]] = {}
+        for p in posiciones[0]:
+            por_fuente.setdefault(fuentes[p], []).append(hashes[p])
+        filtro = " OR ".join(
+            f"(source = {_sql(f)} AND chunk_hash IN ({', '.join(map(_sql, h))}))" for f, h in por_fuente.items()
+        )
+        return self.tabla().search().where(filtro).select(columnas).limit(len(posiciones[0])).to_arrow()
+
+    def _reescorar(self, q_vec: np.ndarray, t, k: int, con_vectores: bool) -> List[Resultado]:
+        """
+        Distancia L2 exacta de los candidatos: vector float32 de la caché de embeddings si está
+        (sin llamar a la API) y, si no, el guardado en la tabla (float16 o int8 descuantizado).
+        """
+        if t.num_rows == 0:
+            return []
+        m = vectores_de_arrow(t)
+        textos = t.column("text").to_pylist()
+        buscar_cacheados = getattr(self.embedder, "buscar_cacheados", None)
+        if buscar_cacheados is not None:
+            for i, v in enumerate(buscar_cacheados(textos)):
+                if v is not None and len(v) == m.shape[1]:
+                    m[i] = v
+        distancias = ((m - np.asarray(q_vec, dtype=np.float32)) ** 2).sum(axis=1)
+        orden = np.argsort(distancias, kind="stable")[:k]
+        fuentes, ids, hashes = (t.column(c).to_pylist() for c in ("source", "id", "chunk_hash"))
+        return [
+            Resultado(textos[i], float(distancias[i]), fuentes[i], ids[i], m[i] if con_vectores else None,
+                      chunk_hash=hashes[i])
+            for i in orden
+        ]
+
+    def buscar_vector(self, q_vec: np.ndarray, k: int = 3, con_vectores: bool = False) -> List[Resultado]:
+        tipo = self.tipo_vector()
+        if self._dim and len(q_vec) != self._dim:
+            raise ValueError(f"La pregunta tiene {len(q_vec)} dimensiones y la tabla '{self.nombre_tabla}' "
+                             f"{self._dim} (indexada con {self._modelo})")
+        if tipo in ("int8", "float16"):
+            with span("lancedb.vector", k=k * self.reescorado, tipo=tipo):
+                if tipo == "int8":
+                    t = self._candidatos_int8(q_vec, k * self.reescorado)
+                else:
+                    t = self.buscar_arrow(q_vec, k * self.reescorado, True)
+            with span("reescorado", candidatos=t.num_rows):
+                return self._reescorar(q_vec, t, k, con_vectores)
+        with span("lancedb.vector", k=k, tipo=tipo):
+            t = self.buscar_arrow(q_vec, k, con_vectores)
+        with span("conversion", filas=t.num_rows):
+            vectores = list(vectores_de_arrow(t)) if con_vectores else [None] * t.num_rows
+            return [
+                Resultado(texto, dist, source, id_, vec, chunk_hash=h) for texto, dist, source, id_, vec, h in zip(
+                    t.column("text").to_pylist(), t.column("_distance").to_pylist(),
+                    t.column("source").to_pylist(), t.column("id").to_pylist(), vectores,
+                    t.column("chunk_hash").to_pylist(),
+                )
+            ]
+
+    def buscar_texto(self, query: str, k: int = 3, q_vec: Optional[np.ndarray] = None,
+                     con_vectores: bool = False) -> List[Resultado]:
+        """
+        BM25 sobre el índice FTS de `text`. Con `q_vec`, la distancia de cada resultado se calcula
+        contra la pregunta (misma métrica L2 que LanceDB), para que sea comparable con la vectorial;
+        sin él (modo texto, que no embede la pregunta) la distancia queda en NaN y cuenta `puntuacion`.
+        Sin índice FTS (tabla antigua) devuelve [] y se avisa una vez.
+        """
+        traer_vector = con_vectores or q_vec is not None
+        columnas = COLUMNAS + columnas_a_leer(self.tipo_vector()) if traer_vector else COLUMNAS
+        try:
+            with span("lancedb.texto", k=k):
+                t = self.tabla().search(query, query_type="fts").limit(k).select(columnas + ["_score"]).to_arrow()
+        except Exception as e:
+            if not self._aviso_fts:
+                print(f"⚠️ Búsqueda de texto no disponible (¿falta el índice FTS? reindexa): {e}")
+                self._aviso_fts = True
+            return []
+        with span("conversion", filas=t.num_rows):
+            vectores = list(vectores_de_arrow(t)) if traer_vector and t.num_rows else [None] * t.num_rows
+            if q_vec is not None and t.num_rows:
+                m = np.stack(vectores)
+                distancias = (((m - np.asarray(q_vec, dtype=np.float32)) ** 2).sum(axis=1)).tolist()
+            else:
+                distancias = [float("nan")] * t.num_rows
+            return [
+                Resultado(texto, dist, source, id_, vec if con_vectores else None, puntuacion=score, chunk_hash=h)
+                for texto, dist, source, id_, vec, score, h in zip(
+                    t.column("text").to_pylist(), distancias, t.column("source").to_pylist(),
+                    t.column("id").to_pylist(), vectores, t.column("_score").to_pylist(),
+                    t.column("chunk_hash").to_pylist(),
+                )
+            ]
+
+    def buscar_hibrido(self, query: str, k: int = 3, con_vectores: bool = False,
+                       candidatos: Optional[int] = None, q_vec: Optional[np.ndarray] = None) -> List[Resultado]:
+        """Vector + BM25 fusionados con RRF; cada rama aporta `candidatos` (por defecto max(2k, 20))."""
+        candidatos = candidatos or max(2 * k, 20)
+        q_vec = self._embed(query) if q_vec is None else q_vec
+        por_vector = self.buscar_vector(q_vec, candidatos, con_vectores)
+        por_texto = self.buscar_texto(query, candidatos, q_vec, con_vectores)
+        with span("fusion_rrf"):
+            return fusion_rrf([por_vector, por_texto], k)
+
+    def _embed(self, query: str) -> np.ndarray:
+        with span("embedding"):
+            return self.embedder.embed_uno(query)
+
+    def buscar(self, query: str, k: int = 3, con_vectores: bool = False, modo: Optional[str] = None,
+               q_vec: Optional[np.ndarray] = None) -> List[Resultado]:
+        """`q_vec`: embedding de la pregunta ya calculado (búsqueda en varias colecciones a la vez)."""
+        modo = modo or self.modo
+        with span("retriever.buscar", modo=modo, k=k):
+            if modo == "hibrido":
+                return self.buscar_hibrido(query, k, con_vectores, q_vec=q_vec)
+            if modo == "texto":
+                return self.buscar_texto(query, k, con_vectores=con_vectores)
+            return self.buscar_vector(self._embed(query) if q_vec is None else q_vec, k, con_vectores)
+
+
+class RetrieverRemoto:
+    """Misma interfaz que Retriever, pero contra el servicio HTTP local (`coleccion`: una o varias, con comas)."""
+
+    def __init__(self, url: str, timeout: float = 30.0, coleccion: Optional[str] = None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.coleccion = coleccion
+
+    def precalentar(self):
+        pass  # La tabla la tiene abierta el servicio
+
+    def buscar(self, query: str, k: int = 3, con_vectores: bool = False, modo: Optional[str] = None) -> List[Resultado]:
+        params = {"q": query, "k": k, "vectores": int(con_vectores)}
+        if modo:
+            params["modo"] = modo
+        if self.coleccion:
+            params["coleccion"] = self.coleccion
+        params = urllib.parse.urlencode(params)
+        with urllib.request.urlopen(f"{self.url}/buscar?{params}", timeout=self.timeout) as r:
+            filas = json.load(r)["resultados"]
+        return [Resultado(**dict(f, vector=None if f.get("vector") is None else np.asarray(f["vector"], dtype=np.float32)))
+                for f in filas]
+
+
+_retrievers: Dict[str, Retriever] = {}
+_retrievers_lock = threading.Lock()
+
+
+def obtener_retriever(db_path: Optional[str] = None, coleccion: Optional[str] = None):
+    """
+    Retriever compartido del proceso (o remoto si hay RETRIEVER_URL). None si no hay base de datos.
+    `coleccion` (o LANCEDB_COLECCION): una o varias colecciones separadas por comas (colecciones.py).
+    """
+    coleccion = coleccion or os.getenv("LANCEDB_COLECCION")
+    if os.getenv("RETRIEVER_URL"):
+        return RetrieverRemoto(os.getenv("RETRIEVER_URL"), coleccion=coleccion)
+    db_path = db_path or localizar_db()
+    if not db_path or not os.path.exists(db_path):
+        return None
+    if coleccion:
+        from colecciones import obtener_registro  # colecciones importa este módulo
+        return obtener_registro(db_path).vista(coleccion)
+    clave = os.path.abspath(db_path)
+    with _retrievers_lock:
+        if clave not in _retrievers:
+            _retrievers[clave] = Retriever(db_path)
+        return _retrievers[clave]
+
+
+def precalentar(db_path: Optional[str] = None, coleccion: Optional[str] = None):
+    """Retriever compartido con la tabla ya abierta (para el hilo de fondo del arranque, arranque.py)."""
+    retriever = obtener_retriever(db_path, coleccion)
+    if retriever is not None:
+        retriever.precalentar()
+    return retriever
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/buscar":
+            self.send_error(404)
+            return
+        params = urllib.parse.parse_qs(url.query)
+        try:
+            argumentos = (params["q"][0], int(params.get("k", ["3"])[0]), params.get("vectores", ["0"])[0] == "1",
+                          params.get("modo", [None])[0])
+            if "coleccion" in params:
+                resultados = self.server.registro.buscar(params["coleccion"][0], *argumentos)
+            else:
+                resultados = self.server.retriever.buscar(*argumentos)
+            filas = [dict(r._asdict(), vector=None if r.vector is None else r.vector.tolist()) for r in resultados]
+            codigo, cuerpo = 200, {"resultados": filas}
+        except Exception as e:
+            codigo, cuerpo = 500, {"error": str(e)}
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Servicio de búsqueda compartido sobre LanceDB")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8770)
+    args = parser.parse_args()
+
+    load_dotenv()
+    db_path = args.db or localizar_db()
+    if not db_path:
+        print("❌ No encuentro la carpeta lancedb_data. Ejecuta el indexador primero.")
+        return
+    from colecciones import obtener_registro
+
+    registro = obtener_registro(db_path)
+    retriever = Retriever(db_path, db=registro.conexion())
+    retriever.tabla()  # Abrimos la tabla antes de aceptar peticiones
+
+    servidor = ThreadingHTTPServer((args.host, args.puerto), _Handler)
+    servidor.daemon_threads = True
+    servidor.retriever = retriever
+    servidor.registro = registro  # ?coleccion=a,b: colecciones del registro (LRU de tablas abiertas)
+    print(f"🛰️ Retriever sirviendo {db_path} en http://{args.host}:{args.puerto}/buscar?q=...&k=3")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
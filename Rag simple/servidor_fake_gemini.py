@@ -0,0 +1,232 @@
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+import argparse
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+# Servidor local que imita la API REST de Gemini para pruebas y benchmarks sin cuota.
+# Uso desde código:  servidor, url = iniciar_servidor(latencia=0.05)
+#                    os.environ["GEMINI_BASE_URL"] = url
+# Los vectores son "bag of words" con hashing: textos con palabras comunes se parecen,
+# así que las búsquedas sobre ellos tienen sentido (a diferencia de vectores aleatorios).
+# generateContent / streamGenerateContent devuelven una respuesta simulada troceada en tokens,
+# con `retardo_token` segundos entre token y token en modo streaming, y `retardo_prompt`
+# segundos por palabra del prompt antes del primer token (coste de procesar la entrada).
+# Con responseMimeType=application/json y un responseSchema (response_schema=CoursePlan en el SDK),
+# generateContent devuelve un JSON que cumple el esquema; una fracción `tasa_json_invalido`
+# sale rota (campo que falta, tipo equivocado o JSON truncado) para probar los reintentos.
+
+DIMENSION = 768
+
+
+def vector_falso(texto: str, dim: int = DIMENSION) -> List[float]:
+    vec = [0.0] * dim
+    for palabra in texto.lower().split():
+        h = int.from_bytes(hashlib.md5(palabra.encode("utf-8")).digest()[:8], "little")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norma = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norma for x in vec]
+
+
+def texto_prompt(cuerpo: dict) -> str:
+    partes = []
+    for content in cuerpo.get("contents", []):
+        partes.extend(p.get("text", "") for p in content.get("parts", []))
+    return " ".join(partes)
+
+
+def respuesta_falsa(prompt: str, tokens: int) -> List[str]:
+    palabras = prompt.split()[-tokens:] or ["vacío"]
+    return ["Respuesta", " simulada:"] + [f" {p}" for p in palabras][: max(0, tokens - 2)]
+
+
+def json_falso(esquema: dict, prompt: str):
+    """Valor que cumple `esquema` (formato OpenAPI del SDK o JSON Schema), derivado del prompt."""
+    tipo = str(esquema.get("type", "STRING")).upper()
+    palabras = prompt.split() or ["tema"]
+    if tipo == "OBJECT":
+        return {k: json_falso(v, f"{prompt} {k}") for k, v in esquema.get("properties", {}).items()}
+    if tipo == "ARRAY":
+        return [json_falso(esquema.get("items", {}), f"{prompt} {i}") for i in range(2 + len(palabras) % 4)]
+    if tipo == "INTEGER":
+        return 1 + len(palabras) % 12
+    if tipo == "NUMBER":
+        return float(len(palabras) % 10)
+    if tipo == "BOOLEAN":
+        return len(palabras) % 2 == 0
+    return " ".join(palabras[-3:])
+
+
+def estropear_json(valor: dict, rnd: random.Random) -> str:
+    """Los fallos típicos de un LLM con salida estructurada."""
+    fallo = rnd.choice(["falta_campo", "tipo", "truncado"])
+    if fallo == "truncado" or not valor:
+        texto = json.dumps(valor, ensure_ascii=False)
+        return texto[: max(1, len(texto) // 2)]
+    clave = rnd.choice(sorted(valor))
+    if fallo == "falta_campo":
+        valor = {k: v for k, v in valor.items() if k != clave}
+    else:
+        valor = dict(valor, **{clave: {"valor": valor[clave]}})
+    return json.dumps(valor, ensure_ascii=False)
+
+
+def _candidato(texto: str, final: bool) -> dict:
+    candidato = {"content": {"parts": [{"text": texto}], "role": "model"}, "index": 0}
+    if final:
+        candidato["finishReason"] = "STOP"
+    return {"candidates": [candidato]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, codigo: int, cuerpo: dict):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _responder_sse(self, eventos):
+        """Server-Sent Events con transfer-encoding chunked (lo que usa ?alt=sse)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for evento in eventos:
+            datos = f"data: {json.dumps(evento)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(datos):x}\r\n".encode() + datos + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _generar(self, cuerpo: dict) -> List[str]:
+        prompt = texto_prompt(cuerpo)
+        if self.server.retardo_prompt:
+            time.sleep(self.server.retardo_prompt * len(prompt.split()))
+        return respuesta_falsa(prompt, self.server.tokens_respuesta)
+
+    def _limite_superado(self) -> bool:
+        limite = self.server.limite_rps
+        if not limite:
+            return False
+        ahora = time.monotonic()
+        with self.server.lock:
+            ventana = self.server.ventana
+            while ventana and ahora - ventana[0] > 1.0:
+                ventana.popleft()
+            if len(ventana) >= limite:
+                return True
+            ventana.append(ahora)
+        return False
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+        ruta = self.path.split("?")[0]
+
+        with self.server.lock:
+            self.server.peticiones += 1
+        if self._limite_superado():
+            self._responder(429, {"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}})
+            return
+        time.sleep(self.server.latencia)
+
+        dim = self.server.dimension
+        if ruta.endswith(":batchEmbedContents"):
+            embeddings = []
+            for req in cuerpo.get("requests", []):
+                texto = " ".join(p.get("text", "") for p in req.get("content", {}).get("parts", []))
+                embeddings.append({"values": vector_falso(texto, dim)})
+            self._responder(200, {"embeddings": embeddings})
+        elif ruta.endswith(":embedContent"):
+            texto = " ".join(p.get("text", "") for p in cuerpo.get("content", {}).get("parts", []))
+            self._responder(200, {"embedding": {"values": vector_falso(texto, dim)}})
+        elif ruta.endswith(":streamGenerateContent"):
+            tokens = self._generar(cuerpo)
+
+            def eventos():
+                for i, tok in enumerate(tokens):
+                    if i:
+                        time.sleep(self.server.retardo_token)
+                    yield _candidato(tok, final=i == len(tokens) - 1)
+
+            self._responder_sse(eventos())
+        elif ruta.endswith(":generateContent"):
+            tokens = self._generar(cuerpo)
+            time.sleep(self.server.retardo_token * (len(tokens) - 1))
+            config = cuerpo.get("generationConfig", {})
+            esquema = config.get("responseSchema") or config.get("responseJsonSchema")
+            if config.get("responseMimeType") == "application/json" and esquema:
+                valor = json_falso(esquema, texto_prompt(cuerpo))
+                with self.server.lock:
+                    invalido = self.server.rnd.random() < self.server.tasa_json_invalido
+                    texto = estropear_json(valor, self.server.rnd) if invalido else json.dumps(valor, ensure_ascii=False)
+                self._responder(200, _candidato(texto, final=True))
+            else:
+                self._responder(200, _candidato("".join(tokens), final=True))
+        else:
+            self._responder(404, {"error": {"code": 404, "message": f"Ruta no soportada: {ruta}", "status": "NOT_FOUND"}})
+
+
+def iniciar_servidor(
+    latencia: float = 0.05,
+    limite_rps: Optional[int] = None,
+    dimension: int = DIMENSION,
+    retardo_token: float = 0.02,
+    tokens_respuesta: int = 40,
+    retardo_prompt: float = 0.0,
+    tasa_json_invalido: float = 0.0,
+    host: str = "127.0.0.1",
+    puerto: int = 0,
+):
+    """Arranca el servidor en un hilo daemon y devuelve (servidor, url_base)."""
+    servidor = ThreadingHTTPServer((host, puerto), _Handler)
+    servidor.daemon_threads = True
+    servidor.latencia = latencia
+    servidor.limite_rps = limite_rps
+    servidor.dimension = dimension
+    servidor.retardo_token = retardo_token
+    servidor.tokens_respuesta = tokens_respuesta
+    servidor.retardo_prompt = retardo_prompt
+    servidor.tasa_json_invalido = tasa_json_invalido
+    servidor.rnd = random.Random(0)
+    servidor.lock = threading.Lock()
+    servidor.ventana = deque()
+    servidor.peticiones = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor fake de la API de Gemini")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--limite-rps", type=int, default=None)
+    parser.add_argument("--retardo-token", type=float, default=0.02)
+    parser.add_argument("--retardo-prompt", type=float, default=0.0)
+    parser.add_argument("--tasa-json-invalido", type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(args.latencia, args.limite_rps, retardo_token=args.retardo_token,
+                                     retardo_prompt=args.retardo_prompt, tasa_json_invalido=args.tasa_json_invalido,
+                                     puerto=args.puerto)
+    print(f"🧪 Fake Gemini escuchando en {url} (export GEMINI_BASE_URL={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import asistente_rag_completo as asistente
+from cache_embeddings import obtener_cache
+from cache_respuestas import ids_contexto
+from constructor_contexto import construir_contexto
+from servicio_retriever import obtener_retriever
+
+# Servidor RAG asíncrono: muchas preguntas concurrentes sobre HTTP.
+#   POST /preguntar  {"pregunta": "..."}  ->  {"respuesta": "...", "tiempos": {...}}
+# Cada petición pasa por embed -> búsqueda -> generación, pero mientras una espera a Gemini
+# otras pueden estar embebiendo o buscando (las etapas se solapan entre peticiones).
+# Un semáforo limita las llamadas simultáneas al LLM y cada petición tiene un timeout.
+
+
+class ServidorRAG:
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_llm: int = 8,
+        timeout: float = 30.0,
+        k: int = 10,
+        hilos: int = 32,
+        usar_cache_respuestas: bool = True,
+    ):
+        # Mismo cliente, cachés y prompt que el asistente interactivo
+        self.client = asistente.cliente()
+        self.cache_respuestas = asistente.cache_respuestas if usar_cache_respuestas else None
+        self.retriever = obtener_retriever(db_path)
+        if self.retriever is None:
+            raise RuntimeError("No encuentro la carpeta lancedb_data. Ejecuta el indexador primero.")
+        # La pregunta se embede con el modelo de la tabla (el remoto embede en el servicio)
+        self.embedder = getattr(self.retriever, "embedder", None) or obtener_cache()
+        self.max_llm = max_llm
+        self.timeout = timeout
+        self.k = k
+        self.hilos = hilos
+        self.en_vuelo_llm = 0
+        self.puerto: Optional[int] = None  # El que se abrió de verdad (con puerto=0 lo elige el SO)
+        # asyncio.Semaphore se asocia al bucle en su primer uso, no al crearlo
+        self._semaforo_llm = asyncio.Semaphore(max_llm)
+
+    async def responder(self, pregunta: str) -> dict:
+        tiempos = {}
+        t = time.perf_counter()
+        # Embedding y búsqueda son síncronos (SDK / LanceDB): van al pool de hilos
+        q_vec = await asyncio.to_thread(self.embedder.embed_uno, pregunta)
+        tiempos["embed"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        # Búsqueda híbrida (vector + BM25); el embedding de la pregunta ya está en la caché
+        resultados = await asyncio.to_thread(self.retriever.buscar, pregunta, self.k, True)
+        tiempos["busqueda"] = time.perf_counter() - t
+
+        ids_chunks = ids_contexto(resultados)  # Misma clave que el asistente (comparten la caché)
+        respuesta = None
+        if self.cache_respuestas:  # La caché toma un lock y lee/escribe SQLite: fuera del bucle de eventos
+            respuesta = await asyncio.to_thread(self.cache_respuestas.buscar, q_vec, ids_chunks)
+        if respuesta is None:
+            contexto = construir_contexto(resultados, q_vec).texto
+            t = time.perf_counter()
+            async with self._semaforo_llm:
+                self.en_vuelo_llm += 1
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model="gemini-flash-latest",
+                        contents=asistente.construir_prompt(pregunta, contexto),
+                    )
+                finally:
+                    self.en_vuelo_llm -= 1
+            tiempos["generacion"] = time.perf_counter() - t
+            respuesta = response.text
+            if self.cache_respuestas:
+                await asyncio.to_thread(self.cache_respuestas.guardar, q_vec, ids_chunks, respuesta,
+                                        tiempos["generacion"])
+        else:
+            tiempos["generacion"] = 0.0
+
+        return {"respuesta": respuesta, "tiempos": {k: round(v, 4) for k, v in tiempos.items()}}
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            linea = (await reader.readline()).decode("latin-1").split()
+            cabeceras = {}
+            while (cabecera := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                nombre, _, valor = cabecera.decode("latin-1").partition(":")
+                cabeceras[nombre.strip().lower()] = valor.strip()
+
+            if len(linea) < 2 or linea[0] != "POST" or linea[1] != "/preguntar":
+                codigo, salida = 404, {"error": "Usa POST /preguntar"}
+            else:
+                try:
+                    # Content-Length mal formado, negativo o mayor que el cuerpo: 400, no se corta la conexión
+                    cuerpo = await reader.readexactly(int(cabeceras.get("content-length", 0)))
+                    pregunta = json.loads(cuerpo)["pregunta"]
+                    salida = await asyncio.wait_for(self.responder(pregunta), self.timeout)
+                    codigo = 200
+                except asyncio.TimeoutError:
+                    codigo, salida = 504, {"error": f"Timeout ({self.timeout}s)"}
+                except (KeyError, ValueError, asyncio.IncompleteReadError) as e:
+                    codigo, salida = 400, {"error": f"Petición inválida: {e}"}
+                except Exception as e:
+                    codigo, salida = 500, {"error": str(e)}
+
+            datos = json.dumps(salida, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {codigo} {'OK' if codigo == 200 else 'ERROR'}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(datos)}\r\nConnection: close\r\n\r\n".encode("latin-1") + datos
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def servir(self, host: str = "127.0.0.1", puerto: int = 8780, listo: Optional[asyncio.Event] = None):
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.hilos))
+        servidor = await asyncio.start_server(self._atender, host, puerto, backlog=1024)
+        self.puerto = servidor.sockets[0].getsockname()[1]
+        if listo is not None:
+            listo.set()
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor RAG asíncrono")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8780)
+    parser.add_argument("--max-llm", type=int, default=8, help="Llamadas simultáneas a Gemini")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Segundos máximos por petición")
+    args = parser.parse_args()
+
+    servidor = ServidorRAG(args.db, max_llm=args.max_llm, timeout=args.timeout)
+    print(f"🚀 Servidor RAG en http://{args.host}:{args.puerto}/preguntar (máx {args.max_llm} llamadas LLM)")
+    try:
+        asyncio.run(servidor.servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import sys
+import time
+from typing import AsyncIterable, Iterable, Optional
+
+# Utilidades para respuestas en streaming: imprimir tokens según llegan y medir
+# el tiempo hasta el primer token (TTFT) y el tiempo total de cada turno.
+
+
+class MedidorTurno:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.primer_token: Optional[float] = None
+        self.fin: Optional[float] = None
+
+    def token(self):
+        if self.primer_token is None:
+            self.primer_token = time.perf_counter()
+
+    def terminar(self):
+        self.fin = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return None if self.primer_token is None else self.primer_token - self.inicio
+
+    @property
+    def total(self) -> float:
+        return (self.fin or time.perf_counter()) - self.inicio
+
+    def resumen(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        return f"⏱️ Primer token: {ttft} | Total: {self.total:.2f}s"
+
+
+def imprimir_stream(fragmentos: Iterable[str], medidor: Optional[MedidorTurno] = None) -> str:
+    """Escribe cada fragmento en cuanto llega y devuelve el texto completo."""
+    medidor = medidor or MedidorTurno()
+    partes = []
+    for texto in fragmentos:
+        if not texto:
+            continue
+        medidor.token()
+        sys.stdout.write(texto)
+        sys.stdout.flush()
+        partes.append(texto)
+    medidor.terminar()
+    print()
+    return "".join(partes)
+
+
+async def imprimir_stream_async(fragmentos: AsyncIterable[str], medidor: Optional[MedidorTurno] = None) -> str:
+    """Versión para generadores asíncronos (p.ej. astream_events de LangChain)."""
+    medidor = medidor or MedidorTurno()
+    partes = []
+    async for texto in fragmentos:
+        if not texto:
+            continue
+        medidor.token()
+        sys.stdout.write(texto)
+        sys.stdout.flush()
+        partes.append(texto)
+    medidor.terminar()
+    print()
+    return "".join(partes)
+
+
+def texto_de(contenido) -> str:
+    """El contenido de un mensaje de LangChain puede ser str o lista de partes ({'type': 'text', ...})."""
+    if isinstance(contenido, str):
+        return contenido
+    return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in contenido or [])
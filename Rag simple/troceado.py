@@ -0,0 +1,242 @@
+import os
+import re
+import math
+import statistics
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Estrategias de troceado (chunking) intercambiables. Todas reciben páginas y devuelven Chunk
+# con su página y offsets, que el indexador guarda en la tabla (columnas pagina/inicio/fin):
+#   fijo     -> el corte original cada N caracteres (corta palabras y frases)
+#   frases   -> agrupa frases completas respetando párrafos, hasta N caracteres
+#   tokens   -> ventanas de ~N tokens sobre palabras, con solapamiento entre chunks
+#   titulos  -> secciones delimitadas por títulos (tamaño de fuente del PDF o heurística)
+# Se elige con CHUNKING=<estrategia> o con el parámetro `estrategia` de leer_chunks.
+
+ESTRATEGIA = os.getenv("CHUNKING", "frases")
+
+
+class Pagina(NamedTuple):
+    numero: int  # 1-based
+    texto: str
+    tamanos: Optional[List[float]] = None  # Tamaño de fuente de cada línea de `texto` (solo con_estilo)
+
+
+class Chunk(NamedTuple):
+    text: str
+    pagina: int  # Página donde empieza el chunk
+    inicio: int  # Offsets en el texto del documento (páginas concatenadas sin separador)
+    fin: int
+
+
+def extraer_pagina(page, numero: int, con_estilo: bool = False) -> Pagina:
+    """Con `con_estilo` se reconstruyen las líneas a partir de los fragmentos de texto de pypdf
+    para conocer su tamaño de fuente efectivo (los títulos suelen ir más grandes)."""
+    if not con_estilo:
+        return Pagina(numero, page.extract_text() or "")
+    lineas, tamanos = [""], [0.0]
+
+    def visitor(texto, cm, tm, fuente, tamano):
+        escala = math.hypot(tm[2], tm[3]) * math.hypot(cm[2], cm[3]) or 1.0
+        for k, parte in enumerate(texto.split("\n")):
+            if k:
+                lineas.append("")
+                tamanos.append(0.0)
+            if parte.strip():
+                lineas[-1] += parte
+                tamanos[-1] = max(tamanos[-1], (tamano or 0.0) * escala)
+
+    page.extract_text(visitor_text=visitor)
+    return Pagina(numero, "\n".join(lineas), tamanos)
+
+
+def paginas_pdf(ruta: str, con_estilo: bool = False) -> Iterator[Pagina]:
+    from pypdf import PdfReader
+
+    for i, page in enumerate(PdfReader(ruta).pages):
+        yield extraer_pagina(page, i + 1, con_estilo)
+
+
+# --- Unidades: frases con offsets ---
+# Fin de frase o párrafo; "1. Intro" / "12. Tema" al inicio de línea son numeración, no fin de frase
+_SEPARADOR_FRASE = re.compile(r"(?<=[.!?…:])(?<!^\d\.)(?<!^\d\d\.)\s+|\n\s*\n", re.MULTILINE)
+
+
+def _frases(texto: str, base: int) -> Iterator[Tuple[str, int, int, bool]]:
+    """(frase, inicio, fin, cierra_parrafo). Los saltos de línea dentro de una frase pasan a espacio."""
+    inicio = 0
+    for m in _SEPARADOR_FRASE.finditer(texto):
+        if m.start() > inicio:
+            yield texto[inicio:m.start()].replace("\n", " "), base + inicio, base + m.start(), "\n" in m.group()
+        inicio = m.end()
+    if inicio < len(texto) and texto[inicio:].strip():
+        yield texto[inicio:].replace("\n", " "), base + inicio, base + len(texto), True
+
+
+def _partir_largo(texto: str, inicio: int, max_caracteres: int) -> Iterator[Tuple[str, int, int]]:
+    """Parte una frase más larga que el máximo por límites de palabra."""
+    while len(texto) > max_caracteres:
+        corte = texto.rfind(" ", 0, max_caracteres)
+        corte = corte if corte > 0 else max_caracteres
+        yield texto[:corte], inicio, inicio + corte
+        resto = texto[corte:]
+        texto = resto.lstrip()
+        inicio += corte + len(resto) - len(texto)
+    if texto:
+        yield texto, inicio, inicio + len(texto)
+
+
+def _agrupar(frases: Iterable[Tuple[str, int, int, int, bool]], max_caracteres: int, prefijo: str = "") -> Iterator[Chunk]:
+    """Empaqueta frases (texto, pagina, inicio, fin, cierra_parrafo) en chunks de hasta `max_caracteres`.
+    Un final de párrafo cierra el chunk si ya va por la mitad del máximo."""
+    actual: List[Tuple[str, int, int, int]] = []
+    largo = 0
+
+    def cerrar():
+        nonlocal actual, largo
+        if actual:
+            yield Chunk(prefijo + " ".join(f[0] for f in actual), actual[0][1], actual[0][2], actual[-1][3])
+        actual, largo = [], 0
+
+    for texto, pagina, inicio, fin, cierra_parrafo in frases:
+        for trozo, ini, fi in _partir_largo(texto.strip(), inicio, max_caracteres):
+            if actual and largo + len(trozo) + 1 > max_caracteres:
+                yield from cerrar()
+            actual.append((trozo, pagina, ini, fi))
+            largo += len(trozo) + 1
+        if cierra_parrafo and largo >= max_caracteres // 2:
+            yield from cerrar()
+    yield from cerrar()
+
+
+# --- Estrategias ---
+def trocear_fijo(paginas: Iterable[Pagina], chunk_size: int = 500) -> Iterator[Chunk]:
+    """Mismos chunks que full_text[i:i+chunk_size] (el troceado original), con metadatos."""
+    resto, inicio_resto, pagina_resto = "", 0, 1
+    for pagina in paginas:
+        if not resto:
+            pagina_resto = pagina.numero
+        resto += pagina.texto
+        pos = 0
+        while len(resto) - pos >= chunk_size:
+            yield Chunk(resto[pos:pos + chunk_size], pagina_resto, inicio_resto + pos, inicio_resto + pos + chunk_size)
+            pos += chunk_size
+            pagina_resto = pagina.numero
+        resto, inicio_resto = resto[pos:], inicio_resto + pos
+    if resto:
+        yield Chunk(resto, pagina_resto, inicio_resto, inicio_resto + len(resto))
+
+
+def trocear_frases(paginas: Iterable[Pagina], max_caracteres: int = 800) -> Iterator[Chunk]:
+    def frases():
+        base = 0
+        for pagina in paginas:
+            for texto, inicio, fin, cierra in _frases(pagina.texto, base):
+                yield texto, pagina.numero, inicio, fin, cierra
+            base += len(pagina.texto)
+
+    return _agrupar(frases(), max_caracteres)
+
+
+def _tokens_palabra(palabra: str) -> int:
+    return max(1, (len(palabra) + 3) // 4)  # ~4 caracteres por token, como contar_tokens
+
+
+def trocear_tokens(paginas: Iterable[Pagina], tokens: int = 160, solapamiento: int = 32) -> Iterator[Chunk]:
+    """Ventanas de ~`tokens` tokens; cada chunk repite los últimos ~`solapamiento` tokens del anterior."""
+    ventana: "deque[Tuple[str, int, int, int, int]]" = deque()  # (palabra, pagina, inicio, fin, tokens)
+    total = 0
+    emitido_hasta = -1  # Offset final del último chunk: evita repetir una cola ya cubierta
+    base = 0
+    for pagina in paginas:
+        for m in re.finditer(r"\S+", pagina.texto):
+            t = _tokens_palabra(m.group())
+            ventana.append((m.group(), pagina.numero, base + m.start(), base + m.end(), t))
+            total += t
+            if total >= tokens:
+                yield Chunk(" ".join(p[0] for p in ventana), ventana[0][1], ventana[0][2], ventana[-1][3])
+                emitido_hasta = ventana[-1][3]
+                while ventana and total - ventana[0][4] >= solapamiento:
+                    total -= ventana.popleft()[4]
+        base += len(pagina.texto)
+    if ventana and ventana[-1][3] > emitido_hasta:
+        yield Chunk(" ".join(p[0] for p in ventana), ventana[0][1], ventana[0][2], ventana[-1][3])
+
+
+_NUMERACION = re.compile(r"^(\d+(\.\d+)*\.?|[IVXLC]+\.|Cap[ií]tulo|Tema|M[óo]dulo|Secci[óo]n)\s", re.IGNORECASE)
+
+
+def es_titulo(linea: str, tamano: float = 0.0, tamano_cuerpo: float = 0.0) -> bool:
+    linea = linea.strip()
+    if not linea or len(linea) > 90:
+        return False
+    if tamano and tamano_cuerpo:
+        return tamano >= tamano_cuerpo * 1.15
+    # Sin información de fuente: líneas cortas numeradas o en mayúsculas, sin punto final
+    if linea[-1] in ".,;":
+        return False
+    return bool(_NUMERACION.match(linea)) or (linea.isupper() and len(linea) > 3)
+
+
+def trocear_titulos(paginas: Iterable[Pagina], max_caracteres: int = 1200) -> Iterator[Chunk]:
+    """
+    Una sección (título + cuerpo) por chunk; si no cabe, se parte por frases y cada trozo lleva
+    el título delante para no perder el contexto. El tamaño de cuerpo es la mediana por página.
+    Una sección que pasa de 4 * max_caracteres (o un PDF sin títulos detectados) se va emitiendo
+    por tramos, para que la memoria siga acotada como en el resto de la ingesta en streaming.
+    """
+    titulo = ""
+    seccion: List[Tuple[str, int, int]] = []  # (linea, pagina, inicio)
+    caracteres = 0  # Acumulados en `seccion`
+    limite = 4 * max_caracteres
+    base = 0
+
+    def cerrar():
+        nonlocal caracteres
+        if not seccion:
+            return
+        frases = []
+        for linea, pagina, inicio in seccion:
+            for texto, ini, fin, cierra in _frases(linea, inicio):
+                frases.append((texto, pagina, ini, fin, cierra))
+        yield from _agrupar(frases, max_caracteres, prefijo=f"{titulo}: " if titulo else "")
+        seccion.clear()
+        caracteres = 0
+
+    for pagina in paginas:
+        lineas = pagina.texto.split("\n")
+        tamanos = pagina.tamanos or [0.0] * len(lineas)
+        con_tamano = [t for t in tamanos if t]
+        cuerpo = statistics.median(con_tamano) if con_tamano else 0.0
+        pos = base
+        for linea, tamano in zip(lineas, tamanos):
+            if es_titulo(linea, tamano, cuerpo):
+                yield from cerrar()
+                titulo = linea.strip()
+            elif linea.strip():
+                seccion.append((linea, pagina.numero, pos))
+                caracteres += len(linea)
+                if caracteres > limite:
+                    yield from cerrar()  # Mismo título: el siguiente tramo lo lleva delante también
+            pos += len(linea) + 1
+        base += len(pagina.texto)
+    yield from cerrar()
+
+
+ESTRATEGIAS: Dict[str, Callable[..., Iterator[Chunk]]] = {
+    "fijo": trocear_fijo,
+    "frases": trocear_frases,
+    "tokens": trocear_tokens,
+    "titulos": trocear_titulos,
+}
+
+
+def trocear(paginas: Iterable[Pagina], estrategia: str = ESTRATEGIA, **opciones) -> Iterator[Chunk]:
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia de troceado desconocida: {estrategia} (opciones: {', '.join(ESTRATEGIAS)})")
+    return ESTRATEGIAS[estrategia](paginas, **opciones)
+
+
+def leer_chunks(ruta: str, estrategia: str = ESTRATEGIA, **opciones) -> Iterator[Chunk]:
+    """Streaming: página a página, sin cargar el PDF completo."""
+    return trocear(paginas_pdf(ruta, con_estilo=estrategia == "titulos"), estrategia, **opciones)
@@ -0,0 +1,88 @@
+import os
+import csv
+import time
+import random
+import argparse
+import resource
+import tempfile
+
+import pandas as pd
+
+from clasificador import ClasificadorTexto, predecir_archivo
+
+# Clasificador (HashingVectorizer + MultinomialNB.partial_fit) sobre un CSV sintético de
+# spam/ham de --mensajes filas (1M por defecto):
+#   - entrenamiento en streaming: mensajes/s y pico de memoria
+#   - tamaño del modelo y tiempo de carga (con y sin mmap)
+#   - predicciones/s con 1 proceso y con todos los núcleos, y acierto sobre mensajes no vistos
+#   python bench_clasificador.py --mensajes 1000000
+
+SPAM = ("oferta gratis gana dinero rapido casino bono premio click aqui iphone descuento exclusivo "
+        "ganador sorteo credito urgente pierde peso dieta millones invierte bitcoin").split()
+HAM = ("reunion equipo factura cita medica informe proyecto mañana tarde comer llamada revisar "
+       "documento adjunto agenda semana cliente entrega presupuesto viaje familia").split()
+COMUNES = "hola tu el la de a en para con por que un una hoy ya".split()
+
+
+def generar_csv(ruta: str, n: int, semilla: int = 0):
+    rnd = random.Random(semilla)
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["mensaje", "etiqueta"])
+        for _ in range(n):
+            etiqueta = "spam" if rnd.random() < 0.4 else "ham"
+            propias, otras = (SPAM, HAM) if etiqueta == "spam" else (HAM, SPAM)
+            # Mensajes ruidosos: palabras comunes y alguna de la otra clase
+            palabras = [rnd.choice(propias) for _ in range(rnd.randint(2, 6))]
+            palabras += [rnd.choice(COMUNES) for _ in range(rnd.randint(2, 6))]
+            palabras += [rnd.choice(otras) for _ in range(rnd.randint(0, 3))]
+            rnd.shuffle(palabras)
+            w.writerow([" ".join(palabras), etiqueta])
+
+
+def pico_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KiB
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=1_000_000)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        entrenamiento = os.path.join(tmp, "mensajes.csv")
+        prueba = os.path.join(tmp, "nuevos.csv")
+        t0 = time.perf_counter()
+        generar_csv(entrenamiento, args.mensajes)
+        generar_csv(prueba, args.mensajes, semilla=1)
+        print(f"📄 {args.mensajes} mensajes sintéticos x2 ({os.path.getsize(entrenamiento) / 2**20:.0f} MiB c/u) "
+              f"en {time.perf_counter() - t0:.1f}s")
+
+        rss_antes = pico_rss_mb()
+        clasificador = ClasificadorTexto()
+        resumen = clasificador.entrenar_csv(entrenamiento, clases=["ham", "spam"])
+        print(f"--- ENTRENAMIENTO ---\n{resumen['filas_por_segundo']:,} mensajes/s ({resumen['segundos']}s), "
+              f"pico RSS {pico_rss_mb():.0f} MB (antes {rss_antes:.0f} MB)")
+
+        modelo = os.path.join(tmp, "modelo.joblib")
+        clasificador.guardar(modelo)
+        print(f"--- MODELO ---\n{os.path.getsize(modelo) / 2**20:.1f} MiB en disco")
+        for mmap in (False, True):
+            t0 = time.perf_counter()
+            ClasificadorTexto.cargar(modelo, mmap=mmap)
+            print(f"carga {'con mmap' if mmap else 'sin mmap'}: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        print("--- PREDICCIÓN ---")
+        salida = os.path.join(tmp, "predicciones.csv")
+        for procesos in sorted({1, args.procesos}):
+            r = predecir_archivo(modelo, prueba, salida, procesos=procesos)
+            print(f"{procesos:>3} procesos: {r['predicciones_por_segundo']:,} predicciones/s ({r['segundos']}s)")
+
+        esperado = pd.read_csv(prueba, usecols=["etiqueta"])["etiqueta"]
+        obtenido = pd.read_csv(salida, usecols=["prediccion"])["prediccion"]
+        print(f"acierto sobre mensajes no vistos: {(esperado == obtenido).mean():.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Rag simple"))
+from servidor_fake_gemini import iniciar_servidor
+
+# Generación en lote de CoursePlan (generacion_lotes.py) contra el servidor fake de Gemini:
+#   - planes/s uno a uno (como main.generate_plan en bucle) frente a concurrente con límite de tasa
+#   - JSON inválido (--tasa-invalido) reparado con reintentos dirigidos
+#   - reanudación: una ejecución cortada a la mitad y relanzada no repite ningún tema
+#   python bench_generacion_lotes.py --temas 2000 --concurrencia 32 --rps 100
+
+
+class Cortar(Exception):
+    pass
+
+
+def temas_sinteticos(n: int):
+    areas = ["Python", "LangChain", "RAG", "agentes", "LanceDB", "Gemini", "MLOps", "visión artificial"]
+    return [f"{areas[i % len(areas)]} para perfiles de negocio, edición {i}" for i in range(n)]
+
+
+def cortar_tras(temas, n: int):
+    for i, tema in enumerate(temas):
+        if i == n:
+            raise Cortar()
+        yield tema
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--temas", type=int, default=1000)
+    parser.add_argument("--secuenciales", type=int, default=40, help="Temas para medir el modo uno a uno")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--rps", type=float, default=200.0)
+    parser.add_argument("--latencia", type=float, default=0.2, help="Segundos por llamada del servidor fake")
+    parser.add_argument("--tasa-invalido", type=float, default=0.1)
+    args = parser.parse_args()
+
+    _, url = iniciar_servidor(latencia=args.latencia, retardo_token=0.0, tasa_json_invalido=args.tasa_invalido)
+    os.environ["GEMINI_BASE_URL"] = url
+    from generacion_lotes import GeneradorPlanes, generar_lote, ruta_errores
+
+    temas = temas_sinteticos(args.temas)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"--- UNO A UNO ({args.secuenciales} temas, {args.latencia}s por llamada, "
+              f"{args.tasa_invalido:.0%} JSON inválido) ---")
+        s = generar_lote(temas[:args.secuenciales], os.path.join(tmp, "secuencial.jsonl"),
+                         GeneradorPlanes(peticiones_por_segundo=args.rps), concurrencia=1, progreso_cada=0)
+        print(f"{s['planes_por_segundo']} planes/s | {s['llamadas']} llamadas, {s['reparaciones']} reparaciones, "
+              f"{s['errores']} errores")
+
+        print(f"--- CONCURRENTE ({args.temas} temas, {args.concurrencia} en vuelo, {args.rps} peticiones/s) ---")
+        salida = os.path.join(tmp, "planes.jsonl")
+        generador = GeneradorPlanes(peticiones_por_segundo=args.rps)
+        mitad = args.temas // 2
+        try:
+            generar_lote(cortar_tras(iter(temas), mitad), salida, generador, args.concurrencia, progreso_cada=0)
+        except Cortar:
+            pass
+        with open(salida, encoding="utf-8") as f:
+            tras_corte = sum(1 for _ in f)
+        print(f"corte simulado tras leer {mitad} temas: {tras_corte} planes ya en el checkpoint")
+
+        t0 = time.perf_counter()
+        c = generar_lote(temas, salida, GeneradorPlanes(peticiones_por_segundo=args.rps), args.concurrencia,
+                         progreso_cada=0)
+        print(f"reanudación: {c['saltados']} saltados, {c['planes']} nuevos en {time.perf_counter() - t0:.1f}s "
+              f"({c['planes_por_segundo']} planes/s, p50 {c['p50_s']}s, p99 {c['p99_s']}s)")
+        print(f"reparaciones {c['reparaciones']}, errores {c['errores']}, 429 {c['errores_cuota']}")
+
+        with open(salida, encoding="utf-8") as f:
+            filas = [json.loads(linea) for linea in f]
+        with open(ruta_errores(salida), encoding="utf-8") as f:
+            errores = sum(1 for _ in f)
+        unicos = len({fila["tema"] for fila in filas})
+        print(f"checkpoint: {len(filas)} planes, {unicos} temas distintos, {errores} en errores "
+              f"({'sin duplicados' if unicos == len(filas) else 'DUPLICADOS'})")
+        if s["planes_por_segundo"]:
+            print(f"aceleración concurrente: x{c['planes_por_segundo'] / s['planes_por_segundo']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
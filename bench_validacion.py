@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+
+# Validación de un JSONL de CoursePlan con --registros líneas (1M por defecto, --invalidos malas):
+#   objeto_json      json.loads + CoursePlan(**d) por línea (main1.py)
+#   objeto_pydantic  CoursePlan.model_validate_json por línea (main.py)
+#   bloque           validacion_masiva.validar_lineas: TypeAdapter(list[CoursePlan]) por bloques
+#   bloque_dict      lo mismo con como_dict=True: mismas reglas contra un TypedDict, sin crear instancias
+# Cada modo corre en su propio proceso para medir su pico de memoria (RSS) por separado.
+#   python bench_validacion.py --registros 1000000
+
+MODOS = ["objeto_json", "objeto_pydantic", "bloque", "bloque_dict"]
+
+
+def generar_jsonl(ruta: str, n: int, tasa_invalidos: float, semilla: int = 0):
+    rnd = random.Random(semilla)
+    niveles = ["básico", "intermedio", "avanzado"]
+    with open(ruta, "w", encoding="utf-8") as f:
+        for i in range(n):
+            plan = {"topic": f"Tema {i} de IA aplicada", "weeks": rnd.randint(2, 20),
+                    "difficulty_level": rnd.choice(niveles),
+                    "modules": [f"Módulo {j}: {rnd.choice(['RAG', 'Agentes', 'Python', 'Despliegue'])}"
+                                for j in range(rnd.randint(3, 8))]}
+            if rnd.random() < tasa_invalidos:
+                fallo = rnd.choice(["falta", "tipo", "truncado"])
+                if fallo == "falta":
+                    del plan["modules"]
+                elif fallo == "tipo":
+                    plan["weeks"] = "doce"
+                else:
+                    f.write(json.dumps(plan, ensure_ascii=False)[:30] + "\n")
+                    continue
+            f.write(json.dumps(plan, ensure_ascii=False) + "\n")
+
+
+def ejecutar_modo(modo: str, ruta: str) -> dict:
+    import validacion_masiva
+    from main import CoursePlan
+
+    validos = rechazados = 0
+    t0 = time.perf_counter()
+    if modo.startswith("objeto"):
+        with open(ruta, "rb") as f:
+            for linea in f:
+                try:
+                    if modo == "objeto_json":
+                        CoursePlan(**json.loads(linea))
+                    else:
+                        CoursePlan.model_validate_json(linea)
+                    validos += 1
+                except (ValueError, TypeError):  # ValidationError es ValueError; TypeError si no es un objeto
+                    rechazados += 1
+    else:
+        def contar(_):
+            nonlocal rechazados
+            rechazados += 1
+
+        with open(ruta, "rb") as f:
+            for _ in validacion_masiva.validar_lineas(f, cuarentena=contar,
+                                                        como_dict=modo == "bloque_dict"):
+                validos += 1
+    segundos = time.perf_counter() - t0
+    return {"modo": modo, "validos": validos, "rechazados": rechazados, "segundos": segundos,
+            "pico_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registros", type=int, default=1_000_000)
+    parser.add_argument("--invalidos", type=float, default=0.01)
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--archivo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:  # Proceso hijo: un solo modo
+        print(json.dumps(ejecutar_modo(args.modo, args.archivo)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "planes.jsonl")
+        t0 = time.perf_counter()
+        generar_jsonl(ruta, args.registros, args.invalidos)
+        print(f"📄 {args.registros} registros ({args.invalidos:.0%} inválidos, "
+              f"{os.path.getsize(ruta) / 2**20:.0f} MiB) en {time.perf_counter() - t0:.1f}s")
+
+        print(f"{'modo':<18} {'registros/s':>12} {'segundos':>9} {'válidos':>9} {'cuarentena':>10} {'pico RSS':>9}")
+        base = None
+        for modo in MODOS:
+            salida = subprocess.run([sys.executable, os.path.abspath(__file__), "--modo", modo, "--archivo", ruta],
+                                    capture_output=True, text=True, check=True).stdout
+            r = json.loads(salida.strip().splitlines()[-1])
+            por_segundo = args.registros / r["segundos"]
+            base = base or por_segundo
+            print(f"{modo:<18} {por_segundo:>12,.0f} {r['segundos']:>9.2f} {r['validos']:>9} {r['rechazados']:>10} "
+                  f"{r['pico_rss_mb']:>7.0f}MB  x{por_segundo / base:.1f}")
+
+
+if __name__ == "__main__":
+    main()
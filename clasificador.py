@@ -0,0 +1,168 @@
+import os
+import time
+import argparse
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+# Clasificador de textos reutilizable (la versión "de producción" de ml_clasico.py):
+#   - HashingVectorizer: sin vocabulario que crezca con los datos, la memoria no depende del corpus.
+#   - MultinomialNB.partial_fit: se entrena por bloques leyendo el CSV en streaming.
+#   - guardar()/cargar() con joblib; cargar(mmap=True) mapea los arrays del modelo desde disco
+#     (de solo lectura: ese modelo solo sirve para predecir, no para seguir entrenando).
+#   - predecir_archivo(): predicción por lotes en varios procesos sobre ficheros grandes.
+# Uso:
+#   python clasificador.py entrenar mensajes.csv --modelo modelo.joblib
+#   python clasificador.py predecir entrada.csv salida.csv --modelo modelo.joblib --procesos 8
+
+N_FEATURES = 2 ** 20
+TAM_BLOQUE = 50_000  # Filas del CSV por bloque (entrenamiento y predicción)
+
+
+class ClasificadorTexto:
+    def __init__(self, n_features: int = N_FEATURES, ngramas: Tuple[int, int] = (1, 2), alpha: float = 0.1):
+        # alternate_sign=False: MultinomialNB necesita frecuencias no negativas
+        self.vectorizador = HashingVectorizer(
+            n_features=n_features, ngram_range=ngramas, alternate_sign=False, norm=None, strip_accents="unicode"
+        )
+        self.modelo = MultinomialNB(alpha=alpha)
+        self.vistos = 0
+
+    @property
+    def clases(self) -> Optional[np.ndarray]:
+        return getattr(self.modelo, "classes_", None)
+
+    def entrenar_lote(self, textos: Sequence[str], etiquetas: Sequence[str], clases: Optional[Sequence[str]] = None):
+        """Un paso de partial_fit. La primera vez hay que pasar todas las `clases` posibles."""
+        if self.clases is None and clases is None:
+            raise ValueError("El primer lote necesita la lista completa de clases")
+        if self.clases is not None and not self.modelo.feature_count_.flags.writeable:
+            raise ValueError("Modelo cargado con mmap=True (solo lectura): cárgalo con mmap=False para entrenarlo")
+        X = self.vectorizador.transform(textos)
+        self.modelo.partial_fit(X, etiquetas, classes=None if self.clases is not None else list(clases))
+        self.vistos += len(textos)
+
+    def entrenar_lotes(self, lotes: Iterable[Tuple[Sequence[str], Sequence[str]]], clases: Sequence[str]):
+        for textos, etiquetas in lotes:
+            self.entrenar_lote(textos, etiquetas, clases)
+        return self
+
+    def entrenar_csv(self, ruta, columna_texto: str = "mensaje", columna_etiqueta: str = "etiqueta",
+                     clases: Optional[Sequence[str]] = None, tam_bloque: int = TAM_BLOQUE) -> dict:
+        """
+        Entrena leyendo el CSV por bloques (memoria acotada). Sin `clases`, una primera pasada
+        lee solo la columna de etiquetas para descubrirlas.
+        """
+        t0 = time.perf_counter()
+        if clases is None:
+            clases = set()
+            for bloque in pd.read_csv(ruta, usecols=[columna_etiqueta], chunksize=tam_bloque, dtype=str):
+                clases.update(bloque[columna_etiqueta].dropna().unique())
+            clases = sorted(clases)
+            if hasattr(ruta, "seek"):
+                ruta.seek(0)
+        filas = 0
+        for bloque in pd.read_csv(ruta, usecols=[columna_texto, columna_etiqueta], chunksize=tam_bloque, dtype=str):
+            bloque = bloque.dropna()
+            self.entrenar_lote(bloque[columna_texto].tolist(), bloque[columna_etiqueta].tolist(), clases)
+            filas += len(bloque)
+        segundos = time.perf_counter() - t0
+        return {"filas": filas, "clases": list(clases), "segundos": round(segundos, 2),
+                "filas_por_segundo": round(filas / segundos) if segundos else None}
+
+    def predecir(self, textos: Sequence[str]) -> np.ndarray:
+        return self.modelo.predict(self.vectorizador.transform(textos))
+
+    def probabilidades(self, textos: Sequence[str]) -> np.ndarray:
+        return self.modelo.predict_proba(self.vectorizador.transform(textos))
+
+    def guardar(self, ruta: str):
+        """Sin compresión: así cargar(mmap=True) puede mapear los arrays en vez de leerlos."""
+        tmp = ruta + ".tmp"
+        joblib.dump(self, tmp, compress=0)
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str, mmap: bool = False) -> "ClasificadorTexto":
+        """
+        Con mmap=True los arrays se mapean de solo lectura desde disco (varios procesos comparten
+        la memoria): sirve para predecir, pero no para seguir entrenando con entrenar_lote().
+        """
+        return joblib.load(ruta, mmap_mode="r" if mmap else None)
+
+
+# --- Predicción en varios procesos ---
+_modelos_proceso = {}
+
+
+def _predecir_bloque(ruta_modelo: str, textos: List[str]) -> np.ndarray:
+    """Cada proceso carga el modelo una sola vez (mmap) y lo reutiliza para todos sus bloques."""
+    if ruta_modelo not in _modelos_proceso:
+        _modelos_proceso[ruta_modelo] = ClasificadorTexto.cargar(ruta_modelo, mmap=True)
+    return _modelos_proceso[ruta_modelo].predecir(textos)
+
+
+def predecir_archivo(ruta_modelo: str, entrada: str, salida: str, columna_texto: str = "mensaje",
+                     procesos: int = -1, tam_bloque: int = TAM_BLOQUE) -> dict:
+    """
+    Lee `entrada` por bloques, reparte la predicción entre `procesos` (-1: todos los núcleos)
+    y escribe `salida` (CSV con columna_texto + prediccion) en el mismo orden.
+    Los bloques se envían a medida que se leen: en memoria hay como mucho unos pocos por proceso.
+    """
+    t0 = time.perf_counter()
+    n_procesos = os.cpu_count() if procesos == -1 else procesos
+    bloques = (b[columna_texto].fillna("") for b in
+               pd.read_csv(entrada, usecols=[columna_texto], chunksize=tam_bloque, dtype=str))
+    filas = 0
+    with open(salida, "w", encoding="utf-8", newline="") as f:
+        paralelo = Parallel(n_jobs=n_procesos, return_as="generator", pre_dispatch="2*n_jobs")
+        pendientes = []
+
+        def tareas():
+            for textos in bloques:
+                pendientes.append(textos)
+                yield delayed(_predecir_bloque)(ruta_modelo, textos.tolist())
+
+        for i, predicciones in enumerate(paralelo(tareas())):
+            textos = pendientes[i]
+            pendientes[i] = None  # Ya escrito: se libera
+            pd.DataFrame({columna_texto: textos.values, "prediccion": predicciones}).to_csv(
+                f, header=i == 0, index=False)
+            filas += len(predicciones)
+    segundos = time.perf_counter() - t0
+    return {"filas": filas, "procesos": n_procesos, "segundos": round(segundos, 2),
+            "predicciones_por_segundo": round(filas / segundos) if segundos else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasificador de textos (HashingVectorizer + Naive Bayes)")
+    sub = parser.add_subparsers(dest="orden", required=True)
+    p_entrenar = sub.add_parser("entrenar")
+    p_entrenar.add_argument("csv")
+    p_predecir = sub.add_parser("predecir")
+    p_predecir.add_argument("entrada")
+    p_predecir.add_argument("salida")
+    p_predecir.add_argument("--procesos", type=int, default=-1)
+    for p in (p_entrenar, p_predecir):
+        p.add_argument("--modelo", default="modelo_clasificador.joblib")
+        p.add_argument("--columna-texto", default="mensaje")
+    p_entrenar.add_argument("--columna-etiqueta", default="etiqueta")
+    args = parser.parse_args()
+
+    if args.orden == "entrenar":
+        clasificador = ClasificadorTexto()
+        resumen = clasificador.entrenar_csv(args.csv, args.columna_texto, args.columna_etiqueta)
+        clasificador.guardar(args.modelo)
+        print(f"✅ Modelo entrenado y guardado en {args.modelo}: {resumen}")
+    else:
+        resumen = predecir_archivo(args.modelo, args.entrada, args.salida, args.columna_texto, args.procesos)
+        print(f"✅ Predicciones en {args.salida}: {resumen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,14 @@
 import os
-import numpy as np
+import sys
 from dotenv import load_dotenv
-from google import genai
-from sklearn.metrics.pairwise import cosine_similarity
 
 # 1. Configuración
 load_dotenv()
-client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
 
-def get_embedding(text: str):
-    """Convierte texto en un vector de 768 dimensiones."""
-    result = client.models.embed_content(
-        model="text-embedding-004",
-        contents=text
-    )
-    # Dependiendo de la versión de la API, el embedding puede venir en diferentes atributos.
-    # En el nuevo SDK suele ser .embeddings[0].values
-    return result.embeddings[0].values
+# Reutilizamos la capa de embeddings con caché del proyecto RAG
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Rag simple"))
+from cache_embeddings import obtener_cache
+from indice_vectorial import IndiceVectorial
 
 def main():
     print("--- INICIANDO MOTOR DE EMBEDDINGS ---")
@@ -32,31 +24,30 @@ def main():
     ]
     
     # 3. Vectorización (Aquí ocurre la magia)
+    # Todas las frases en una sola llamada por lotes (y cacheadas para la próxima vez)
     print("Calculando vectores matemáticos...")
-    embeddings = []
-    for text in phrases:
-        vector = get_embedding(text)
-        embeddings.append(vector)
+    embeddings = obtener_cache().embed(phrases)
+    for text, vector in zip(phrases, embeddings):
         # Un vector es solo una lista de números float, ej: [0.012, -0.931, ...]
         print(f"✅ '{text[:20]}...' -> Vector de {len(vector)} dimensiones")
 
     # 4. Cálculo de Similitud (Álgebra)
-    # Convertimos a matriz numpy para cálculo rápido
-    matrix = np.array(embeddings)
-    
-    # Similitud del Coseno: 1.0 es idéntico, 0.0 es nada que ver
-    similarity_matrix = cosine_similarity(matrix)
+    # Índice en memoria: vectores normalizados en una matriz numpy float32,
+    # así la similitud del coseno es un producto escalar (1.0 es idéntico, 0.0 es nada que ver)
+    indice = IndiceVectorial(dim=len(embeddings[0]))
+    indice.agregar(embeddings)
 
-    print("\n--- MATRIZ DE SIMILITUD (¿Qué tanto se parecen?) ---")
+    print("\n--- SIMILITUD (¿Qué tanto se parecen?) ---")
     
     # Comparamos la primera frase ("El perro...") contra todas las demás
+    # (solo una fila de similitudes, no la matriz N×N completa)
     base_phrase_idx = 0 
     base_phrase = phrases[base_phrase_idx]
     
     print(f"\nComparando todo contra: '{base_phrase}'\n")
     
-    for i in range(len(phrases)):
-        score = similarity_matrix[base_phrase_idx][i]
+    scores, ids = indice.buscar(embeddings[base_phrase_idx], k=len(phrases))
+    for score, i in zip(scores[0], ids[0]):
         text = phrases[i]
         
         # Formato visual
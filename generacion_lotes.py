@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Set
+
+import numpy as np
+from pydantic import ValidationError
+
+from main import CONFIG_PLAN, MODELO, CoursePlan, construir_prompt, obtener_cliente
+
+# Token bucket adaptativo y detección de 429 compartidos con el motor de embeddings
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Rag simple"))
+from motor_embeddings import TokenBucket, es_error_cuota
+
+# Modo lote de main.generate_plan: miles de planes de estudio desde un fichero de temas.
+#   - Los temas se leen en streaming (uno por línea) y se generan con `concurrencia` peticiones
+#     en vuelo como mucho, limitadas a `rps` por segundo (token bucket que se frena con los 429).
+#   - Cada plan validado se añade al JSONL de salida en cuanto termina: es el checkpoint.
+#     Al relanzar, los temas que ya están en la salida se saltan.
+#   - Si el JSON no pasa la validación de CoursePlan se reintenta solo ese tema, con un prompt
+#     que incluye la respuesta anterior y los campos concretos que fallaron.
+#   - Lo que sigue fallando va a <salida>.errores.jsonl y se vuelve a intentar en la próxima ejecución.
+# Uso:
+#   python generacion_lotes.py temas.txt planes.jsonl --concurrencia 16 --rps 10
+#   GEMINI_BASE_URL=http://127.0.0.1:8765 python generacion_lotes.py ...   (contra el servidor fake)
+
+CONCURRENCIA = 8
+PETICIONES_POR_SEGUNDO = 5.0
+MAX_REPARACIONES = 2  # Reintentos por JSON inválido (aparte de los reintentos por errores de la API)
+
+
+class ResultadoPlan(NamedTuple):
+    tema: str
+    plan: Optional[CoursePlan]
+    llamadas: int
+    reparaciones: int
+    segundos: float
+    error: Optional[str] = None
+    salida: Optional[str] = None  # Última respuesta del modelo si no se pudo validar
+
+
+def leer_temas(ruta: str) -> Iterator[str]:
+    """Un tema por línea; ignora líneas vacías y comentarios (#). No carga el fichero entero."""
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            tema = linea.strip()
+            if tema and not tema.startswith("#"):
+                yield tema
+
+
+def ruta_errores(salida: str) -> str:
+    base, _ = os.path.splitext(salida)
+    return base + ".errores.jsonl"
+
+
+def temas_hechos(salida: str) -> Set[str]:
+    """
+    Temas ya presentes en el checkpoint. Una última línea a medias (corte brusco) se descarta:
+    el fichero se trunca tras la última línea completa y ese tema se vuelve a generar.
+    """
+    hechos: Set[str] = set()
+    if not os.path.exists(salida):
+        return hechos
+    with open(salida, "rb+") as f:
+        completo = 0  # Offset tras la última línea terminada en "\n"
+        for linea in f:
+            if not linea.endswith(b"\n"):
+                break
+            completo += len(linea)
+            try:
+                hechos.add(json.loads(linea)["tema"])
+            except (ValueError, KeyError):
+                continue
+        f.truncate(completo)
+    return hechos
+
+
+def errores_pendientes(salida: str, hechos: Set[str]) -> Dict[str, dict]:
+    """Último error de cada tema que sigue sin plan (los que ya tienen plan se descartan)."""
+    pendientes: Dict[str, dict] = {}
+    if os.path.exists(ruta_errores(salida)):
+        with open(ruta_errores(salida), encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    continue
+                if fila.get("tema") not in hechos:
+                    pendientes[fila.get("tema")] = fila
+    return pendientes
+
+
+def prompt_reparacion(tema: str, salida: str, error: ValidationError) -> str:
+    """Reintento dirigido: la respuesta anterior y los errores de validación campo a campo."""
+    problemas = "\n".join(
+        f"- {'.'.join(map(str, e['loc'])) or '(respuesta completa)'}: {e['msg']}" for e in error.errors()
+    )
+    return (
+        f"{construir_prompt(tema)}\n\n"
+        f"Tu respuesta anterior no cumple el esquema:\n{salida[:2000]}\n\n"
+        f"Errores de validación:\n{problemas}\n"
+        "Devuelve el JSON completo, corrigiendo solo esos campos."
+    )
+
+
+class GeneradorPlanes:
+    """generate_plan con límite de tasa, reintentos con backoff y reparación de JSON inválido."""
+
+    def __init__(
+        self,
+        client=None,
+        peticiones_por_segundo: float = PETICIONES_POR_SEGUNDO,
+        max_reintentos: int = 5,
+        max_reparaciones: int = MAX_REPARACIONES,
+        espera_base: float = 1.0,
+        generar: Optional[Callable[[str], str]] = None,
+    ):
+        """`generar(prompt) -> texto JSON` permite sustituir la llamada a Gemini (pruebas)."""
+        self.client = client
+        self.bucket = TokenBucket(peticiones_por_segundo)
+        self.max_reintentos = max_reintentos
+        self.max_reparaciones = max_reparaciones
+        self.espera_base = espera_base
+        self._generar = generar or self._generar_genai
+        self._lock = threading.Lock()
+        self.llamadas = 0
+        self.errores_cuota = 0
+
+    def _generar_genai(self, prompt: str) -> str:
+        client = self.client or obtener_cliente()
+        return client.models.generate_content(model=MODELO, contents=prompt, config=CONFIG_PLAN).text or ""
+
+    def _llamar(self, prompt: str) -> str:
+        intento = 0
+        while True:
+            self.bucket.adquirir()
+            try:
+                texto = self._generar(prompt)
+                with self._lock:
+                    self.llamadas += 1
+                self.bucket.recuperar()
+                return texto
+            except Exception as e:
+                intento += 1
+                if intento > self.max_reintentos:
+                    raise
+                if es_error_cuota(e):
+                    with self._lock:
+                        self.errores_cuota += 1
+                    self.bucket.penalizar()
+                time.sleep(self.espera_base * (2 ** (intento - 1)) * (0.5 + random.random()))
+
+    def generar(self, tema: str) -> ResultadoPlan:
+        t0 = time.perf_counter()
+        prompt = construir_prompt(tema)
+        llamadas = 0
+        for reparacion in range(self.max_reparaciones + 1):
+            try:
+                salida = self._llamar(prompt)
+            except Exception as e:
+                return ResultadoPlan(tema, None, llamadas, reparacion, time.perf_counter() - t0, f"API: {e}")
+            llamadas += 1
+            try:
+                plan = CoursePlan.model_validate_json(salida)
+                return ResultadoPlan(tema, plan, llamadas, reparacion, time.perf_counter() - t0)
+            except ValidationError as e:
+                error = e
+                prompt = prompt_reparacion(tema, salida, e)
+        return ResultadoPlan(tema, None, llamadas, self.max_reparaciones, time.perf_counter() - t0,
+                             f"Validación: {error.error_count()} errores tras {self.max_reparaciones} reparaciones",
+                             salida)
+
+
+def generar_lote(
+    temas: Iterable[str],
+    salida: str,
+    generador: Optional[GeneradorPlanes] = None,
+    concurrencia: int = CONCURRENCIA,
+    progreso_cada: int = 100,
+) -> dict:
+    """
+    Genera un plan por tema y los va añadiendo a `salida` (JSONL) según terminan.
+    Solo hay `2 * concurrencia` temas leídos por delante: la memoria no depende del tamaño del fichero.
+    Un Ctrl+C espera a las llamadas en vuelo y las guarda; lo no empezado se hace al relanzar.
+    El fichero de errores se reescribe en cada ejecución: los errores de esta y, de las anteriores,
+    solo los de temas que no se han vuelto a intentar (uno por tema).
+    """
+    generador = generador or GeneradorPlanes()
+    hechos = temas_hechos(salida)
+    errores_previos = errores_pendientes(salida, hechos)
+    t0 = time.perf_counter()
+    stats = {"planes": 0, "errores": 0, "saltados": 0, "reparaciones": 0}
+    latencias = []
+
+    with open(salida, "a", encoding="utf-8") as f_ok, open(ruta_errores(salida), "w", encoding="utf-8") as f_err:
+        def escribir(r: ResultadoPlan):
+            errores_previos.pop(r.tema, None)
+            latencias.append(r.segundos)
+            stats["reparaciones"] += r.reparaciones
+            if r.plan is not None:
+                fila = {"tema": r.tema, "plan": r.plan.model_dump(), "llamadas": r.llamadas,
+                        "reparaciones": r.reparaciones, "segundos": round(r.segundos, 3)}
+                f_ok.write(json.dumps(fila, ensure_ascii=False) + "\n")
+                f_ok.flush()
+                stats["planes"] += 1
+            else:
+                fila = {"tema": r.tema, "error": r.error, "salida": r.salida, "llamadas": r.llamadas}
+                f_err.write(json.dumps(fila, ensure_ascii=False) + "\n")
+                f_err.flush()
+                stats["errores"] += 1
+            hechos_ahora = stats["planes"] + stats["errores"]
+            if progreso_cada and hechos_ahora % progreso_cada == 0:
+                print(f"   ✓ {hechos_ahora} temas ({hechos_ahora / (time.perf_counter() - t0):.1f}/s)...")
+
+        pool = ThreadPoolExecutor(max_workers=concurrencia)
+        pendientes = set()
+        try:
+            for tema in temas:
+                if tema in hechos:
+                    stats["saltados"] += 1
+                    continue
+                hechos.add(tema)  # Temas repetidos en la entrada: una sola vez
+                if len(pendientes) >= 2 * concurrencia:
+                    listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        escribir(futuro.result())
+                pendientes.add(pool.submit(generador.generar, tema))
+            wait(pendientes)
+            for futuro in list(pendientes):
+                pendientes.discard(futuro)  # Fuera antes de escribirlo: el finally no lo repite
+                escribir(futuro.result())
+        finally:
+            # Interrumpido: se esperan las llamadas en vuelo y también se guardan (no se pierde lo pagado)
+            pool.shutdown(wait=True, cancel_futures=True)
+            for futuro in pendientes:
+                if not futuro.cancelled() and futuro.exception() is None:
+                    escribir(futuro.result())
+            # Errores anteriores de temas que esta ejecución no ha llegado a intentar
+            for fila in errores_previos.values():
+                f_err.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+    segundos = time.perf_counter() - t0
+    stats.update({
+        "llamadas": generador.llamadas,
+        "errores_cuota": generador.errores_cuota,
+        "segundos": round(segundos, 2),
+        "planes_por_segundo": round(stats["planes"] / segundos, 2) if segundos else None,
+        "p50_s": round(float(np.percentile(latencias, 50)), 3) if latencias else None,
+        "p99_s": round(float(np.percentile(latencias, 99)), 3) if latencias else None,
+    })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera planes de estudio (CoursePlan) en lote")
+    parser.add_argument("temas", help="Fichero de texto con un tema por línea")
+    parser.add_argument("salida", help="JSONL de salida (también es el checkpoint para reanudar)")
+    parser.add_argument("--concurrencia", type=int, default=CONCURRENCIA)
+    parser.add_argument("--rps", type=float, default=PETICIONES_POR_SEGUNDO, help="Peticiones por segundo")
+    parser.add_argument("--reparaciones", type=int, default=MAX_REPARACIONES)
+    args = parser.parse_args()
+
+    generador = GeneradorPlanes(peticiones_por_segundo=args.rps, max_reparaciones=args.reparaciones)
+    print(f"--- GENERACIÓN EN LOTE: {args.temas} -> {args.salida} "
+          f"({args.concurrencia} en paralelo, {args.rps} peticiones/s) ---")
+    try:
+        stats = generar_lote(leer_temas(args.temas), args.salida, generador, args.concurrencia)
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrumpido: lo generado está en {args.salida}; relanza el mismo comando para continuar")
+        return
+    print(f"✅ {stats}")
+    if stats["errores"]:
+        print(f"⚠️ {stats['errores']} temas sin plan válido en {ruta_errores(args.salida)} (se reintentan al relanzar)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,32 @@
 import os
+import sys
+import threading
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from typing import List
-from google import genai # <--- OJO: El import cambia. Ahora es "from google import genai"
+
+# El cliente de Gemini (y GEMINI_BASE_URL) se crea igual que en el motor de embeddings
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Rag simple"))
+from motor_embeddings import crear_cliente_genai
 
 # 1. Configuración del entorno
 load_dotenv()
 
 # 2. Inicializar Cliente (Nueva sintaxis)
 # El nuevo SDK usa un cliente instanciado, no métodos estáticos globales.
-client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+# Se crea en el primer uso: así generacion_lotes.py puede importar este módulo sin API key,
+# y GEMINI_BASE_URL lo apunta al servidor fake local ("Rag simple/servidor_fake_gemini.py").
+# Con lock: los hilos de generacion_lotes.py lo piden a la vez y deben compartir un único cliente.
+_client = None
+_lock_cliente = threading.Lock()
+
+def obtener_cliente():
+    global _client
+    if _client is None:
+        with _lock_cliente:
+            if _client is None:
+                _client = crear_cliente_genai()
+    return _client
 
 # 3. Definir Estructura (Tu DTO - Esto no cambia)
 class CoursePlan(BaseModel):
@@ -18,19 +35,24 @@ class CoursePlan(BaseModel):
     difficulty_level: str
     modules: List[str]
 
+MODELO = "gemini-flash-latest" # Usamos el modelo más nuevo y rápido
+CONFIG_PLAN = {
+    "response_mime_type": "application/json",
+    "response_schema": CoursePlan, # Inyección directa del modelo Pydantic
+}
+
+def construir_prompt(topic_request: str) -> str:
+    return f"Actúa como un arquitecto de soluciones senior. Diseña un plan de estudio para: {topic_request}"
+
 def generate_plan(topic_request: str) -> CoursePlan:
+    # Para miles de temas: python generacion_lotes.py temas.txt planes.jsonl (concurrente, reanudable)
     print(f"--- CONSULTANDO A GEMINI 2.0 SOBRE: {topic_request} ---")
     
-    prompt = f"Actúa como un arquitecto de soluciones senior. Diseña un plan de estudio para: {topic_request}"
-    
     # 4. Generación (Sintaxis v1 del nuevo SDK)
-    response = client.models.generate_content(
-        model="gemini-flash-latest", # Usamos el modelo más nuevo y rápido
-        contents=prompt,
-        config={
-            "response_mime_type": "application/json",
-            "response_schema": CoursePlan, # Inyección directa del modelo Pydantic
-        }
+    response = obtener_cliente().models.generate_content(
+        model=MODELO,
+        contents=construir_prompt(topic_request),
+        config=CONFIG_PLAN
     )
     
     # 5. Deserialización
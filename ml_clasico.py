@@ -1,10 +1,10 @@
 import pandas as pd
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import make_pipeline
+
+from clasificador import ClasificadorTexto
 
 # 1. EL DATASET (Los datos de entrenamiento)
-# En la vida real, cargarías esto de un CSV con pd.read_csv()
+# En la vida real, cargarías esto de un CSV: ClasificadorTexto.entrenar_csv() lo lee por bloques
+# (python clasificador.py entrenar mensajes.csv)
 data = {
     'mensaje': [
         "Oferta increible gana dinero rapido", # Spam
@@ -21,13 +21,14 @@ df = pd.DataFrame(data)
 print("--- DATOS DE ENTRENAMIENTO ---")
 print(df)
 
-# 2. EL MODELO (Pipeline)
-# Paso A: CountVectorizer convierte texto en números (Matriz de frecuencias)
+# 2. EL MODELO
+# Paso A: HashingVectorizer convierte texto en números (frecuencias en 2^20 columnas, sin vocabulario)
 # Paso B: MultinomialNB es un algoritmo clásico de probabilidad (Bayes)
-model = make_pipeline(CountVectorizer(), MultinomialNB())
+model = ClasificadorTexto()
 
 # 3. ENTRENAMIENTO (Aquí ocurre el aprendizaje)
-model.fit(df['mensaje'], df['etiqueta'])
+# Un solo paso de partial_fit; con un CSV de millones de filas, entrenar_csv() repite esto por bloques
+model.entrenar_lote(df.mensaje, df.etiqueta, clases=sorted(df.etiqueta.unique()))
 print("\n✅ Modelo entrenado con éxito.")
 
 # 4. PREDICCIÓN (Inferencia)
@@ -39,7 +40,7 @@ nuevos_mensajes = [
 ]
 
 print("\n--- RESULTADOS DE LA PREDICCIÓN ---")
-predicciones = model.predict(nuevos_mensajes)
+predicciones = model.predecir(nuevos_mensajes)
 
 for msg, pred in zip(nuevos_mensajes, predicciones):
     print(f"📝 '{msg}' \n   -> Clasificado como: {pred.upper()}")
\ No newline at end of file
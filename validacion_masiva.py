@@ -0,0 +1,267 @@
+import json
+import time
+import argparse
+from functools import lru_cache
+from itertools import islice
+from typing import Annotated, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+from typing_extensions import TypedDict  # typing.TypedDict no lo acepta pydantic en Python < 3.12
+
+from main import CoursePlan
+
+# orjson es opcional (está en requirements.txt): comprobación de sintaxis línea a línea y escritura de la cuarentena
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Validación masiva de JSONL con registros CoursePlan (la salida del LLM de main.py / main1.py).
+# En vez de un json.loads + CoursePlan(**d) o un model_validate_json por objeto:
+#   - las líneas se agrupan en bloques de TAM_BLOQUE y cada bloque se valida de una vez como
+#     lista JSON con un TypeAdapter(list[CoursePlan]) cacheado (parseo y validación en pydantic-core)
+#   - si el bloque falla, el propio ValidationError dice qué posiciones fallan y por qué: esas van a la
+#     cuarentena y el resto del bloque se valida otra vez en una sola llamada. Solo con JSON roto
+#     se mira línea a línea (orjson si está)
+#   - como_dict=True valida contra un TypedDict con los mismos campos que el modelo y entrega dicts:
+#     crear las instancias es lo que más cuesta, y para filtrar/reescribir un JSONL no hacen falta
+# Uso:
+#   python validacion_masiva.py planes.jsonl --cuarentena malos.jsonl
+#   python validacion_masiva.py planes.jsonl --campo plan      # salida de generacion_lotes.py
+
+TAM_BLOQUE = 32  # Bloques grandes validan más lento y, con algún registro malo, se validan otra vez enteros
+
+Registro = Union[BaseModel, dict]
+
+
+def _loads(texto: bytes):
+    return orjson.loads(texto) if orjson is not None else json.loads(texto)
+
+
+def _dumps(valor) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(valor, default=str)
+    return json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class Rechazado(NamedTuple):
+    linea: int  # 1-based en el fichero de entrada
+    texto: str
+    errores: List[dict]
+
+
+@lru_cache(maxsize=None)
+def esquema_dict(modelo: Type[BaseModel]) -> Optional[type]:
+    """
+    TypedDict con los mismos campos, tipos y restricciones (Field(gt=...), etc.) que `modelo`.
+    None si el modelo usa algo que un TypedDict no reproduce igual: validadores propios,
+    alias, campos opcionales con valor por defecto o configuración (extra, strict...).
+    """
+    decoradores = modelo.__pydantic_decorators__
+    if (decoradores.validators or decoradores.field_validators or decoradores.root_validators
+            or decoradores.model_validators or modelo.model_config):
+        return None
+    campos = {}
+    for nombre, info in modelo.model_fields.items():
+        if not info.is_required() or info.alias or info.validation_alias:
+            return None
+        campos[nombre] = Annotated[(info.annotation, *info.metadata)] if info.metadata else info.annotation
+    return TypedDict(f"{modelo.__name__}Dict", campos)
+
+
+@lru_cache(maxsize=None)
+def adaptador_lista(modelo: Type[BaseModel] = CoursePlan, campo: Optional[str] = None,
+                    como_dict: bool = False) -> TypeAdapter:
+    """
+    TypeAdapter(list[modelo]) construido una sola vez por combinación: crear el validador es caro,
+    usarlo no. Con `campo`, cada registro es un objeto que lleva el modelo en esa clave.
+    `como_dict`: valida contra esquema_dict(modelo) si se puede (mismas reglas, sin crear instancias).
+    """
+    elemento = (esquema_dict(modelo) if como_dict else None) or modelo
+    if campo:
+        if elemento is modelo:
+            elemento = create_model(f"Registro{modelo.__name__}", **{campo: (modelo, ...)})
+        else:
+            elemento = TypedDict(f"Registro{elemento.__name__}", {campo: elemento})
+    return TypeAdapter(List[elemento])
+
+
+def _como_lista(lineas: List[bytes]) -> bytes:
+    # El salto de línea final de cada una es espacio en blanco válido dentro del array
+    return b"[" + b",".join(lineas) + b"]"
+
+
+def _error(err: dict, desde: int) -> dict:
+    return {"campo": ".".join(map(str, err["loc"][desde:])), "tipo": err["type"], "mensaje": err["msg"]}
+
+
+def _rechazo(n: int, texto: bytes, errores: List[dict]) -> Rechazado:
+    return Rechazado(n, texto.decode("utf-8", "replace").strip(), errores)
+
+
+def _uno_a_uno(adaptador: TypeAdapter, lineas: List[bytes], numeros: Iterable[int]) -> Tuple[list, List[Rechazado]]:
+    """Camino de emergencia: cada línea como lista de un elemento (líneas con varios valores JSON, etc.)."""
+    validos, rechazados = [], []
+    for n, texto in zip(numeros, lineas):
+        try:
+            valor = adaptador.validate_json(b"[" + texto + b"]")
+        except ValidationError as e:
+            rechazados.append(_rechazo(n, texto, [_error(err, 1) for err in e.errors(include_url=False)]))
+            continue
+        if len(valor) == 1:
+            validos.append(valor[0])
+        else:
+            rechazados.append(_rechazo(n, texto, [{"campo": "", "tipo": "varios_valores",
+                                                   "mensaje": f"{len(valor)} valores JSON en una línea"}]))
+    return validos, rechazados
+
+
+def validar_bloque(
+    lineas: List[bytes],
+    primera: int = 1,
+    modelo: Type[BaseModel] = CoursePlan,
+    campo: Optional[str] = None,
+    como_dict: bool = False,
+) -> Tuple[List[Registro], List[Rechazado]]:
+    """
+    Un bloque de líneas JSON (la primera es la nº `primera` del fichero) en una llamada al TypeAdapter.
+    Si falla, las posiciones de los errores separan los registros malos y el resto se revalida de una vez;
+    si el fallo es de sintaxis (el error no trae posición), las líneas que no parsean salen antes
+    y las vacías se descartan.
+    """
+    adaptador = adaptador_lista(modelo, campo, como_dict)
+    numeros = range(primera, primera + len(lineas))  # Se vuelve lista solo si hay que filtrar
+    rechazados: List[Rechazado] = []
+    validos: list = []
+    while lineas:
+        try:
+            validos = adaptador.validate_json(_como_lista(lineas))
+        except ValidationError as e:
+            por_posicion: Dict[int, List[dict]] = {}
+            sintaxis = False
+            for err in e.errors(include_url=False, include_input=False):
+                if err["loc"]:
+                    por_posicion.setdefault(err["loc"][0], []).append(_error(err, 1))
+                else:
+                    sintaxis = True
+            if sintaxis:
+                sanas, sanos = [], []
+                for n, texto in zip(numeros, lineas):
+                    if not texto.strip():
+                        continue
+                    try:
+                        _loads(texto)
+                        sanas.append(texto)
+                        sanos.append(n)
+                    except ValueError as ej:
+                        rechazados.append(_rechazo(n, texto, [{"campo": "", "tipo": "json_invalid", "mensaje": str(ej)}]))
+                if len(sanas) == len(lineas):  # Cada línea parsea sola pero el bloque no: a mano
+                    validos, malos = _uno_a_uno(adaptador, lineas, numeros)
+                    rechazados.extend(malos)
+                    break
+                lineas, numeros = sanas, sanos
+            else:
+                rechazados.extend(_rechazo(numeros[i], lineas[i], errores) for i, errores in por_posicion.items())
+                numeros = [n for i, n in enumerate(numeros) if i not in por_posicion]
+                lineas = [t for i, t in enumerate(lineas) if i not in por_posicion]
+            continue
+        if len(validos) != len(lineas):  # Alguna línea trae más de un valor y descuadra las posiciones
+            validos, malos = _uno_a_uno(adaptador, lineas, numeros)
+            rechazados.extend(malos)
+        break
+    rechazados.sort(key=lambda r: r.linea)
+    return validos, rechazados
+
+
+def validar_lineas(
+    lineas: Iterable[bytes],
+    modelo: Type[BaseModel] = CoursePlan,
+    campo: Optional[str] = None,
+    cuarentena: Optional[Callable[[Rechazado], None]] = None,
+    tam_bloque: int = TAM_BLOQUE,
+    como_dict: bool = False,
+) -> Iterator[Registro]:
+    """
+    Valida un stream de líneas JSON (p. ej. un fichero abierto en binario) y va entregando los registros
+    válidos en orden (instancias de `modelo`, o dicts con `como_dict`). Los inválidos se pasan a
+    `cuarentena` (si se da) y no cortan el stream. En memoria solo hay un bloque de `tam_bloque` líneas.
+    """
+    lineas = iter(lineas)
+    primera = 1
+    while True:
+        bloque = list(islice(lineas, tam_bloque))
+        if not bloque:
+            return
+        validos, rechazados = validar_bloque(bloque, primera, modelo, campo, como_dict)
+        primera += len(bloque)
+        if cuarentena is not None:
+            for r in rechazados:
+                cuarentena(r)
+        if campo:
+            validos = [v[campo] if isinstance(v, dict) else getattr(v, campo) for v in validos]
+        if como_dict and validos and isinstance(validos[0], BaseModel):  # Modelo sin esquema_dict
+            validos = [v.model_dump() for v in validos]
+        yield from validos
+
+
+def validar_jsonl(
+    ruta: str,
+    modelo: Type[BaseModel] = CoursePlan,
+    campo: Optional[str] = None,
+    ruta_cuarentena: Optional[str] = None,
+    tam_bloque: int = TAM_BLOQUE,
+    como_dict: bool = False,
+) -> Iterator[Registro]:
+    """validar_lineas sobre un fichero; la cuarentena se escribe como JSONL (linea, texto, errores)."""
+    f_cuarentena = open(ruta_cuarentena, "ab") if ruta_cuarentena else None
+
+    def a_cuarentena(r: Rechazado):
+        if f_cuarentena is not None:
+            f_cuarentena.write(_dumps(r._asdict()) + b"\n")
+
+    try:
+        with open(ruta, "rb") as f:
+            yield from validar_lineas(f, modelo, campo, a_cuarentena, tam_bloque, como_dict)
+    finally:
+        if f_cuarentena is not None:
+            f_cuarentena.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida en bloque un JSONL de CoursePlan")
+    parser.add_argument("entrada")
+    parser.add_argument("--cuarentena", default=None, help="JSONL donde dejar los registros inválidos")
+    parser.add_argument("--validos", default=None, help="JSONL donde escribir solo los registros válidos")
+    parser.add_argument("--campo", default=None, help="Clave que contiene el CoursePlan en cada registro")
+    parser.add_argument("--tam-bloque", type=int, default=TAM_BLOQUE)
+    args = parser.parse_args()
+
+    rechazados = 0
+    f_cuarentena = open(args.cuarentena, "ab") if args.cuarentena else None
+    f_validos = open(args.validos, "wb") if args.validos else None
+
+    def a_cuarentena(r: Rechazado):
+        nonlocal rechazados
+        rechazados += 1
+        if rechazados <= 5:
+            print(f"   ⚠️ línea {r.linea}: {r.errores[0]['campo'] or '(registro)'} - {r.errores[0]['mensaje']}")
+        if f_cuarentena is not None:
+            f_cuarentena.write(_dumps(r._asdict()) + b"\n")
+
+    t0 = time.perf_counter()
+    validos = 0
+    with open(args.entrada, "rb") as f:
+        for plan in validar_lineas(f, CoursePlan, args.campo, a_cuarentena, args.tam_bloque, como_dict=True):
+            validos += 1
+            if f_validos is not None:
+                f_validos.write(_dumps(plan) + b"\n")
+    for fichero in (f_cuarentena, f_validos):
+        if fichero is not None:
+            fichero.close()
+    segundos = time.perf_counter() - t0
+    print(f"✅ {validos} válidos, {rechazados} en cuarentena en {segundos:.2f}s "
+          f"({(validos + rechazados) / segundos:,.0f} registros/s, orjson {'sí' if orjson else 'no'})")
+
+
+if __name__ == "__main__":
+    main()